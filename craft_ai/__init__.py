@@ -3,6 +3,7 @@ __version__ = "2.1.0"
 from . import errors
 from .client import Client
 from .interpreter import Interpreter
+from .compiled_tree import CompiledTree, Decision
 from .time import Time
 from .formatters import format_property, format_decision_rules
 from .reducer import reduce_decision_rules
@@ -18,6 +19,8 @@ __all__ = [
     "Client",
     "errors",
     "Interpreter",
+    "CompiledTree",
+    "Decision",
     "Time",
     "format_property",
     "format_decision_rules",
@@ -0,0 +1,45 @@
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Statuses of the transient failures of the craft ai API gateways
+RETRY_STATUSES = (502, 503, 504)
+
+
+def get_retry(retries, backoff_factor=0.5):
+    """Retry configuration of the idempotent GET requests.
+
+    :param int retries: maximum number of retries of a request.
+    :param float backoff_factor: Optional. Factor of the exponential delay between
+    the retries, in seconds.
+
+    :return: the retry configuration, the last response is returned as is when all
+    the retries failed.
+    :rtype: urllib3.util.retry.Retry.
+    """
+    if retries <= 0:
+        # Same as requests' default, errors are raised as is
+        return Retry(0, read=False)
+    kwargs = {
+        "total": retries,
+        "backoff_factor": backoff_factor,
+        "status_forcelist": RETRY_STATUSES,
+        "raise_on_status": False,
+    }
+    try:
+        return Retry(allowed_methods=frozenset(["GET"]), **kwargs)
+    except TypeError:
+        # urllib3 < 1.26
+        return Retry(method_whitelist=frozenset(["GET"]), **kwargs)
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTP adapter giving a default timeout to the requests sent without one."""
+
+    def __init__(self, timeout=None, **kwargs):
+        self.timeout = timeout
+        super(TimeoutHTTPAdapter, self).__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super(TimeoutHTTPAdapter, self).send(request, **kwargs)
@@ -0,0 +1,9 @@
+try:
+    CRAFTAI_AIO_ENABLED = True
+    from .client import AsyncClient
+except ImportError:
+    CRAFTAI_AIO_ENABLED = False
+    AsyncClient = None
+
+# Defining what will be imported when doing `from craft_ai.aio import *`
+__all__ = ["AsyncClient", "CRAFTAI_AIO_ENABLED"]
@@ -0,0 +1,726 @@
+import asyncio
+import datetime
+import time
+
+from urllib.parse import urlparse
+
+import aiohttp
+
+from .. import codec
+from ..client import Client, current_time_ms
+from ..constants import DEFAULT_DECISION_TREE_VERSION
+from ..errors import (
+    CraftAiBadRequestError,
+    CraftAiError,
+    CraftAiLongRequestTimeOutError,
+    CraftAiPayloadTooLargeError,
+)
+from ..helpers import encoded_size, extract_operations_count_from_message
+from ..polling import Backoff, PollingStats
+
+# Extra header in addition to the client's ones
+CT_HEADER = {"Content-Type": "application/json; charset=utf-8"}
+
+
+class _Response(object):
+    """Read response of an aiohttp request.
+
+    It has the attributes of `requests.Response` used to decode the responses.
+    """
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    def json(self):
+        return codec.decode(self.content)
+
+
+class AsyncClient(Client):
+    """Client class for craft ai's API using asyncio.
+
+    It has the same methods as `craft_ai.Client`, as coroutines. All the requests
+    share the connection pool of an `aiohttp.ClientSession`, created by the first
+    request and released by `close` or at the end of an `async with` block. The
+    GET requests are not retried, `getRetries` is ignored.
+    """
+
+    def __init__(self, cfg):
+        # pylint: disable=super-init-not-called
+        self._base_url = ""
+        self._headers = {}
+        self._config = {}
+        self._session = None
+        # Number of polls of the requests waiting for a long computation
+        self.polling_stats = PollingStats()
+
+        self.config = cfg
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Close the connections of the client."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _configure_session(self):
+        # Headers and proxy are given to each request, the session being bound to
+        # the event loop of its first request.
+        pass
+
+    async def _request(self, method, url, headers=None, params=None, data=None):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.config["connectionPoolSize"]
+                    * self.config["maxConnectionsPerHost"],
+                    limit_per_host=self.config["maxConnectionsPerHost"],
+                    force_close=not self.config["keepAlive"],
+                ),
+                timeout=aiohttp.ClientTimeout(
+                    total=None,
+                    sock_connect=self._timeout_seconds("connectTimeout"),
+                    sock_read=self._timeout_seconds("readTimeout"),
+                ),
+            )
+
+        proxy = None
+        if self._proxies:
+            proxy = self._proxies.get(urlparse(url).scheme)
+        if params is not None:
+            # Same as requests, parameters without value are not sent
+            params = {key: value for key, value in params.items() if value is not None}
+
+        async with self._session.request(
+            method,
+            url,
+            headers={**self._headers, **(headers or {})},
+            params=params,
+            data=data,
+            proxy=proxy,
+        ) as resp:
+            content = await resp.read()
+            return _Response(resp.status, resp.headers, content)
+
+    async def _send_bulk(self, payload, req_url, request_type):
+        # Check all ids, raise an error if all ids are invalid
+        (
+            valid_indices,
+            invalid_indices,
+            invalid_entities,
+            encoded_entities,
+        ) = self._encode_entities_bulk(payload)
+
+        # Create the json file with the entities with valid id and send it
+        valid_entities = await self._create_and_send_json_bulk(
+            encoded_entities, req_url, request_type
+        )
+
+        if invalid_indices == []:
+            return valid_entities
+
+        # Put the valid and invalid entities in their original index
+        return self._recreate_list_with_indices(
+            valid_indices, valid_entities, invalid_indices, invalid_entities
+        )
+
+    async def _create_and_send_json_bulk(
+        self, payload, req_url, request_type="POST", headers=None, encoded_items=False
+    ):
+        json_pl = self._encode_bulk_payload(payload)
+        if request_type not in ["POST", "DELETE"]:
+            raise CraftAiBadRequestError(
+                "Request for the bulk API should be either a POST or DELETE" "request"
+            )
+        headers, json_pl = self._compress_request(
+            {**CT_HEADER, **(headers or {})}, json_pl
+        )
+        resp = await self._request(request_type, req_url, headers=headers, data=json_pl)
+        if encoded_items:
+            return self._decode_response_items(resp)
+        entities = self._decode_response(resp)
+        entities = self._decode_response_bulk(entities)
+        return entities
+
+    async def _poll_long_request(self, request):
+        """Await `request` until the API has finished the computation.
+
+        :param request: function creating the coroutine of the request.
+        """
+        polls = 0
+        waited = 0
+        try:
+            if self._config["decisionTreeRetrievalTimeout"] is False:
+                # Don't retry
+                polls += 1
+                return await request()
+
+            backoff = Backoff.from_config(self._config)
+            start = current_time_ms()
+            while True:
+                polls += 1
+                try:
+                    return await request()
+                except CraftAiLongRequestTimeOutError as err:
+                    remaining = self._config["decisionTreeRetrievalTimeout"] - (
+                        current_time_ms() - start
+                    )
+                    if remaining <= 0:
+                        # Client side timeout
+                        raise CraftAiLongRequestTimeOutError()
+                    delay = min(backoff.delay(polls, err), remaining)
+                    await asyncio.sleep(delay / 1000)
+                    waited += delay
+        finally:
+            self.polling_stats.record(polls, waited / 1000)
+
+    async def _iter_pages_content(self, url, params):
+        size = self.config["operationsPagesPrefetch"]
+        if size <= 0:
+            resp = await self._request("GET", url, params=params)
+            while True:
+                yield self._decode_response(resp)
+                next_page_url = resp.headers.get("x-craft-ai-next-page-url")
+                if next_page_url is None:
+                    return
+                resp = await self._request("GET", next_page_url)
+
+        # The pages are downloaded by a task, up to `size` pages ahead
+        responses = asyncio.Queue(maxsize=size)
+
+        async def produce():
+            try:
+                resp = await self._request("GET", url, params=params)
+                while True:
+                    await responses.put((resp, None))
+                    next_page_url = resp.headers.get("x-craft-ai-next-page-url")
+                    if next_page_url is None:
+                        break
+                    resp = await self._request("GET", next_page_url)
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:  # pylint: disable=broad-except
+                # Any error ends the pages, the consumer must not wait for more
+                await responses.put((None, err))
+            else:
+                await responses.put((None, None))
+
+        producer = asyncio.ensure_future(produce())
+        try:
+            while True:
+                resp, err = await responses.get()
+                if err is not None:
+                    raise err
+                if resp is None:
+                    return
+                yield self._decode_response(resp)
+        finally:
+            producer.cancel()
+
+    async def _iter_pages_items(self, url, params):
+        async for page in self._iter_pages_content(url, params):
+            for item in page:
+                yield item
+
+    def _iter_pages(self, url, params, by_page):
+        if by_page:
+            return self._iter_pages_content(url, params)
+        return self._iter_pages_items(url, params)
+
+    async def _get_pages(self, url, params=None):
+        items = []
+        async for page in self._iter_pages_content(url, params):
+            items.extend(page)
+        return items
+
+    #################
+    # Agent methods #
+    #################
+
+    async def create_agent(self, configuration, agent_id=""):
+        json_pl = self._encode_creation_payload(configuration, agent_id, "agent")
+
+        req_url = "{}/agents".format(self._base_url)
+        headers, json_pl = self._compress_request(CT_HEADER, json_pl)
+        resp = await self._request("POST", req_url, headers=headers, data=json_pl)
+
+        return self._decode_response(resp)
+
+    async def create_agents_bulk(self, payload):
+        return await self._send_bulk(
+            payload, "{}/bulk/agents".format(self._base_url), "POST"
+        )
+
+    async def get_agent(self, agent_id):
+        # Raises an error when agent_id is invalid
+        self._check_entity_id(agent_id)
+
+        req_url = "{}/agents/{}".format(self._base_url, agent_id)
+        resp = await self._request("GET", req_url)
+
+        return self._decode_response(resp)
+
+    async def list_agents(self):
+        req_url = "{}/agents".format(self._base_url)
+        resp = await self._request("GET", req_url)
+
+        return self._decode_response(resp)["agentsList"]
+
+    async def delete_agent(self, agent_id):
+        # Raises an error when agent_id is invalid
+        self._check_entity_id(agent_id)
+
+        req_url = "{}/agents/{}".format(self._base_url, agent_id)
+        resp = await self._request("DELETE", req_url)
+
+        return self._decode_response(resp)
+
+    async def delete_agents_bulk(self, payload):
+        return await self._send_bulk(
+            payload, "{}/bulk/agents".format(self._base_url), "DELETE"
+        )
+
+    async def get_shared_agent_inspector_url(self, agent_id, timestamp=None):
+        # Raises an error when agent_id is invalid
+        self._check_entity_id(agent_id)
+
+        req_url = "{}/agents/{}/shared".format(self._base_url, agent_id)
+        resp = await self._request("GET", req_url)
+
+        url = self._decode_response(resp)
+
+        if timestamp is not None:
+            return "{}?t={}".format(url["shortUrl"], str(timestamp))
+
+        return url["shortUrl"]
+
+    async def delete_shared_agent_inspector_url(self, agent_id):
+        # Raises an error when agent_id is invalid
+        self._check_entity_id(agent_id)
+
+        req_url = "{}/agents/{}/shared".format(self._base_url, agent_id)
+        resp = await self._request("DELETE", req_url)
+
+        return self._decode_response(resp)
+
+    ####################
+    # Generator method #
+    ####################
+
+    async def create_generator(self, configuration, generator_id=""):
+        json_pl = self._encode_creation_payload(
+            configuration, generator_id, "generator"
+        )
+
+        req_url = "{}/generators".format(self._base_url)
+        headers, json_pl = self._compress_request(CT_HEADER, json_pl)
+        resp = await self._request("POST", req_url, headers=headers, data=json_pl)
+
+        return self._decode_response(resp)
+
+    async def create_generators_bulk(self, payload):
+        return await self._send_bulk(
+            payload, "{}/bulk/generators".format(self._base_url), "POST"
+        )
+
+    async def get_generator(self, generator_id):
+        # Raises an error when generator_id is invalid
+        self._check_entity_id(generator_id)
+
+        req_url = "{}/generators/{}".format(self._base_url, generator_id)
+        resp = await self._request("GET", req_url)
+
+        return self._decode_response(resp)
+
+    async def list_generators(self):
+        req_url = "{}/generators".format(self._base_url)
+        resp = await self._request("GET", req_url)
+
+        return self._decode_response(resp)["generatorsList"]
+
+    async def delete_generator(self, generator_id):
+        # Raises an error when generator_id is invalid
+        self._check_entity_id(generator_id)
+
+        req_url = "{}/generators/{}".format(self._base_url, generator_id)
+        resp = await self._request("DELETE", req_url)
+
+        return self._decode_response(resp)
+
+    async def delete_generators_bulk(self, payload):
+        return await self._send_bulk(
+            payload, "{}/bulk/generators".format(self._base_url), "DELETE"
+        )
+
+    async def _request_decision_tree(self, key, req_url):
+        headers, revalidable = self._tree_request_headers(key)
+        resp = await self._request("GET", req_url, headers=headers)
+        decision_tree = self._decode_tree_response(key, resp, revalidable)
+        if decision_tree is None:
+            # Not modified, but the cached tree was evicted in the meantime
+            resp = await self._request(
+                "GET", req_url, headers=self._tree_headers(key[3])
+            )
+            decision_tree = self._decode_tree_response(key, resp)
+        return decision_tree
+
+    async def _get_generator_decision_tree(
+        self, generator_id, timestamp, version=DEFAULT_DECISION_TREE_VERSION
+    ):
+        # If we give no timestamp the default behaviour is to give the tree
+        # from the latest timestamp
+        if timestamp is None:
+            req_url = "{}/generators/{}/tree?".format(self._base_url, generator_id)
+        else:
+            req_url = "{}/generators/{}/tree?t={}".format(
+                self._base_url, generator_id, timestamp
+            )
+
+        key = ("generator", generator_id, timestamp, version)
+        return await self._request_decision_tree(key, req_url)
+
+    async def get_generator_decision_tree(
+        self, generator_id, timestamp=None, version=DEFAULT_DECISION_TREE_VERSION
+    ):
+        if isinstance(version, int):
+            version = str(version)
+
+        # Convert datetime to timestamp
+        if isinstance(timestamp, datetime.datetime):
+            timestamp = time.mktime(timestamp.timetuple())
+
+        # Raises an error when generator_id is invalid
+        self._check_entity_id(generator_id)
+
+        key = ("generator", generator_id, timestamp, version)
+        decision_tree = self._get_cached_tree(key)
+        if decision_tree is None:
+            decision_tree = await self._poll_long_request(
+                lambda: self._get_generator_decision_tree(
+                    generator_id, timestamp, version
+                )
+            )
+        return decision_tree
+
+    async def get_generators_decision_trees_bulk(
+        self, payload, version=DEFAULT_DECISION_TREE_VERSION
+    ):
+        if isinstance(version, int):
+            version = str(version)
+
+        return await self._get_decision_trees_bulk(
+            "generator",
+            payload,
+            "{}/bulk/generators/tree".format(self._base_url),
+            version,
+        )
+
+    def iter_generator_operations(
+        self, generator_id, start=None, end=None, by_page=False
+    ):
+        # Raises an error when generator_id is invalid
+        self._check_entity_id(generator_id)
+
+        req_url = "{}/generators/{}/context".format(self._base_url, generator_id)
+        return self._iter_pages(req_url, {"start": start, "end": end}, by_page)
+
+    async def get_generator_operations(self, generator_id, start=None, end=None):
+        # Raises an error when generator_id is invalid
+        self._check_entity_id(generator_id)
+
+        req_url = "{}/generators/{}/context".format(self._base_url, generator_id)
+        return await self._get_pages(req_url, {"start": start, "end": end})
+
+    ###################
+    # Context methods #
+    ###################
+
+    async def add_agent_operations(self, agent_id, operations):
+        return await self._add_agent_operations(agent_id, operations)
+
+    async def _add_agent_operations(self, agent_id, operations, workers=None):
+        # Raises an error when agent_id is invalid
+        self._check_entity_id(agent_id)
+
+        req_url = "{}/agents/{}/context".format(self._base_url, agent_id)
+        semaphore = asyncio.Semaphore(
+            workers or self.config["operationsChunksConcurrency"]
+        )
+        window = asyncio.Semaphore(max(self.config["operationsChunksWindow"], 1))
+        failed = []
+
+        async def post_chunk(chunk):
+            try:
+                async with semaphore:
+                    # Like the synchronous client, stop at the first failing chunk
+                    if failed:
+                        return None
+                    try:
+                        return await self._post_operations_chunk(req_url, *chunk)
+                    except Exception:
+                        failed.append(chunk)
+                        raise
+            finally:
+                window.release()
+
+        # The chunks are only encoded when there is room for them in the window
+        chunks = self._encode_operations_chunks(operations)
+        tasks = []
+        try:
+            while True:
+                await window.acquire()
+                chunk = None if failed else next(chunks, None)
+                if chunk is None:
+                    break
+                tasks.append(asyncio.ensure_future(post_chunk(chunk)))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+
+        added_operations_count = sum(results)
+        return {
+            "message": f'Successfully added {added_operations_count} operation(s) to \
+                the agent "{self.config["owner"]}/{self.config["project"]}/{agent_id}" context.',
+            "added_operations_count": added_operations_count,
+        }
+
+    async def _post_operations_chunk(self, req_url, operations, json_pl):
+        headers, body = self._compress_request(CT_HEADER, json_pl)
+        try:
+            resp = await self._request("POST", req_url, headers=headers, data=body)
+            decoded_response = self._decode_response(resp)
+        except CraftAiPayloadTooLargeError:
+            if len(operations) <= 1:
+                raise
+            self._lower_operations_chunks_max_bytes(encoded_size(json_pl))
+            added_operations_count = 0
+            for chunk in self._split_operations_chunk(operations, json_pl):
+                added_operations_count += await self._post_operations_chunk(
+                    req_url, *chunk
+                )
+            return added_operations_count
+        return extract_operations_count_from_message(decoded_response["message"])
+
+    async def _add_agents_operations_bulk(self, chunked_data):
+        chunked_data = [chunk for chunk in chunked_data if chunk]
+        # A lone chunk has the whole concurrency for itself
+        agent_workers = 1 if len(chunked_data) > 1 else None
+        semaphore = asyncio.Semaphore(self.config["operationsChunksConcurrency"])
+        dependencies = self._chunks_dependencies(chunked_data)
+        sent = [asyncio.Event() for _ in chunked_data]
+        failed_parts = {}
+
+        async def add_chunk(index):
+            # The parts of the operations of an agent are sent in order
+            for dependency in dependencies[index]:
+                await sent[dependency].wait()
+            try:
+                chunk, skipped = self._skip_failed_parts(
+                    chunked_data[index], failed_parts
+                )
+                result = []
+                if chunk:
+                    async with semaphore:
+                        try:
+                            result = await self._add_agents_operations_chunk(
+                                chunk, agent_workers
+                            )
+                        except Exception as err:  # pylint: disable=broad-except
+                            self._record_failed_parts(chunk, err, failed_parts)
+                            raise
+                self._record_failed_parts(chunk, result, failed_parts)
+                return result + skipped
+            finally:
+                sent[index].set()
+
+        results = await asyncio.gather(
+            *[add_chunk(index) for index in range(len(chunked_data))],
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception) and not isinstance(
+                result, (CraftAiError, aiohttp.ClientError)
+            ):
+                raise result
+        return self._gather_chunks_responses(chunked_data, results)
+
+    async def _add_agents_operations_chunk(self, chunk, agent_workers=None):
+        if len(chunk) == 1:
+            add_agent_operations_response = await self._add_agent_operations(
+                chunk[0]["id"], chunk[0]["operations"], agent_workers
+            )
+            return [
+                {"id": chunk[0]["id"], "status": 201, **add_agent_operations_response}
+            ]
+
+        json_pl = self._encode_agents_operations(chunk)
+        url = "{}/bulk/context".format(self._base_url)
+        headers, body = self._compress_request(CT_HEADER, json_pl)
+        try:
+            resp = await self._request("POST", url, headers=headers, data=body)
+            return self._count_added_operations(self._decode_response(resp))
+        except CraftAiPayloadTooLargeError:
+            # Send each half of the agents on its own
+            self._lower_operations_chunks_max_bytes(encoded_size(json_pl))
+            middle = len(chunk) // 2
+            return await self._add_agents_operations_chunk(
+                chunk[:middle], agent_workers
+            ) + await self._add_agents_operations_chunk(chunk[middle:], agent_workers)
+
+    async def add_agents_operations_bulk(self, payload):
+        # Check all ids, raise an error if all ids are invalid
+        valid_payload = self._encode_agents_operations_bulk(payload)
+
+        return await self._add_agents_operations_bulk(
+            self._chunk_agents_operations(valid_payload)
+        )
+
+    def iter_agent_operations(self, agent_id, start=None, end=None, by_page=False):
+        # Raises an error when agent_id is invalid
+        self._check_entity_id(agent_id)
+
+        req_url = "{}/agents/{}/context".format(self._base_url, agent_id)
+        return self._iter_pages(req_url, {"start": start, "end": end}, by_page)
+
+    async def get_agent_operations(self, agent_id, start=None, end=None):
+        # Raises an error when agent_id is invalid
+        self._check_entity_id(agent_id)
+
+        req_url = "{}/agents/{}/context".format(self._base_url, agent_id)
+        return await self._get_pages(req_url, {"start": start, "end": end})
+
+    def iter_agent_states(self, agent_id, start=None, end=None, by_page=False):
+        # Raises an error when agent_id is invalid
+        self._check_entity_id(agent_id)
+
+        req_url = "{}/agents/{}/context/state/history".format(self._base_url, agent_id)
+        return self._iter_pages(req_url, {"start": start, "end": end}, by_page)
+
+    async def get_agent_states(self, agent_id, start=None, end=None):
+        # Raises an error when agent_id is invalid
+        self._check_entity_id(agent_id)
+
+        req_url = "{}/agents/{}/context/state/history".format(self._base_url, agent_id)
+        return await self._get_pages(req_url, {"start": start, "end": end})
+
+    async def get_agent_state(self, agent_id, timestamp):
+        # Raises an error when agent_id is invalid
+        self._check_entity_id(agent_id)
+
+        req_url = "{}/agents/{}/context/state?t={}".format(
+            self._base_url, agent_id, timestamp
+        )
+        resp = await self._request("GET", req_url)
+
+        return self._decode_response(resp)
+
+    #########################
+    # Decision tree methods #
+    #########################
+
+    async def _get_agent_decision_tree(
+        self, agent_id, timestamp, version=DEFAULT_DECISION_TREE_VERSION
+    ):
+        # If we give no timestamp the default behaviour is to give
+        # the tree from the latest timestamp
+        if timestamp is None:
+            req_url = "{}/agents/{}/decision/tree?".format(self._base_url, agent_id)
+        else:
+            req_url = "{}/agents/{}/decision/tree?t={}".format(
+                self._base_url, agent_id, timestamp
+            )
+
+        key = ("agent", agent_id, timestamp, version)
+        return await self._request_decision_tree(key, req_url)
+
+    async def get_agent_decision_tree(
+        self, agent_id, timestamp=None, version=DEFAULT_DECISION_TREE_VERSION
+    ):
+        if isinstance(version, int):
+            version = str(version)
+
+        # Convert datetime to timestamp
+        if isinstance(timestamp, datetime.datetime):
+            timestamp = time.mktime(timestamp.timetuple())
+
+        # Raises an error when agent_id is invalid
+        self._check_entity_id(agent_id)
+
+        key = ("agent", agent_id, timestamp, version)
+        decision_tree = self._get_cached_tree(key)
+        if decision_tree is None:
+            decision_tree = await self._poll_long_request(
+                lambda: self._get_agent_decision_tree(agent_id, timestamp, version)
+            )
+        return decision_tree
+
+    async def get_agents_decision_trees_bulk(
+        self, payload, version=DEFAULT_DECISION_TREE_VERSION
+    ):
+        if isinstance(version, int):
+            version = str(version)
+
+        return await self._get_decision_trees_bulk(
+            "agent", payload, "{}/bulk/decision_tree".format(self._base_url), version
+        )
+
+    async def _get_decision_trees_bulk(self, kind, payload, req_url, version):
+        # Check all ids, raise an error if all ids are invalid
+        (
+            valid_indices,
+            invalid_indices,
+            invalid_dts,
+            encoded_payload,
+        ) = self._encode_entities_bulk(payload)
+        (
+            cached_indices,
+            cached_dts,
+            valid_indices,
+            encoded_payload,
+        ) = self._get_cached_trees_bulk(
+            kind, payload, valid_indices, encoded_payload, version
+        )
+
+        valid_dts = []
+        if valid_indices:
+            caches_trees = self.tree_cache is not None or self.tree_store is not None
+            response = await self._poll_long_request(
+                lambda: self._create_and_send_json_bulk(
+                    encoded_payload,
+                    req_url,
+                    "POST",
+                    self._tree_headers(version),
+                    encoded_items=caches_trees,
+                )
+            )
+            if caches_trees:
+                valid_dts, encoded_trees = response
+                self._cache_trees_bulk(
+                    kind, encoded_payload, valid_dts, encoded_trees, version
+                )
+            else:
+                valid_dts = response
+
+        if invalid_indices == [] and cached_indices == []:
+            return valid_dts
+
+        # Put the cached, requested and invalid decision trees in their original index
+        return self._recreate_list_with_indices(
+            cached_indices + valid_indices,
+            cached_dts + valid_dts,
+            invalid_indices,
+            invalid_dts,
+        )
@@ -2,29 +2,49 @@
 # cf. https://stackoverflow.com/a/28854227
 from __future__ import absolute_import
 
-import json
+import gzip
+import threading
 import time
 import datetime
 
+from collections import deque
 from platform import python_implementation, python_version
 from urllib.parse import urlparse
 
 import requests
 
 from . import __version__ as pkg_version
+from . import codec
+from .adapters import TimeoutHTTPAdapter, get_retry
 from .constants import AGENT_ID_PATTERN, DEFAULT_DECISION_TREE_VERSION
 from .errors import (
+    CraftAiError,
     CraftAiCredentialsError,
     CraftAiBadRequestError,
+    CraftAiPayloadTooLargeError,
     CraftAiNotFoundError,
     CraftAiUnknownError,
     CraftAiInternalError,
     CraftAiLongRequestTimeOutError,
     CraftAiNetworkError,
 )
-from .helpers import extract_operations_count_from_message
+from .helpers import (
+    AgentOperationsPart,
+    EncodedEntities,
+    EncodedEntity,
+    EncodedOperations,
+    encode_agent_operations,
+    encoded_size,
+    extract_operations_count_from_message,
+    join_json_fragments,
+    map_ordered,
+    prefetch,
+)
 from .interpreter import Interpreter
 from .jwt_decode import jwt_decode
+from .polling import Backoff, PollingStats, parse_retry_after
+from .tree_cache import TreeCache
+from .tree_store import TreeStore
 
 USER_AGENT = "craft-ai-client-python/{} [{} {}]".format(
     pkg_version, python_implementation(), python_version()
@@ -45,7 +65,12 @@ def current_time_ms():
 
 
 class Client(object):
-    """Client class for craft ai's API"""
+    """Client class for craft ai's API
+
+    A client can be shared by several threads, e.g. the workers of a thread pool,
+    its requests then share the same pool of connections. Its configuration should
+    not be changed while it is in use.
+    """
 
     def __init__(self, cfg):
         self._base_url = ""
@@ -53,6 +78,8 @@ class Client(object):
         self._config = {}
         # Requests session: connection pooling and base configuration for all requests
         self._requests_session = requests.Session()
+        # Number of polls of the requests waiting for a long computation
+        self.polling_stats = PollingStats()
 
         try:
             self.config = cfg
@@ -91,10 +118,55 @@ class Client(object):
             )
         if not isinstance(cfg.get("operationsChunksSize"), int):
             cfg["operationsChunksSize"] = 200
+        if not isinstance(cfg.get("operationsChunksMaxBytes"), int):
+            cfg["operationsChunksMaxBytes"] = 1024 * 1024  # 1 MiB
+        if not isinstance(cfg.get("operationsChunksConcurrency"), int):
+            cfg["operationsChunksConcurrency"] = 1
+        if not isinstance(cfg.get("operationsChunksWindow"), int):
+            cfg["operationsChunksWindow"] = 2 * cfg["operationsChunksConcurrency"]
+        if not isinstance(cfg.get("operationsPagesPrefetch"), int):
+            cfg["operationsPagesPrefetch"] = 2
+        if not isinstance(cfg.get("connectionPoolSize"), int):
+            cfg["connectionPoolSize"] = requests.adapters.DEFAULT_POOLSIZE
+        if not isinstance(cfg.get("maxConnectionsPerHost"), int):
+            # Keep a connection for each of the concurrent requests
+            cfg["maxConnectionsPerHost"] = max(
+                requests.adapters.DEFAULT_POOLSIZE, cfg["operationsChunksConcurrency"]
+            )
+        for key, default in [
+            ("connectTimeout", 1000 * 10),  # 10 seconds
+            ("readTimeout", False),
+        ]:
+            if cfg.get(key) is not False and not isinstance(cfg.get(key), (int, float)):
+                cfg[key] = default
+        if not isinstance(cfg.get("keepAlive"), bool):
+            cfg["keepAlive"] = True
+        if not isinstance(cfg.get("getRetries"), int):
+            cfg["getRetries"] = 3
+        if not isinstance(cfg.get("compressRequests"), bool):
+            cfg["compressRequests"] = False
+        if not isinstance(cfg.get("compressRequestsThreshold"), int):
+            cfg["compressRequestsThreshold"] = 1024
         if cfg.get("decisionTreeRetrievalTimeout") is not False and not isinstance(
             cfg.get("decisionTreeRetrievalTimeout"), int
         ):
             cfg["decisionTreeRetrievalTimeout"] = 1000 * 60 * 5  # 5 minutes
+        for key, default in [
+            ("decisionTreeRetrievalInterval", 500),
+            ("decisionTreeRetrievalMaxInterval", 1000 * 30),
+            ("decisionTreeRetrievalBackoff", 2),
+            ("decisionTreeRetrievalJitter", 0.5),
+        ]:
+            if not isinstance(cfg.get(key), (int, float)):
+                cfg[key] = default
+        if not isinstance(cfg.get("decisionTreeRetrievalUseRetryAfter"), bool):
+            cfg["decisionTreeRetrievalUseRetryAfter"] = True
+        if not isinstance(cfg.get("decisionTreeCacheMaxBytes"), int):
+            cfg["decisionTreeCacheMaxBytes"] = 0
+        if not isinstance(cfg.get("decisionTreeCacheLatestTtl"), (int, float)):
+            cfg["decisionTreeCacheLatestTtl"] = 1000 * 60  # 1 minute
+        if not isinstance(cfg.get("decisionTreeStore"), str):
+            cfg["decisionTreeStore"] = None
         if not isinstance(cfg.get("url"), str):
             cfg["url"] = "https://beta.craft.ai"
         if cfg.get("url").endswith("/"):
@@ -105,11 +177,24 @@ class Client(object):
                 """ slash."""
             )
         self._config = cfg
+        # Lowered when the craft ai API rejects a chunk as too large
+        self._operations_chunks_max_bytes = cfg["operationsChunksMaxBytes"]
+        # Decision trees already retrieved, None when the cache is disabled
+        self.tree_cache = (
+            TreeCache(cfg["decisionTreeCacheMaxBytes"])
+            if cfg["decisionTreeCacheMaxBytes"] > 0
+            else None
+        )
+        # Decision trees downloaded for other processes as well, None without a store
+        self.tree_store = (
+            TreeStore(cfg["decisionTreeStore"]) if cfg["decisionTreeStore"] else None
+        )
 
         self._base_url = "{}/api/v1/{}/{}".format(
             self.config["url"], self.config["owner"], self.config["project"]
         )
 
+        self._proxies = None
         if cfg.get("proxy"):
             scheme = urlparse(self.config["url"]).scheme
             if not scheme:
@@ -118,15 +203,38 @@ class Client(object):
                     """ without a scheme. Cannot configure"""
                     """ the proxy."""
                 )
-            proxies = {}
-            proxies[scheme] = cfg.get("proxy")
-            self._requests_session.proxies = proxies
+            self._proxies = {scheme: cfg.get("proxy")}
         # Headers have to be set here to avoid multiple definitions
         # of the 'Authorization' header if config is modified
         base_headers = {}
         base_headers["Authorization"] = "Bearer " + self.config.get("token")
         base_headers["User-Agent"] = USER_AGENT
-        self._requests_session.headers = base_headers
+        self._headers = base_headers
+
+        self._configure_session()
+
+    def _configure_session(self):
+        if self._proxies:
+            self._requests_session.proxies = self._proxies
+        self._requests_session.headers = dict(self._headers)
+        if not self.config["keepAlive"]:
+            self._requests_session.headers["Connection"] = "close"
+
+        adapter = TimeoutHTTPAdapter(
+            timeout=(
+                self._timeout_seconds("connectTimeout"),
+                self._timeout_seconds("readTimeout"),
+            ),
+            pool_connections=self.config["connectionPoolSize"],
+            pool_maxsize=self.config["maxConnectionsPerHost"],
+            max_retries=get_retry(self.config["getRetries"]),
+        )
+        self._requests_session.mount("http://", adapter)
+        self._requests_session.mount("https://", adapter)
+
+    def _timeout_seconds(self, key):
+        timeout = self.config[key]
+        return None if timeout is False else timeout / 1000
 
     #################
     # Agent methods #
@@ -150,30 +258,36 @@ class Client(object):
         # Extra header in addition to the main session's
         ct_header = {"Content-Type": "application/json; charset=utf-8"}
 
+        json_pl = self._encode_creation_payload(configuration, agent_id, "agent")
+
+        req_url = "{}/agents".format(self._base_url)
+        ct_header, json_pl = self._compress_request(ct_header, json_pl)
+        resp = self._requests_session.post(req_url, headers=ct_header, data=json_pl)
+
+        agent = self._decode_response(resp)
+
+        return agent
+
+    def _encode_creation_payload(self, configuration, entity_id, entity_name):
         # Building payload and checking that it is valid for a JSON
         # serialization
         payload = {"configuration": configuration}
 
-        if agent_id != "":
-            # Raises an error when agent_id is invalid
-            self._check_entity_id(agent_id)
+        if entity_id != "":
+            # Raises an error when entity_id is invalid
+            self._check_entity_id(entity_id)
 
-            payload["id"] = agent_id
+            payload["id"] = entity_id
 
         try:
-            json_pl = json.dumps(payload)
+            return codec.encode(payload)
         except TypeError as err:
             raise CraftAiBadRequestError(
-                "Invalid configuration or agent id given. {}".format(err.__str__())
+                "Invalid configuration or {} id given. {}".format(
+                    entity_name, err.__str__()
+                )
             )
 
-        req_url = "{}/agents".format(self._base_url)
-        resp = self._requests_session.post(req_url, headers=ct_header, data=json_pl)
-
-        agent = self._decode_response(resp)
-
-        return agent
-
     def create_agents_bulk(self, payload):
         """Create a group of agents.
 
@@ -190,15 +304,16 @@ class Client(object):
         configurations are invalid.
         """
         # Check all ids, raise an error if all ids are invalid
-        valid_indices, invalid_indices, invalid_agents = self._check_entity_id_bulk(
-            payload
-        )
+        (
+            valid_indices,
+            invalid_indices,
+            invalid_agents,
+            encoded_agents,
+        ) = self._encode_entities_bulk(payload)
 
         # Create the json file with the agents with valid id and send it
         valid_agents = self._create_and_send_json_bulk(
-            [payload[i] for i in valid_indices],
-            "{}/bulk/agents".format(self._base_url),
-            "POST",
+            encoded_agents, "{}/bulk/agents".format(self._base_url), "POST",
         )
 
         if invalid_indices == []:
@@ -264,15 +379,16 @@ class Client(object):
         :raises CraftAiBadRequestError: If all of the ids are invalid.
         """
         # Check all ids, raise an error if all ids are invalid
-        valid_indices, invalid_indices, invalid_agents = self._check_entity_id_bulk(
-            payload
-        )
+        (
+            valid_indices,
+            invalid_indices,
+            invalid_agents,
+            encoded_agents,
+        ) = self._encode_entities_bulk(payload)
 
         # Create the json file with the agents with valid id and send it
         valid_agents = self._create_and_send_json_bulk(
-            [payload[i] for i in valid_indices],
-            "{}/bulk/agents".format(self._base_url),
-            "DELETE",
+            encoded_agents, "{}/bulk/agents".format(self._base_url), "DELETE",
         )
 
         if invalid_indices == []:
@@ -325,25 +441,12 @@ class Client(object):
         # Extra header in addition to the main session's
         ct_header = {"Content-Type": "application/json; charset=utf-8"}
 
-        # Building payload and checking that it is valid for a JSON
-        # serialization
-
-        payload = {"configuration": configuration}
-
-        if generator_id != "":
-            # Raises an error when generator_id is invalid
-            self._check_entity_id(generator_id)
-
-            payload["id"] = generator_id
-
-        try:
-            json_pl = json.dumps(payload)
-        except TypeError as err:
-            raise CraftAiBadRequestError(
-                "Invalid configuration or generator id given. {}".format(err.__str__())
-            )
+        json_pl = self._encode_creation_payload(
+            configuration, generator_id, "generator"
+        )
 
         req_url = "{}/generators".format(self._base_url)
+        ct_header, json_pl = self._compress_request(ct_header, json_pl)
         resp = self._requests_session.post(req_url, headers=ct_header, data=json_pl)
 
         generator = self._decode_response(resp)
@@ -366,14 +469,15 @@ class Client(object):
         configurations are invalid.
         """
         # Check all ids, raise an error if all ids are invalid
-        valid_indices, invalid_indices, invalid_generators = self._check_entity_id_bulk(
-            payload
-        )
+        (
+            valid_indices,
+            invalid_indices,
+            invalid_generators,
+            encoded_generators,
+        ) = self._encode_entities_bulk(payload)
         # Create the json file with the generators with valid id and send it
         valid_generators = self._create_and_send_json_bulk(
-            [payload[i] for i in valid_indices],
-            "{}/bulk/generators".format(self._base_url),
-            "POST",
+            encoded_generators, "{}/bulk/generators".format(self._base_url), "POST",
         )
 
         if invalid_indices == []:
@@ -436,15 +540,16 @@ class Client(object):
         :raises CraftAiBadRequestError: If all of the ids are invalid.
         """
         # Check all ids, raise an error if all ids are invalid
-        valid_indices, invalid_indices, invalid_generators = self._check_entity_id_bulk(
-            payload
-        )
+        (
+            valid_indices,
+            invalid_indices,
+            invalid_generators,
+            encoded_generators,
+        ) = self._encode_entities_bulk(payload)
 
         # Create the json file with the generators with valid id and send it
         valid_generators = self._create_and_send_json_bulk(
-            [payload[i] for i in valid_indices],
-            "{}/bulk/generators".format(self._base_url),
-            "DELETE",
+            encoded_generators, "{}/bulk/generators".format(self._base_url), "DELETE",
         )
 
         if invalid_indices == []:
@@ -474,8 +579,6 @@ class Client(object):
         :return: decision tree.
         :rtype: dict.
         """
-        self._requests_session.headers["x-craft-ai-tree-version"] = version
-
         # If we give no timestamp the default behaviour is to give the tree
         # from the latest timestamp
         if timestamp is None:
@@ -485,11 +588,8 @@ class Client(object):
                 self._base_url, generator_id, timestamp
             )
 
-        resp = self._requests_session.get(req_url)
-
-        decision_tree = self._decode_response(resp)
-
-        return decision_tree
+        key = ("generator", generator_id, timestamp, version)
+        return self._request_decision_tree(key, req_url)
 
     def get_generator_decision_tree(
         self, generator_id, timestamp=None, version=DEFAULT_DECISION_TREE_VERSION
@@ -522,44 +622,47 @@ class Client(object):
 
         # Raises an error when generator_id is invalid
         self._check_entity_id(generator_id)
-        if self._config["decisionTreeRetrievalTimeout"] is False:
-            # Don't retry
-            return self._get_generator_decision_tree(generator_id, timestamp, version)
 
-        start = current_time_ms()
-        while True:
-            now = current_time_ms()
-            if now - start > self._config["decisionTreeRetrievalTimeout"]:
-                # Client side timeout
-                raise CraftAiLongRequestTimeOutError()
-            try:
-                return self._get_generator_decision_tree(
+        key = ("generator", generator_id, timestamp, version)
+        decision_tree = self._get_cached_tree(key)
+        if decision_tree is None:
+            decision_tree = self._poll_long_request(
+                lambda: self._get_generator_decision_tree(
                     generator_id, timestamp, version
                 )
-            except CraftAiLongRequestTimeOutError:
-                # Do nothing and continue.
-                continue
+            )
+        return decision_tree
 
     def _get_generators_decision_trees_bulk(
-        self, payload, valid_indices, invalid_indices, invalid_dts
+        self, payload, valid_indices, invalid_indices, invalid_dts, version
     ):
         """Tool for the function get_generators_decision_trees_bulk.
 
-        :param list payload: contains the informations necessary for getting
-        the trees. Its form is the same than for the function.
-        _get_generators_decision_trees_bulk.
+        :param list payload: the entities of the payload of the function
+        get_generators_decision_trees_bulk having a valid id, already encoded.
         :param list valid_indices: list of the indices of the valid generator id.
         :param list invalid_indices: list of the indices of the valid generator id.
         :param list invalid_dts: list of the invalid generator id.
+        :param str version: version of the trees to get.
 
         :return: decision trees.
         :rtype: list of dict.
         """
-        valid_dts = self._create_and_send_json_bulk(
-            [payload[i] for i in valid_indices],
+        caches_trees = self.tree_cache is not None or self.tree_store is not None
+        response = self._create_and_send_json_bulk(
+            payload,
             "{}/bulk/generators/tree".format(self._base_url),
             "POST",
+            self._tree_headers(version),
+            encoded_items=caches_trees,
         )
+        if caches_trees:
+            valid_dts, encoded_trees = response
+            self._cache_trees_bulk(
+                "generator", payload, valid_dts, encoded_trees, version
+            )
+        else:
+            valid_dts = response
 
         if invalid_indices == []:
             return valid_dts
@@ -593,57 +696,78 @@ class Client(object):
         """
         if isinstance(version, int):
             version = str(version)
-        self._requests_session.headers["x-craft-ai-tree-version"] = version
 
         # Check all ids, raise an error if all ids are invalid
-        valid_indices, invalid_indices, invalid_dts = self._check_entity_id_bulk(
-            payload
+        (
+            valid_indices,
+            invalid_indices,
+            invalid_dts,
+            encoded_payload,
+        ) = self._encode_entities_bulk(payload)
+
+        (
+            cached_indices,
+            cached_dts,
+            valid_indices,
+            encoded_payload,
+        ) = self._get_cached_trees_bulk(
+            "generator", payload, valid_indices, encoded_payload, version
         )
-
-        if self._config["decisionTreeRetrievalTimeout"] is False:
-            # Don't retry
-            return self._get_generators_decision_trees_bulk(
-                payload, valid_indices, invalid_indices, invalid_dts
-            )
-        start = current_time_ms()
-        while True:
-            now = current_time_ms()
-            if now - start > self._config["decisionTreeRetrievalTimeout"]:
-                # Client side timeout
-                raise CraftAiLongRequestTimeOutError()
-            try:
-                return self._get_generators_decision_trees_bulk(
-                    payload, valid_indices, invalid_indices, invalid_dts
+        if not cached_indices:
+            return self._poll_long_request(
+                lambda: self._get_generators_decision_trees_bulk(
+                    encoded_payload,
+                    valid_indices,
+                    invalid_indices,
+                    invalid_dts,
+                    version,
                 )
-            except CraftAiLongRequestTimeOutError:
-                # Do nothing and continue.
-                continue
-
-    def _get_generator_operations_pages(self, url, ops_list):
-        if url is None:
-            return ops_list
-
-        resp = self._requests_session.get(url)
-
-        new_ops_list = self._decode_response(resp)
-        next_page_url = resp.headers.get("x-craft-ai-next-page-url")
+            )
 
-        return self._get_generator_operations_pages(
-            next_page_url, ops_list + new_ops_list
+        valid_dts = []
+        if valid_indices:
+            valid_dts = self._poll_long_request(
+                lambda: self._get_generators_decision_trees_bulk(
+                    encoded_payload, valid_indices, [], [], version
+                )
+            )
+        # Put the cached, requested and invalid decision trees in their original index
+        return self._recreate_list_with_indices(
+            cached_indices + valid_indices,
+            cached_dts + valid_dts,
+            invalid_indices,
+            invalid_dts,
         )
 
-    def get_generator_operations(self, generator_id, start=None, end=None):
+    def iter_generator_operations(
+        self, generator_id, start=None, end=None, by_page=False
+    ):
+        """Iterate lazily over the operations of a generator.
+
+        :param str generator_id: the id of the generator. It must be an str
+        containing only characters in "a-zA-Z0-9_-" and must be between 1 and
+        36 characters.
+        :param int start: Optional. Timestamp of the first operation.
+        :param int end: Optional. Timestamp of the last operation.
+        :param bool by_page: Optional. If True, yield the pages of operations, as
+        sent by the API, instead of the operations.
+        :default by_page: False.
+
+        :return: the operations, or their pages. Up to `operationsPagesPrefetch`
+        pages are downloaded in the background ahead of the consumed one.
+        :rtype: generator.
+        """
         # Raises an error when generator_id is invalid
         self._check_entity_id(generator_id)
 
         req_url = "{}/generators/{}/context".format(self._base_url, generator_id)
-        req_params = {"start": start, "end": end}
-        resp = self._requests_session.get(req_url, params=req_params)
-
-        initial_ops_list = self._decode_response(resp)
-        next_page_url = resp.headers.get("x-craft-ai-next-page-url")
+        return self._iter_pages(req_url, {"start": start, "end": end}, by_page)
 
-        return self._get_generator_operations_pages(next_page_url, initial_ops_list)
+    def get_generator_operations(self, generator_id, start=None, end=None):
+        operations = []
+        for page in self.iter_generator_operations(generator_id, start, end, True):
+            operations.extend(page)
+        return operations
 
     ###################
     # Context methods #
@@ -656,7 +780,8 @@ class Client(object):
         between 1 and 36 characters. It must reference an existing agent.
         :param list operations: Contains dictionnaries that has the
         form given in the craft_ai documentation and the configuration
-        of the agent.
+        of the agent, or the already encoded operations as
+        `craft_ai.helpers.EncodedOperations`.
 
         :return: message about the added operations.
         :rtype: str
@@ -664,44 +789,114 @@ class Client(object):
         :raise CraftAiBadRequestError: if the input is not of
         the right form.
         """
+        return self._add_agent_operations(agent_id, operations)
+
+    def _add_agent_operations(self, agent_id, operations, workers=None):
         # Raises an error when agent_id is invalid
         self._check_entity_id(agent_id)
 
-        # Extra header in addition to the main session's
-        ct_header = {"Content-Type": "application/json; charset=utf-8"}
-        offset = 0
+        req_url = "{}/agents/{}/context".format(self._base_url, agent_id)
         added_operations_count = 0
+        for future in map_ordered(
+            lambda chunk: self._post_operations_chunk(req_url, *chunk),
+            self._encode_operations_chunks(operations),
+            workers or self.config["operationsChunksConcurrency"],
+            self.config["operationsChunksWindow"],
+        ):
+            added_operations_count += future.result()
+
+        return {
+            "message": f'Successfully added {added_operations_count} operation(s) to \
+                the agent "{self.config["owner"]}/{self.config["project"]}/{agent_id}" context.',
+            "added_operations_count": added_operations_count,
+        }
 
-        is_looping = True
+    def _encode_operations_chunks(self, operations):
+        """Split the operations in chunks of at most `operationsChunksSize`
+        operations, themselves split until their JSON encoding is at most
+        `operationsChunksMaxBytes` long.
 
-        while is_looping:
+        :return: generator of the chunks of operations along with their encoding.
+        """
+        offset = 0
+        while True:
             next_offset = offset + self.config["operationsChunksSize"]
+            yield from self._split_operations_chunk(operations[offset:next_offset])
 
-            try:
-                json_pl = json.dumps(operations[offset:next_offset])
-            except TypeError as err:
-                raise CraftAiBadRequestError(
-                    "Invalid configuration or agent id given. {}".format(err.__str__())
-                )
+            if next_offset >= len(operations):
+                return
+            offset = next_offset
 
-            req_url = "{}/agents/{}/context".format(self._base_url, agent_id)
-            resp = self._requests_session.post(req_url, headers=ct_header, data=json_pl)
-            decoded_response = self._decode_response(resp)
+    def _split_operations_chunk(self, operations, json_pl=None):
+        """Split a chunk of operations in smaller chunks of similar sizes until
+        their JSON encoding is at most `operationsChunksMaxBytes` long.
+
+        :param list operations: the chunk of operations.
+        :param json_pl: Optional. The encoding of the chunk, if already known.
 
-            added_operations_count += extract_operations_count_from_message(
-                decoded_response["message"]
+        :return: generator of the chunks of operations along with their encoding.
+        """
+        if json_pl is None:
+            json_pl = self._encode_operations(operations)
+        # Ceiling of the division
+        parts = min(
+            -(-encoded_size(json_pl) // self._operations_chunks_max_bytes),
+            len(operations),
+        )
+        if parts <= 1:
+            yield operations, json_pl
+            return
+        for part in range(parts):
+            yield from self._split_operations_chunk(
+                operations[
+                    part
+                    * len(operations)
+                    // parts : (part + 1)
+                    * len(operations)
+                    // parts
+                ]
             )
 
-            if next_offset >= len(operations):
-                is_looping = False
+    @staticmethod
+    def _encode_operations(operations):
+        try:
+            if isinstance(operations, EncodedOperations):
+                return join_json_fragments(operations)
+            return codec.encode(operations)
+        except TypeError as err:
+            raise CraftAiBadRequestError(
+                "Invalid configuration or agent id given. {}".format(err.__str__())
+            )
 
-            offset = next_offset
+    def _lower_operations_chunks_max_bytes(self, rejected_size):
+        """Lower the size of the next chunks after the craft ai API rejected a
+        request body of `rejected_size` as too large."""
+        self._operations_chunks_max_bytes = max(
+            min(self._operations_chunks_max_bytes, rejected_size // 2), 1
+        )
 
-        return {
-            "message": f'Successfully added {added_operations_count} operation(s) to \
-                the agent "{self.config["owner"]}/{self.config["project"]}/{agent_id}" context.',
-            "added_operations_count": added_operations_count,
-        }
+    def _post_operations_chunk(self, req_url, operations, json_pl):
+        """Post a chunk of operations, it is split and posted again in smaller
+        chunks if the craft ai API rejects it as too large.
+
+        :return: the number of added operations.
+        :rtype: int.
+        """
+        # Extra header in addition to the main session's
+        ct_header = {"Content-Type": "application/json; charset=utf-8"}
+        ct_header, body = self._compress_request(ct_header, json_pl)
+        try:
+            resp = self._requests_session.post(req_url, headers=ct_header, data=body)
+            decoded_response = self._decode_response(resp)
+        except CraftAiPayloadTooLargeError:
+            if len(operations) <= 1:
+                raise
+            self._lower_operations_chunks_max_bytes(encoded_size(json_pl))
+            return sum(
+                self._post_operations_chunk(req_url, *chunk)
+                for chunk in self._split_operations_chunk(operations, json_pl)
+            )
+        return extract_operations_count_from_message(decoded_response["message"])
 
     def _add_agents_operations_bulk(self, chunked_data):
         """Tool for the function add_agents_operations_bulk. It send the requests to
@@ -711,54 +906,253 @@ class Client(object):
         to add. Each chunk can be requested at the same time.
 
         :return: list of agents containing a message about the added
-        operations.
+        operations, or the error of their chunk when it failed.
         :rtype: list of dict.
 
         :raises CraftAiBadRequestError: if the input is not of the right form.
         """
-        url = "{}/bulk/context".format(self._base_url)
-        ct_header = {"Content-Type": "application/json; charset=utf-8"}
-
-        responses = []
-        for chunk in chunked_data:
-            if len(chunk) > 1:
+        chunked_data = [chunk for chunk in chunked_data if chunk]
+        # A lone chunk has the whole concurrency for itself
+        agent_workers = 1 if len(chunked_data) > 1 else None
+        dependencies = self._chunks_dependencies(chunked_data)
+        sent = [threading.Event() for _ in chunked_data]
+        failed_parts = {}
+
+        def add_chunk(index):
+            # The chunks being started in order, the awaited ones are already sent
+            for dependency in dependencies[index]:
+                sent[dependency].wait()
+            try:
+                chunk, skipped = self._skip_failed_parts(
+                    chunked_data[index], failed_parts
+                )
                 try:
-                    json_pl = json.dumps(chunk)
-                except TypeError as err:
-                    raise CraftAiBadRequestError(
-                        "Error while dumping the payload into json"
-                        "format when converting it for the bulk request. {}".format(
-                            err.__str__()
-                        )
+                    result = (
+                        self._add_agents_operations_chunk(chunk, agent_workers)
+                        if chunk
+                        else []
                     )
-                resp = self._requests_session.post(url, headers=ct_header, data=json_pl)
-                decoded_response = self._decode_response(resp)
-                responses += [
-                    {
-                        **r,
-                        "added_operations_count": extract_operations_count_from_message(
-                            r["message"]
-                        ),
-                    }
-                    for r in decoded_response
-                ]
-            elif chunk:
-                add_agent_operations_response = self.add_agent_operations(
-                    chunk[0]["id"], chunk[0]["operations"]
-                )
-                responses.append(
+                except Exception as err:  # pylint: disable=broad-except
+                    self._record_failed_parts(chunk, err, failed_parts)
+                    raise
+                self._record_failed_parts(chunk, result, failed_parts)
+                return result + skipped
+            finally:
+                sent[index].set()
+
+        def result_or_error(future):
+            try:
+                return future.result()
+            except (CraftAiError, requests.exceptions.RequestException) as err:
+                return err
+
+        results = [
+            result_or_error(future)
+            for future in map_ordered(
+                add_chunk,
+                range(len(chunked_data)),
+                self.config["operationsChunksConcurrency"],
+                self.config["operationsChunksWindow"],
+            )
+        ]
+        return self._gather_chunks_responses(chunked_data, results)
+
+    @staticmethod
+    def _chunks_dependencies(chunked_data):
+        """Give the chunks to be sent before each chunk, for the parts of the
+        operations of an agent to be sent in order.
+
+        :return: for each chunk, the indices of the previous chunks holding a part
+        of the operations of one of its agents.
+        :rtype: list of list of int.
+        """
+        dependencies = []
+        last_chunk_of_agent = {}
+        for index, chunk in enumerate(chunked_data):
+            dependencies.append(
+                sorted(
                     {
-                        "id": chunk[0]["id"],
-                        "status": 201,
-                        **add_agent_operations_response,
+                        last_chunk_of_agent[agent["id"]]
+                        for agent in chunk
+                        if agent["id"] in last_chunk_of_agent
                     }
                 )
+            )
+            for agent in chunk:
+                last_chunk_of_agent[agent["id"]] = index
+        return dependencies
+
+    @staticmethod
+    def _skip_failed_parts(chunk, failed_parts):
+        """Remove from a chunk the parts of the agents of which a previous part
+        failed, the later operations of an agent are not added after a failure.
+
+        :param dict failed_parts: the response of the failed part of each agent.
+
+        :return: the agents to send and the responses of the removed parts, those
+        of the failed parts.
+        :rtype: tuple of two lists.
+        """
+        if not failed_parts:
+            return chunk, []
+        agents = []
+        skipped = []
+        for agent in chunk:
+            if agent["id"] in failed_parts:
+                skipped.append(failed_parts[agent["id"]])
+            else:
+                agents.append(agent)
+        return agents, skipped
+
+    @staticmethod
+    def _record_failed_parts(chunk, result, failed_parts):
+        """Record the agents of a sent chunk whose part failed.
+
+        :param result: the responses of the agents of the chunk or the error
+        raised by its request.
+        :param dict failed_parts: the response of the failed part of each agent.
+        """
+        if isinstance(result, Exception):
+            result = [{"id": agent["id"], "error": result} for agent in chunk]
+        for response in result:
+            if "error" in response or response.get("status") not in [200, 201]:
+                failed_parts.setdefault(response.get("id"), response)
+
+    def _gather_chunks_responses(self, chunked_data, results):
+        """Gather the responses of the agents of each chunk.
+
+        :param list chunked_data: the chunks of agents and their operations.
+        :param list results: for each chunk, the responses of its agents or the
+        error raised by its request.
+
+        :return: list of agents containing a message about the added
+        operations, or the error of their chunk when it failed.
+        :rtype: list of dict.
+
+        :raises CraftAiError: the error of the first chunk if all of them failed.
+        """
+        responses = []
+        errors = []
+        for chunk, result in zip(chunked_data, results):
+            if isinstance(result, Exception):
+                # The failure of a chunk does not prevent the others to be added
+                errors.append(result)
+                responses += [{"id": agent["id"], "error": result} for agent in chunk]
+            else:
+                responses += result
+
+        if chunked_data and len(errors) == len(chunked_data):
+            raise errors[0]
 
         if responses == []:
             raise CraftAiBadRequestError("Invalid or empty set of operations given")
 
+        split_agents_ids = {
+            agent["id"]
+            for chunk in chunked_data
+            for agent in chunk
+            if isinstance(agent, AgentOperationsPart)
+        }
+        if split_agents_ids:
+            return self._merge_parts_responses(responses, split_agents_ids)
         return responses
 
+    def _merge_parts_responses(self, responses, split_agents_ids):
+        """Merge the responses of the parts of the operations of each split agent.
+
+        :return: the responses with a single response for each agent, the added
+        operations being counted over all its parts. An agent of which a part
+        failed gets the response of the first failing part.
+        :rtype: list of dict.
+        """
+        merged_responses = []
+        agents_responses = {}
+        for response in responses:
+            agent_id = response.get("id")
+            if agent_id not in split_agents_ids:
+                merged_responses.append(response)
+            elif agent_id not in agents_responses:
+                agents_responses[agent_id] = [response]
+                merged_responses.append(agent_id)
+            else:
+                agents_responses[agent_id].append(response)
+
+        def merge(agent_id):
+            parts_responses = agents_responses[agent_id]
+            for response in parts_responses:
+                if "error" in response or response.get("status") not in [200, 201]:
+                    return response
+            added_operations_count = sum(
+                response["added_operations_count"] for response in parts_responses
+            )
+            return {
+                "id": agent_id,
+                "status": 201,
+                "message": "Successfully added {} operation(s) to the agent "
+                '"{}/{}/{}" context.'.format(
+                    added_operations_count,
+                    self.config["owner"],
+                    self.config["project"],
+                    agent_id,
+                ),
+                "added_operations_count": added_operations_count,
+            }
+
+        return [
+            merge(response) if isinstance(response, str) else response
+            for response in merged_responses
+        ]
+
+    def _add_agents_operations_chunk(self, chunk, agent_workers=None):
+        if len(chunk) == 1:
+            add_agent_operations_response = self._add_agent_operations(
+                chunk[0]["id"], chunk[0]["operations"], agent_workers
+            )
+            return [
+                {"id": chunk[0]["id"], "status": 201, **add_agent_operations_response}
+            ]
+
+        json_pl = self._encode_agents_operations(chunk)
+        url = "{}/bulk/context".format(self._base_url)
+        ct_header = {"Content-Type": "application/json; charset=utf-8"}
+        ct_header, body = self._compress_request(ct_header, json_pl)
+        try:
+            resp = self._requests_session.post(url, headers=ct_header, data=body)
+            return self._count_added_operations(self._decode_response(resp))
+        except CraftAiPayloadTooLargeError:
+            # Send each half of the agents on its own
+            self._lower_operations_chunks_max_bytes(encoded_size(json_pl))
+            middle = len(chunk) // 2
+            return self._add_agents_operations_chunk(
+                chunk[:middle], agent_workers
+            ) + self._add_agents_operations_chunk(chunk[middle:], agent_workers)
+
+    @staticmethod
+    def _encode_agents_operations(chunk):
+        try:
+            return join_json_fragments(
+                [encode_agent_operations(agent) for agent in chunk]
+            )
+        except TypeError as err:
+            raise CraftAiBadRequestError(
+                "Error while dumping the payload into json"
+                "format when converting it for the bulk request. {}".format(
+                    err.__str__()
+                )
+            )
+
+    @staticmethod
+    def _count_added_operations(decoded_response):
+        return [
+            {
+                **r,
+                "added_operations_count": extract_operations_count_from_message(
+                    r["message"]
+                ),
+            }
+            for r in decoded_response
+        ]
+
     def add_agents_operations_bulk(self, payload):
         """Add operations to a group of agents.
 
@@ -778,81 +1172,201 @@ class Client(object):
         referenced non existing agents or one of the operations is invalid.
         """
         # Check all ids, raise an error if all ids are invalid
-        valid_indices, _, _ = self._check_entity_id_bulk(payload)
-        valid_payload = [payload[i] for i in valid_indices]
+        valid_payload = self._encode_agents_operations_bulk(payload)
+
+        return self._add_agents_operations_bulk(
+            self._chunk_agents_operations(valid_payload)
+        )
+
+    def _encode_agents_operations_bulk(self, payload):
+        """Check the ids of the agents and encode each agent once.
+
+        Agents having more than `operationsChunksSize` operations are sent alone,
+        chunk by chunk, so their operations are only encoded when they are sent.
+
+        :return: the agents having a valid id, along with their encoding.
+        :rtype: list of dict.
+        """
+
+        def encode(agent):
+            operations = agent.get("operations")
+            if (
+                isinstance(operations, list)
+                and len(operations) > self.config["operationsChunksSize"]
+            ):
+                return None
+            return encode_agent_operations(agent)
+
+        valid_indices, _, _, encoded_agents = self._encode_entities_bulk(
+            payload, encode
+        )
+        return [
+            payload[index]
+            if encoded is None
+            else EncodedEntity(payload[index], encoded)
+            for index, encoded in zip(valid_indices, encoded_agents)
+        ]
+
+    def _chunk_agents_operations(self, valid_payload):
+        """Group the agents in chunks of at most `operationsChunksSize` operations
+        and `operationsChunksMaxBytes` bytes of JSON.
+
+        The operations of the agents too large for a chunk are split in parts
+        filling the chunks. The agents take turns to fill the chunks so that the
+        consecutive parts of an agent, sent in order, are spread over the chunks.
+        A lone agent is kept whole, its operations are chunked when they are sent.
+        """
+        agents = [
+            agent
+            for agent in valid_payload
+            if agent["operations"] and isinstance(agent["operations"], list)
+        ]
+        if len(agents) == 1:
+            return [agents]
 
         chunked_data = []
         current_chunk = []
         current_chunk_size = 0
+        current_chunk_bytes = 0
+        max_size = self.config["operationsChunksSize"]
+        max_bytes = self._operations_chunks_max_bytes
+
+        # Agents along with the offset of their operations not chunked yet
+        pending_agents = deque((agent, 0) for agent in agents)
+        while pending_agents:
+            agent, offset = pending_agents.popleft()
+            if (
+                offset == 0
+                and isinstance(agent, EncodedEntity)
+                and len(agent["operations"]) <= max_size
+                and agent.size <= max_bytes
+            ):
+                part = agent
+            else:
+                room = max_size - current_chunk_size
+                part = self._agent_operations_part(
+                    agent, offset, room if room > 0 else max_size
+                )
 
-        for agent in valid_payload:
-            if agent["operations"] and isinstance(agent["operations"], list):
-                if (
-                    current_chunk_size + len(agent["operations"])
-                    > self.config["operationsChunksSize"]
-                ):
-                    chunked_data.append(current_chunk)
-                    current_chunk_size = 0
-                    current_chunk = []
-                if len(agent["operations"]) > self.config["operationsChunksSize"]:
-                    chunked_data.append([agent])
-                    current_chunk_size = 0
-                else:
-                    current_chunk_size += len(agent["operations"])
-                    current_chunk.append(agent)
+            if current_chunk and (
+                current_chunk_size + len(part["operations"]) > max_size
+                or current_chunk_bytes + part.size > max_bytes
+            ):
+                chunked_data.append(current_chunk)
+                current_chunk_size = 0
+                current_chunk_bytes = 0
+                current_chunk = []
+            current_chunk_size += len(part["operations"])
+            current_chunk_bytes += part.size
+            current_chunk.append(part)
+
+            offset += len(part["operations"])
+            if offset < len(agent["operations"]):
+                pending_agents.append((agent, offset))
 
         if current_chunk:
             chunked_data.append(current_chunk)
 
-        return self._add_agents_operations_bulk(chunked_data)
-
-    def _get_agent_operations_pages(self, url, ops_list):
-        if url is None:
-            return ops_list
-
-        resp = self._requests_session.get(url)
+        return chunked_data
 
-        new_ops_list = self._decode_response(resp)
-        next_page_url = resp.headers.get("x-craft-ai-next-page-url")
+    def _agent_operations_part(self, agent, offset, size):
+        """Give the next part of the operations of an agent.
 
-        return self._get_agent_operations_pages(next_page_url, ops_list + new_ops_list)
+        :param dict agent: the agent and its operations.
+        :param int offset: the index of the first operation of the part.
+        :param int size: the maximum number of operations of the part, it has less
+        operations if their JSON is larger than `operationsChunksMaxBytes`.
 
-    def get_agent_operations(self, agent_id, start=None, end=None):
+        :rtype: craft_ai.helpers.AgentOperationsPart.
+        """
+        operations = agent["operations"][offset : offset + size]
+        json_pl = self._encode_operations(operations)
+        # Ceiling of the division
+        parts = -(-encoded_size(json_pl) // self._operations_chunks_max_bytes)
+        while parts > 1 and len(operations) > 1:
+            operations = operations[: max(len(operations) // parts, 1)]
+            json_pl = self._encode_operations(operations)
+            parts = -(-encoded_size(json_pl) // self._operations_chunks_max_bytes)
+        return AgentOperationsPart(agent["id"], operations, json_pl)
+
+    def _iter_pages(self, url, params, by_page):
+        pages = self._iter_pages_content(url, params)
+        if by_page:
+            return pages
+        return (item for page in pages for item in page)
+
+    def _iter_pages_responses(self, url, params):
+        resp = self._requests_session.get(url, params=params)
+        while True:
+            yield resp
+            # The next page is known from the headers, it is requested before
+            # the body of the current one is decoded.
+            next_page_url = resp.headers.get("x-craft-ai-next-page-url")
+            if next_page_url is None:
+                return
+            resp = self._requests_session.get(next_page_url)
+
+    def _iter_pages_content(self, url, params):
+        responses = prefetch(
+            self._iter_pages_responses(url, params),
+            self.config["operationsPagesPrefetch"],
+        )
+        for resp in responses:
+            yield self._decode_response(resp)
+
+    def iter_agent_operations(self, agent_id, start=None, end=None, by_page=False):
+        """Iterate lazily over the operations of an agent.
+
+        :param str agent_id: the id of the agent. It must be an str containing
+        only characters in "a-zA-Z0-9_-" and must be between 1 and 36 characters.
+        :param int start: Optional. Timestamp of the first operation.
+        :param int end: Optional. Timestamp of the last operation.
+        :param bool by_page: Optional. If True, yield the pages of operations, as
+        sent by the API, instead of the operations.
+        :default by_page: False.
+
+        :return: the operations, or their pages. Up to `operationsPagesPrefetch`
+        pages are downloaded in the background ahead of the consumed one.
+        :rtype: generator.
+        """
         # Raises an error when agent_id is invalid
         self._check_entity_id(agent_id)
 
         req_url = "{}/agents/{}/context".format(self._base_url, agent_id)
-        req_params = {"start": start, "end": end}
-        resp = self._requests_session.get(req_url, params=req_params)
-
-        initial_ops_list = self._decode_response(resp)
-        next_page_url = resp.headers.get("x-craft-ai-next-page-url")
-
-        return self._get_agent_operations_pages(next_page_url, initial_ops_list)
-
-    def _get_agent_states_pages(self, url, states):
-        if url is None:
-            return states
+        return self._iter_pages(req_url, {"start": start, "end": end}, by_page)
 
-        resp = self._requests_session.get(url)
-
-        new_states = self._decode_response(resp)
-        next_page_url = resp.headers.get("x-craft-ai-next-page-url")
-
-        return self._get_agent_states_pages(next_page_url, states + new_states)
-
-    def get_agent_states(self, agent_id, start=None, end=None):
+    def get_agent_operations(self, agent_id, start=None, end=None):
+        operations = []
+        for page in self.iter_agent_operations(agent_id, start, end, True):
+            operations.extend(page)
+        return operations
+
+    def iter_agent_states(self, agent_id, start=None, end=None, by_page=False):
+        """Iterate lazily over the state history of an agent.
+
+        :param str agent_id: the id of the agent. It must be an str containing
+        only characters in "a-zA-Z0-9_-" and must be between 1 and 36 characters.
+        :param int start: Optional. Timestamp of the first state.
+        :param int end: Optional. Timestamp of the last state.
+        :param bool by_page: Optional. If True, yield the pages of states, as
+        sent by the API, instead of the states.
+        :default by_page: False.
+
+        :return: the states, or their pages. Up to `operationsPagesPrefetch` pages
+        are downloaded in the background ahead of the consumed one.
+        :rtype: generator.
+        """
         # Raises an error when agent_id is invalid
         self._check_entity_id(agent_id)
 
         req_url = "{}/agents/{}/context/state/history".format(self._base_url, agent_id)
-        req_params = {"start": start, "end": end}
-        resp = self._requests_session.get(req_url, params=req_params)
-
-        initial_states_history = self._decode_response(resp)
-        next_page_url = resp.headers.get("x-craft-ai-next-page-url")
+        return self._iter_pages(req_url, {"start": start, "end": end}, by_page)
 
-        return self._get_agent_states_pages(next_page_url, initial_states_history)
+    def get_agent_states(self, agent_id, start=None, end=None):
+        states = []
+        for page in self.iter_agent_states(agent_id, start, end, True):
+            states.extend(page)
+        return states
 
     def get_agent_state(self, agent_id, timestamp):
         # Raises an error when agent_id is invalid
@@ -890,8 +1404,6 @@ class Client(object):
         :return: decision tree.
         :rtype: dict.
         """
-        self._requests_session.headers["x-craft-ai-tree-version"] = version
-
         # If we give no timestamp the default behaviour is to give
         # the tree from the latest timestamp
         if timestamp is None:
@@ -901,11 +1413,8 @@ class Client(object):
                 self._base_url, agent_id, timestamp
             )
 
-        resp = self._requests_session.get(req_url)
-
-        decision_tree = self._decode_response(resp)
-
-        return decision_tree
+        key = ("agent", agent_id, timestamp, version)
+        return self._request_decision_tree(key, req_url)
 
     def get_agent_decision_tree(
         self, agent_id, timestamp=None, version=DEFAULT_DECISION_TREE_VERSION
@@ -938,42 +1447,43 @@ class Client(object):
 
         # Raises an error when agent_id is invalid
         self._check_entity_id(agent_id)
-        if self._config["decisionTreeRetrievalTimeout"] is False:
-            # Don't retry
-            return self._get_agent_decision_tree(agent_id, timestamp, version)
 
-        start = current_time_ms()
-        while True:
-            now = current_time_ms()
-            if now - start > self._config["decisionTreeRetrievalTimeout"]:
-                # Client side timeout
-                raise CraftAiLongRequestTimeOutError()
-            try:
-                return self._get_agent_decision_tree(agent_id, timestamp, version)
-            except CraftAiLongRequestTimeOutError:
-                # Do nothing and continue.
-                continue
+        key = ("agent", agent_id, timestamp, version)
+        decision_tree = self._get_cached_tree(key)
+        if decision_tree is None:
+            decision_tree = self._poll_long_request(
+                lambda: self._get_agent_decision_tree(agent_id, timestamp, version)
+            )
+        return decision_tree
 
     def _get_agents_decision_trees_bulk(
-        self, payload, valid_indices, invalid_indices, invalid_dts
+        self, payload, valid_indices, invalid_indices, invalid_dts, version
     ):
         """Tool for the function get_agents_decision_trees_bulk.
 
-        :param list payload: contains the informations necessary for getting
-        the trees. Its form is the same than for the function.
-        get_agents_decision_trees_bulk.
+        :param list payload: the entities of the payload of the function
+        get_agents_decision_trees_bulk having a valid id, already encoded.
         :param list valid_indices: list of the indices of the valid agent id.
         :param list invalid_indices: list of the indices of the valid agent id.
         :param list invalid_dts: list of the invalid agent id.
+        :param str version: version of the trees to get.
 
         :return: decision trees.
         :rtype: list of dict.
         """
-        valid_dts = self._create_and_send_json_bulk(
-            [payload[i] for i in valid_indices],
+        caches_trees = self.tree_cache is not None or self.tree_store is not None
+        response = self._create_and_send_json_bulk(
+            payload,
             "{}/bulk/decision_tree".format(self._base_url),
             "POST",
+            self._tree_headers(version),
+            encoded_items=caches_trees,
         )
+        if caches_trees:
+            valid_dts, encoded_trees = response
+            self._cache_trees_bulk("agent", payload, valid_dts, encoded_trees, version)
+        else:
+            valid_dts = response
 
         if invalid_indices == []:
             return valid_dts
@@ -1007,40 +1517,273 @@ class Client(object):
         """
         if isinstance(version, int):
             version = str(version)
-        self._requests_session.headers["x-craft-ai-tree-version"] = version
 
         # Check all ids, raise an error if all ids are invalid
-        valid_indices, invalid_indices, invalid_dts = self._check_entity_id_bulk(
-            payload
+        (
+            valid_indices,
+            invalid_indices,
+            invalid_dts,
+            encoded_payload,
+        ) = self._encode_entities_bulk(payload)
+
+        (
+            cached_indices,
+            cached_dts,
+            valid_indices,
+            encoded_payload,
+        ) = self._get_cached_trees_bulk(
+            "agent", payload, valid_indices, encoded_payload, version
         )
-
-        if self._config["decisionTreeRetrievalTimeout"] is False:
-            # Don't retry
-            return self._get_agents_decision_trees_bulk(
-                payload, valid_indices, invalid_indices, invalid_dts
+        if not cached_indices:
+            return self._poll_long_request(
+                lambda: self._get_agents_decision_trees_bulk(
+                    encoded_payload,
+                    valid_indices,
+                    invalid_indices,
+                    invalid_dts,
+                    version,
+                )
             )
-        start = current_time_ms()
-        while True:
-            now = current_time_ms()
-            if now - start > self._config["decisionTreeRetrievalTimeout"]:
-                # Client side timeout
-                raise CraftAiLongRequestTimeOutError()
-            try:
-                return self._get_agents_decision_trees_bulk(
-                    payload, valid_indices, invalid_indices, invalid_dts
+
+        valid_dts = []
+        if valid_indices:
+            valid_dts = self._poll_long_request(
+                lambda: self._get_agents_decision_trees_bulk(
+                    encoded_payload, valid_indices, [], [], version
                 )
-            except CraftAiLongRequestTimeOutError:
-                # Do nothing and continue.
+            )
+        # Put the cached, requested and invalid decision trees in their original index
+        return self._recreate_list_with_indices(
+            cached_indices + valid_indices,
+            cached_dts + valid_dts,
+            invalid_indices,
+            invalid_dts,
+        )
+
+    @staticmethod
+    def _tree_headers(version):
+        # The trees are large and very compressible
+        return {"x-craft-ai-tree-version": version, "Accept-Encoding": "gzip, deflate"}
+
+    def _tree_request_headers(self, key):
+        """Give the headers of the request of the decision tree of `key`.
+
+        A latest tree in the cache having validators is requested conditionally.
+
+        :return: the headers and the cached tree along with its validators, None
+        if the request is not conditional.
+        :rtype: tuple.
+        """
+        headers = self._tree_headers(key[3])
+        revalidable = None
+        if key[2] is None and self.tree_cache is not None:
+            revalidable = self.tree_cache.get_validators(key)
+        if revalidable is not None:
+            headers.update(revalidable[1])
+        return headers, revalidable
+
+    def _request_decision_tree(self, key, req_url):
+        """Request the decision tree of `key`, conditionally if it is cached.
+
+        :return: decision tree.
+        :rtype: dict.
+        """
+        headers, revalidable = self._tree_request_headers(key)
+        resp = self._requests_session.get(req_url, headers=headers)
+        decision_tree = self._decode_tree_response(key, resp, revalidable)
+        if decision_tree is None:
+            # Not modified, but the cached tree was evicted in the meantime
+            resp = self._requests_session.get(
+                req_url, headers=self._tree_headers(key[3])
+            )
+            decision_tree = self._decode_tree_response(key, resp)
+        return decision_tree
+
+    def _decode_tree_response(self, key, response, revalidable=None):
+        """Decode the decision tree of `key` and cache it.
+
+        :param revalidable: Optional. The cached tree along with its validators, when
+        the request is conditional.
+
+        :return: decision tree, the cached one if it is not modified, None if it
+        is not modified but no longer cached.
+        :rtype: dict.
+        """
+        if response.status_code == 304 and revalidable is not None:
+            return self.tree_cache.revalidate(key, self._tree_cache_ttl(key))
+
+        decision_tree = self._decode_response(response)
+        validators = {}
+        if key[2] is None:
+            if response.headers.get("ETag"):
+                validators["If-None-Match"] = response.headers["ETag"]
+            if response.headers.get("Last-Modified"):
+                validators["If-Modified-Since"] = response.headers["Last-Modified"]
+        self._cache_tree(
+            key,
+            decision_tree,
+            len(response.content),
+            validators=validators,
+            encoded_tree=response.content,
+        )
+        return decision_tree
+
+    def _tree_cache_ttl(self, key):
+        """Number of seconds the tree of `key` is cached, None if it is forever."""
+        if key[2] is None:
+            return self.config["decisionTreeCacheLatestTtl"] / 1000
+        return None
+
+    def _get_cached_tree(self, key):
+        """Give the cached decision tree of `key`, looked up in the cache and then
+        in the store, None if it is in neither.
+
+        :param tuple key: the kind of the entity, "agent" or "generator", its id,
+        the timestamp of the tree and its version.
+        """
+        decision_tree = None
+        if self.tree_cache is not None:
+            decision_tree = self.tree_cache.get(key)
+        if decision_tree is None and self.tree_store is not None:
+            decision_tree, size = self.tree_store.get_with_size(key)
+            if decision_tree is not None and self.tree_cache is not None:
+                self._cache_tree(key, decision_tree, size, store=False)
+        return decision_tree
+
+    def _cache_tree(
+        self, key, decision_tree, size, store=True, validators=None, encoded_tree=None
+    ):
+        """Cache the decision tree of `key`, the latest trees only for
+        `decisionTreeCacheLatestTtl`, and write it in the store.
+
+        :param int size: the size in bytes of the tree as it was received, counted
+        in the byte budget of the cache.
+        :param dict validators: Optional. Headers of the conditional requests of
+        the tree once it is expired.
+        :param bytes encoded_tree: Optional. The JSON encoding of the tree, written
+        in the store. The tree is encoded again when it is not given.
+        """
+        if self.tree_cache is not None:
+            self.tree_cache.set(
+                key, decision_tree, size, self._tree_cache_ttl(key), validators,
+            )
+        if self.tree_store is not None and store and key[2] is not None:
+            if encoded_tree is None:
+                encoded_tree = codec.encode(decision_tree)
+            self.tree_store.set(key, encoded_tree)
+
+    def _get_cached_trees_bulk(
+        self, kind, payload, valid_indices, encoded_payload, version
+    ):
+        """Split the valid entities of a bulk payload between the ones whose
+        decision tree is cached and the ones whose tree has to be requested.
+
+        :param str kind: the kind of the entities, "agent" or "generator".
+
+        :return: the indices of the cached entities, their decision trees, the
+        indices of the other entities and their encodings.
+        :rtype: tuple.
+        """
+        if self.tree_cache is None and self.tree_store is None:
+            return [], [], valid_indices, encoded_payload
+
+        cached_indices = []
+        cached_dts = []
+        missing_indices = []
+        missing_payload = EncodedEntities()
+        for index, encoded_entity in zip(valid_indices, encoded_payload):
+            entity = payload[index]
+            timestamp = entity.get("timestamp")
+            decision_tree = self._get_cached_tree(
+                (kind, entity["id"], timestamp, version)
+            )
+            if decision_tree is None:
+                missing_indices.append(index)
+                missing_payload.append(encoded_entity)
                 continue
+            cached_indices.append(index)
+            if timestamp is None:
+                cached_dts.append({"id": entity["id"], "tree": decision_tree})
+            else:
+                cached_dts.append(
+                    {"id": entity["id"], "tree": decision_tree, "timestamp": timestamp}
+                )
+        return cached_indices, cached_dts, missing_indices, missing_payload
+
+    def _cache_trees_bulk(self, kind, payload, decision_trees, encoded_trees, version):
+        """Cache the decision trees retrieved for the entities of a bulk payload.
+
+        :param list payload: the encoded entities whose trees were requested.
+        :param list decision_trees: the responses of each entity.
+        :param list encoded_trees: the JSON encoding of the response of each entity,
+        whose size is counted in the byte budget of the cache for its tree.
+        """
+        if self.tree_cache is None and self.tree_store is None:
+            return
+        for encoded_entity, response, encoded_response in zip(
+            payload, decision_trees, encoded_trees
+        ):
+            if "tree" in response and "error" not in response:
+                entity = codec.decode(encoded_entity)
+                self._cache_tree(
+                    (kind, entity["id"], entity.get("timestamp"), version),
+                    response["tree"],
+                    len(encoded_response),
+                )
+
+    def _poll_long_request(self, request):
+        """Call `request` until the API has finished the computation.
+
+        While the API answers that the computation is not finished, the request is
+        sent again after a delay given by the backoff configuration, until the
+        `decisionTreeRetrievalTimeout` is reached.
+
+        :param request: function sending the request and returning its result.
+
+        :return: the result of the request.
+
+        :raises CraftAiLongRequestTimeOutError: if the computation is not finished
+        before the timeout.
+        """
+        polls = 0
+        waited = 0
+        try:
+            if self._config["decisionTreeRetrievalTimeout"] is False:
+                # Don't retry
+                polls += 1
+                return request()
+
+            backoff = Backoff.from_config(self._config)
+            start = current_time_ms()
+            while True:
+                polls += 1
+                try:
+                    return request()
+                except CraftAiLongRequestTimeOutError as err:
+                    remaining = self._config["decisionTreeRetrievalTimeout"] - (
+                        current_time_ms() - start
+                    )
+                    if remaining <= 0:
+                        # Client side timeout
+                        raise CraftAiLongRequestTimeOutError()
+                    delay = min(backoff.delay(polls, err), remaining)
+                    time.sleep(delay / 1000)
+                    waited += delay
+        finally:
+            self.polling_stats.record(polls, waited / 1000)
 
     @staticmethod
     def decide(tree, *args):
         return Interpreter.decide(tree, args)
 
+    @staticmethod
+    def decide_many(trees, *args, processes=None):
+        return Interpreter.decide_many(trees, args, processes)
+
     @staticmethod
     def _parse_body(response):
         try:
-            return response.json()
+            return codec.decode(response.content)
         except Exception:
             raise CraftAiInternalError(
                 "Internal Error, the craft ai server responded in an invalid format."
@@ -1058,17 +1801,41 @@ class Client(object):
         """
         status_code = response.status_code
 
+        if status_code in [200, 201, 204, 207]:
+            return Client._parse_body(response)
+
+        # The body is only decoded to look for the message of the error
         message = "Status code " + str(status_code)
         try:
             message = Client._parse_body(response)["message"]
         except (CraftAiInternalError, KeyError, TypeError):
             pass
 
-        if status_code in [200, 201, 204, 207]:
-            return Client._parse_body(response)
-        else:
-            raise Client._get_error_from_status(status_code, message)
-        return None
+        err = Client._get_error_from_status(status_code, message)
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None:
+            err.metadata = {"retryAfter": retry_after}
+        raise err
+
+    @staticmethod
+    def _decode_response_items(response):
+        """Decode the response of a bulk request, along with the JSON encoding of
+        the response of each entity.
+
+        :return: decoded response and the encodings of its items.
+        :rtype: tuple of two lists, of dict and of bytes.
+
+        :raise Error: Raise the error given by the request.
+        """
+        if response.status_code not in [200, 201, 204, 207]:
+            Client._decode_response(response)
+        try:
+            items, encoded_items = codec.decode_items(response.content)
+        except ValueError:
+            raise CraftAiInternalError(
+                "Internal Error, the craft ai server responded in an invalid format."
+            )
+        return Client._decode_response_bulk(items), encoded_items
 
     @staticmethod
     def _decode_response_bulk(response_bulk):
@@ -1120,7 +1887,7 @@ class Client(object):
         elif status_code == 404:
             err = CraftAiNotFoundError(message)
         elif status_code == 413:
-            err = CraftAiBadRequestError("Given payload is too large")
+            err = CraftAiPayloadTooLargeError("Given payload is too large")
         elif status_code == 500:
             err = CraftAiInternalError(message)
         elif status_code == 503:
@@ -1160,9 +1927,31 @@ class Client(object):
 
         :raise CraftAiBadRequestError: If all the entities are invalid.
         """
+        encode = None if check_serializable else (lambda entity: None)
+        return self._encode_entities_bulk(payload, encode)[:3]
+
+    def _encode_entities_bulk(self, payload, encode=None):
+        """Checks that all the given entity ids are valid non-empty strings and
+        encode each entity having a valid id in JSON, only once.
+
+        :param list payload: list of dictionnary which represents an entity.
+        :param encode: Optional. Function encoding an entity in JSON, raising a
+        `TypeError` if the entity is not serializable.
+        :default encode: None, the JSON codec of the client.
+
+        :return: list of the entities with valid ids, list of the entities with
+        invalid ids, list of the dictionnaries with invalid ids and the encodings of
+        the valid entities.
+        :rtype: list, list, list of dict, craft_ai.helpers.EncodedEntities.
+
+        :raise CraftAiBadRequestError: If all the entities are invalid.
+        """
+        if encode is None:
+            encode = codec.get_codec().encode
         invalid_entity_indices = []
         valid_entity_indices = []
         invalid_payload = []
+        encoded_entities = EncodedEntities()
         for index, entity in enumerate(payload):
             # Check if the entity ID is valid
             try:
@@ -1176,18 +1965,16 @@ class Client(object):
                         "error": CraftAiBadRequestError(ERROR_ID_MESSAGE),
                     }
                 )
+                continue
+
+            # Check if the entity is serializable by encoding it
+            try:
+                encoded_entities.append(encode(entity))
+            except TypeError as err:
+                invalid_entity_indices.append(index)
+                invalid_payload.append({"id": entity["id"], "error": err})
             else:
-                if check_serializable:
-                    # Check if the entity is serializable
-                    try:
-                        json.dumps([entity])
-                    except TypeError as err:
-                        invalid_entity_indices.append(index)
-                        invalid_payload.append({"id": entity["id"], "error": err})
-                    else:
-                        valid_entity_indices.append(index)
-                else:
-                    valid_entity_indices.append(index)
+                valid_entity_indices.append(index)
 
         if len(payload) == 0:
             raise CraftAiBadRequestError(ERROR_EMPTY_PAYLOAD)
@@ -1195,7 +1982,12 @@ class Client(object):
         if len(invalid_entity_indices) == len(payload):
             raise CraftAiBadRequestError(ERROR_ID_MESSAGE)
 
-        return valid_entity_indices, invalid_entity_indices, invalid_payload
+        return (
+            valid_entity_indices,
+            invalid_entity_indices,
+            invalid_payload,
+            encoded_entities,
+        )
 
     @staticmethod
     def _recreate_list_with_indices(indices1, values1, indices2, values2):
@@ -1224,7 +2016,9 @@ class Client(object):
             full_list[index] = values2[i]
         return full_list
 
-    def _create_and_send_json_bulk(self, payload, req_url, request_type="POST"):
+    def _create_and_send_json_bulk(
+        self, payload, req_url, request_type="POST", headers=None, encoded_items=False
+    ):
         """Create a json, do a request to the URL and process the response.
 
         :param list payload: contains the informations necessary for the action.
@@ -1232,26 +2026,25 @@ class Client(object):
         :param str req_url: URL to request with the payload.
         :param str request_type: type of request, either "POST" or "DELETE".
         :default request_type: "POST".
+        :param dict headers: Optional. Headers of this request only.
+        :param bool encoded_items: Optional. Whether the JSON encoding of each item
+        of the response is also returned.
 
-        :return: response of the request.
+        :return: response of the request, along with the encodings of its items if
+        `encoded_items` is True.
         :rtype: list of dict.
 
         :raises CraftAiBadRequestError: if the payload doesn't have the
         correct form to be transformed into a json or request_type is
         neither "POST" or "DELETE".
         """
-        # Extra header in addition to the main session's
+        # Extra headers in addition to the main session's
         ct_header = {"Content-Type": "application/json; charset=utf-8"}
+        if headers:
+            ct_header.update(headers)
 
-        try:
-            json_pl = json.dumps(payload)
-        except TypeError as err:
-            raise CraftAiBadRequestError(
-                "Error while dumping the payload into json"
-                "format when converting it for the bulk request. {}".format(
-                    err.__str__()
-                )
-            )
+        json_pl = self._encode_bulk_payload(payload)
+        ct_header, json_pl = self._compress_request(ct_header, json_pl)
         if request_type == "POST":
             resp = self._requests_session.post(req_url, headers=ct_header, data=json_pl)
         elif request_type == "DELETE":
@@ -1262,6 +2055,44 @@ class Client(object):
             raise CraftAiBadRequestError(
                 "Request for the bulk API should be either a POST or DELETE" "request"
             )
+        if encoded_items:
+            return self._decode_response_items(resp)
         entities = self._decode_response(resp)
         entities = self._decode_response_bulk(entities)
         return entities
+
+    def _compress_request(self, headers, body):
+        """Gzip the body of a request when the client compresses its requests.
+
+        :param dict headers: headers of the request.
+        :param body: JSON body of the request.
+        :type body: str or bytes.
+
+        :return: the headers and the body to send, compressed only when it is
+        larger than `compressRequestsThreshold` bytes.
+        :rtype: tuple.
+        """
+        if not self.config["compressRequests"]:
+            return headers, body
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        if len(body) < self.config["compressRequestsThreshold"]:
+            return headers, body
+        return (
+            {**headers, "Content-Encoding": "gzip"},
+            gzip.compress(body, compresslevel=6),
+        )
+
+    @staticmethod
+    def _encode_bulk_payload(payload):
+        try:
+            if isinstance(payload, EncodedEntities):
+                return join_json_fragments(payload)
+            return codec.encode(payload)
+        except TypeError as err:
+            raise CraftAiBadRequestError(
+                "Error while dumping the payload into json"
+                "format when converting it for the bulk request. {}".format(
+                    err.__str__()
+                )
+            )
@@ -0,0 +1,137 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class StdlibJsonCodec(object):
+    """JSON codec based on the standard library."""
+
+    name = "json"
+
+    @staticmethod
+    def encode(obj):
+        return json.dumps(obj).encode("utf-8")
+
+    @staticmethod
+    def decode(data):
+        return json.loads(data)
+
+
+class OrjsonCodec(object):
+    """JSON codec based on `orjson`, several times faster than the standard library.
+
+    The values `orjson` does not support, e.g. integers larger than 64 bits, are
+    encoded by the standard library.
+    """
+
+    name = "orjson"
+
+    @staticmethod
+    def encode(obj):
+        try:
+            return orjson.dumps(
+                obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            )
+        except TypeError:
+            return StdlibJsonCodec.encode(obj)
+
+    @staticmethod
+    def decode(data):
+        return orjson.loads(data)
+
+
+_codec = OrjsonCodec() if orjson is not None else StdlibJsonCodec()
+
+
+def get_codec():
+    """Return the JSON codec of the requests and responses bodies."""
+    return _codec
+
+
+def set_codec(codec):
+    """Change the JSON codec of the requests and responses bodies.
+
+    :param codec: object having an `encode` method returning the JSON encoding of
+    an object as bytes and a `decode` method returning the object encoded by bytes.
+    The encoding of an object that can not be serialized must raise a `TypeError`
+    and the decoding of invalid JSON must raise a `ValueError`.
+    """
+    global _codec  # pylint: disable=global-statement
+    _codec = codec
+
+
+def encode(obj):
+    """Encode `obj` to JSON.
+
+    :rtype: bytes.
+
+    :raises TypeError: if `obj` is not serializable.
+    """
+    return _codec.encode(obj)
+
+
+def encode_str(obj):
+    """Encode `obj` to JSON.
+
+    :rtype: str.
+
+    :raises TypeError: if `obj` is not serializable.
+    """
+    return _codec.encode(obj).decode("utf-8")
+
+
+def decode(data):
+    """Decode the JSON `data`.
+
+    :param data: JSON document.
+    :type data: bytes or str.
+
+    :raises ValueError: if `data` is not valid JSON.
+    """
+    return _codec.decode(data)
+
+
+_WHITESPACE = json.decoder.WHITESPACE
+_array_decoder = json.JSONDecoder()
+
+
+def decode_items(data):
+    """Decode the JSON array `data` along with the JSON encoding of each item.
+
+    The items are decoded by the standard library, which gives where each one
+    ends in the document, whatever the codec in use.
+
+    :param data: JSON document.
+    :type data: bytes or str.
+
+    :return: the items of the array and their encodings.
+    :rtype: tuple of two lists, of the items and of bytes.
+
+    :raises ValueError: if `data` is not a valid JSON array.
+    """
+    text = data.decode("utf-8") if isinstance(data, bytes) else data
+    items = []
+    encoded_items = []
+    index = _WHITESPACE.match(text, 0).end()
+    if text[index : index + 1] != "[":
+        raise ValueError("Expecting a JSON array")
+    index = _WHITESPACE.match(text, index + 1).end()
+    closed = text[index : index + 1] == "]"
+    if closed:
+        index += 1
+    while not closed:
+        item, end = _array_decoder.raw_decode(text, index)
+        items.append(item)
+        encoded_items.append(text[index:end].encode("utf-8"))
+        index = _WHITESPACE.match(text, end).end()
+        separator = text[index : index + 1]
+        if separator not in (",", "]"):
+            raise ValueError("Expecting ',' or ']' at position {}".format(index))
+        closed = separator == "]"
+        index = _WHITESPACE.match(text, index + 1).end()
+    if _WHITESPACE.match(text, index).end() != len(text):
+        raise ValueError("Extra data at position {}".format(index))
+    return items, encoded_items
@@ -0,0 +1,526 @@
+from array import array
+
+from craft_ai.errors import CraftAiDecisionError, CraftAiNullDecisionError
+from craft_ai.interpreter import Interpreter
+from craft_ai.interpreter_v2 import ContextSchema, InterpreterV2, _DECISION_VERSION
+from craft_ai.operators import OPERATORS, OPERATORS_FUNCTION
+
+# Operator codes stored in the node tables
+_OP_INVALID = -1
+_OP_IS = 0
+_OP_GTE = 1
+_OP_LT = 2
+_OP_IN_INTERVAL = 3
+# `[in[` interval whose lower bound is not lower than its upper bound, i.e. wrapping
+# around, e.g. [22, 6[ for a time of day.
+_OP_IN_WRAPPING_INTERVAL = 4
+_OP_IN_MULTI = 5
+
+_OPERATOR_CODES = {
+    OPERATORS["IS"]: _OP_IS,
+    OPERATORS["GTE"]: _OP_GTE,
+    OPERATORS["LT"]: _OP_LT,
+    OPERATORS["IN_INTERVAL"]: _OP_IN_INTERVAL,
+    OPERATORS["IN_MULTI"]: _OP_IN_MULTI,
+}
+
+
+def _is_leaf(node):
+    return not (node.get("children") is not None and len(node.get("children")))
+
+
+class _NodeTable(object):
+    """Flat, array-backed representation of one output tree.
+
+    Nodes are laid out breadth first so that the children of a node are stored
+    contiguously, from `first_child[node]` to `first_child[node] + child_count[node]`.
+    The root is always the node 0.
+    """
+
+    def __init__(self, root, feature_indices):
+        # Decision rule of each node, i.e. the rule to check to enter the node.
+        self.feature = array("i")
+        self.operator = array("b")
+        self.operand = []
+        self.rule = []
+        # Index of each node among its siblings, used to build the decision path.
+        self.position = array("i")
+        self.parent = array("i")
+        self.first_child = array("i")
+        self.child_count = array("i")
+        # Raw prediction of the leaves, None for the internal nodes.
+        self.leaf = []
+        # Original node objects, needed to compute the fallback distributions.
+        self.source = []
+
+        queue = [(root, 0, -1)]
+        next_index = 1
+        for index, (node, position, parent) in enumerate(queue):
+            self._append_rule(node.get("decision_rule"), feature_indices)
+            self.position.append(position)
+            self.parent.append(parent)
+            self.source.append(node)
+            if _is_leaf(node):
+                prediction = node.get("prediction")
+                if prediction is None:
+                    prediction = node
+                self.leaf.append(prediction)
+                self.first_child.append(0)
+                self.child_count.append(0)
+            else:
+                children = node["children"]
+                self.leaf.append(None)
+                self.first_child.append(next_index)
+                self.child_count.append(len(children))
+                next_index += len(children)
+                queue.extend((child, i, index) for i, child in enumerate(children))
+
+        self.output_values = root.get("output_values")
+        # Aggregated distribution of the subtree of each node, see `distribution`.
+        self._distributions = None
+
+    def path_to(self, node):
+        """Return the list of the nodes from the root to the given node."""
+        nodes = []
+        while node != -1:
+            nodes.append(node)
+            node = self.parent[node]
+        nodes.reverse()
+        return nodes
+
+    def distribution(self, node, output_type):
+        """Give the aggregated distribution of the subtree of a node, as computed by
+        `InterpreterV2._distribution`.
+
+        The distributions of all the nodes are computed bottom-up once, when the
+        first decision falls back on a distribution.
+        """
+        if self._distributions is None:
+            self._distributions = self._aggregate_distributions(output_type)
+        distribution = self._distributions[node]
+        if isinstance(distribution, Exception):
+            raise distribution.with_traceback(None)
+        return distribution
+
+    def _aggregate_distributions(self, output_type):
+        distributions = [None] * len(self.leaf)
+        # Children are stored after their parent, the nodes are processed bottom-up
+        for node in reversed(range(len(self.leaf))):
+            try:
+                if not self.child_count[node]:
+                    distributions[node] = InterpreterV2._distribution(
+                        self.source[node], output_type
+                    )
+                    continue
+                first = self.first_child[node]
+                children = distributions[first : first + self.child_count[node]]
+                # Same error as the recursive computation, the one of the first child
+                errors = [c for c in children if isinstance(c, Exception)]
+                if errors:
+                    distributions[node] = errors[0]
+                elif output_type in ["enum", "boolean"]:
+                    values, sizes = zip(*children)
+                    distributions[node] = InterpreterV2.compute_mean_distributions(
+                        values, sizes
+                    )
+                else:
+                    values, sizes, stds = zip(*children)
+                    distributions[node] = InterpreterV2.compute_mean_values(
+                        values, sizes, stds
+                    )
+            except Exception as err:  # pylint: disable=broad-except
+                # Raised when a decision falls back on this node, as it used to be
+                distributions[node] = err
+        return distributions
+
+    def _append_rule(self, rule, feature_indices):
+        self.rule.append(rule)
+        if rule is None:
+            # Only the root has no decision rule
+            self.feature.append(-1)
+            self.operator.append(_OP_INVALID)
+            self.operand.append(None)
+            return
+
+        property_name = rule["property"]
+        if property_name not in feature_indices:
+            feature_indices[property_name] = len(feature_indices)
+        self.feature.append(feature_indices[property_name])
+
+        operator = rule["operator"]
+        operand = rule["operand"]
+        code = (
+            _OPERATOR_CODES.get(operator, _OP_INVALID)
+            if isinstance(operator, str)
+            else _OP_INVALID
+        )
+        if code == _OP_IN_INTERVAL:
+            operand = (operand[0], operand[1])
+            # Same test as the interpreted `[in[` operator, done once and for all.
+            if not OPERATORS_FUNCTION[OPERATORS["LT"]](operand[0], operand[1]):
+                code = _OP_IN_WRAPPING_INTERVAL
+        self.operator.append(code)
+        self.operand.append(operand)
+
+
+class _CompiledInterpreterV2(object):
+    """Drop-in replacement of `InterpreterV2` deciding from node tables."""
+
+    def __init__(self, bare_tree, configuration):
+        self.feature_indices = {}
+        self.tables = {
+            output: _NodeTable(bare_tree[output], self.feature_indices)
+            for output in configuration.get("output")
+        }
+        self.features = [None] * len(self.feature_indices)
+        for feature, index in self.feature_indices.items():
+            self.features[index] = feature
+        self.schema = ContextSchema(configuration)
+
+    # pylint: disable-msg=unused-argument
+    def decide(self, configuration, bare_tree, context):
+        self.schema.check(context)
+
+        values = [context.get(feature) for feature in self.features]
+
+        decision_result = {}
+        decision_result["output"] = {}
+        for output in configuration.get("output"):
+            output_type = configuration["context"][output]["type"]
+            table = self.tables[output]
+            self._check_root(table)
+            decision_result["output"][output] = self._decide_output(
+                table, values, output_type
+            )
+        decision_result["_version"] = _DECISION_VERSION
+        return decision_result
+
+    def decide_outputs(self, configuration, context):
+        """Take the decision of each output as a `Decision`, only keeping the
+        traversed nodes."""
+        self.schema.check(context)
+
+        values = [context.get(feature) for feature in self.features]
+
+        decisions = {}
+        for output in configuration["output"]:
+            table = self.tables[output]
+            self._check_root(table)
+            decisions[output] = Decision(
+                table,
+                self._find_path(table, values),
+                configuration["context"][output]["type"],
+            )
+        return decisions
+
+    @staticmethod
+    def _check_root(table):
+        root_leaf = table.leaf[0]
+        if root_leaf is not None and root_leaf.get("value") is None:
+            raise CraftAiNullDecisionError(
+                """Unable to take decision: the decision tree is not based"""
+                """ on any context operations."""
+            )
+
+    @staticmethod
+    def _find_path(table, values):
+        """Walk down the tree and return the list of the traversed nodes."""
+        feature = table.feature
+        operator = table.operator
+        operand = table.operand
+        first_child = table.first_child
+        child_count = table.child_count
+
+        node = 0
+        nodes = [0]
+        while child_count[node]:
+            first = first_child[node]
+            for child in range(first, first + child_count[node]):
+                value = values[feature[child]]
+                code = operator[child]
+                if code == _OP_IS:
+                    matching = value == operand[child]
+                elif code == _OP_GTE:
+                    matching = (
+                        value is not None and value != {} and value >= operand[child]
+                    )
+                elif code == _OP_LT:
+                    matching = (
+                        value is not None and value != {} and value < operand[child]
+                    )
+                elif code == _OP_IN_INTERVAL:
+                    lower, upper = operand[child]
+                    matching = (
+                        value is not None and value != {} and lower <= value < upper
+                    )
+                elif code == _OP_IN_WRAPPING_INTERVAL:
+                    lower, upper = operand[child]
+                    matching = (
+                        value is not None
+                        and value != {}
+                        and (value >= lower or value < upper)
+                    )
+                elif code == _OP_IN_MULTI:
+                    matching = value in operand[child]
+                else:
+                    raise CraftAiDecisionError(
+                        """Invalid decision tree format, {} is not a valid"""
+                        """ decision operator.""".format(table.rule[child]["operator"])
+                    )
+                if matching:
+                    break
+            else:
+                # No matching child, the decision is taken from this node
+                return nodes
+            node = child
+            nodes.append(node)
+        return nodes
+
+    @staticmethod
+    def _decide_output(table, values, output_type):
+        nodes = _CompiledInterpreterV2._find_path(table, values)
+        return _CompiledInterpreterV2._node_decision(table, nodes, output_type)
+
+    @staticmethod
+    def _node_decision(table, nodes, output_type):
+        """Build the decision taken at the end of the given path of nodes."""
+        node = nodes[-1]
+        decision_path = "-".join(["0"] + [str(table.position[n]) for n in nodes[1:]])
+
+        prediction = table.leaf[node]
+        if prediction is None:
+            result = InterpreterV2._distribution_decision(
+                table.distribution(node, output_type),
+                table.output_values,
+                output_type,
+                [],
+            )
+            result["decision_path"] = decision_path
+        else:
+            if prediction.get("value") is None:
+                # Same metadata as the recursive interpreter which stacks the rules
+                # of the traversed nodes while unwinding.
+                raise CraftAiDecisionError(
+                    """Unable to take decision: the decision tree has no valid"""
+                    """ predicted value for the given context.""",
+                    {"decision_rules": [table.rule[n] for n in nodes[1:]]},
+                )
+            result = {
+                "predicted_value": prediction.get("value"),
+                "confidence": prediction.get("confidence") or 0,
+                "decision_rules": [],
+                "nb_samples": prediction["nb_samples"],
+                "decision_path": decision_path,
+            }
+            distribution = prediction.get("distribution")
+            if (
+                not isinstance(distribution, list)
+                and "standard_deviation" in distribution
+            ):
+                result["standard_deviation"] = distribution.get("standard_deviation")
+                result["min"] = distribution.get("min")
+                result["max"] = distribution.get("max")
+            else:
+                result["distribution"] = distribution
+
+        if len(nodes) == 1:
+            return result
+
+        # Decisions taken below the root only keep the meaningful statistics
+        final_result = {
+            "predicted_value": result["predicted_value"],
+            "confidence": result["confidence"],
+            "decision_rules": [
+                {
+                    "property": table.rule[n]["property"],
+                    "operator": table.rule[n]["operator"],
+                    "operand": table.rule[n]["operand"],
+                }
+                for n in nodes[1:]
+            ],
+            "nb_samples": result["nb_samples"],
+            "decision_path": decision_path,
+        }
+        for key in ["standard_deviation", "min", "max"]:
+            if result.get(key) is not None:
+                final_result[key] = result[key]
+        if result.get("distribution"):
+            final_result["distribution"] = result["distribution"]
+        return final_result
+
+
+class Decision(object):
+    """Decision of one output of a compiled tree, as given by
+    `CompiledTree.decide_outputs`.
+
+    Only the nodes traversed by the decision are kept, the decision rules, the
+    decision path and the distribution are built when they are read.
+    `to_dict` gives the decision of the output in the format of
+    `craft_ai.Interpreter.decide`.
+
+    :ivar predicted_value: the predicted value.
+    :ivar float confidence: the confidence of the decision, None when it is taken
+    from the distribution of a subtree.
+    :ivar nb_samples: the number of samples of the decision.
+    """
+
+    __slots__ = (
+        "predicted_value",
+        "confidence",
+        "nb_samples",
+        "_table",
+        "_nodes",
+        "_output_type",
+        "_distribution",
+    )
+
+    def __init__(self, table, nodes, output_type):
+        self._table = table
+        self._nodes = nodes
+        self._output_type = output_type
+        self._distribution = None
+
+        node = nodes[-1]
+        prediction = table.leaf[node]
+        if prediction is None:
+            # Taken from the distribution of the subtree
+            self._distribution = table.distribution(node, output_type)
+            if output_type in ["enum", "boolean"]:
+                distribution, self.nb_samples = self._distribution
+                self.predicted_value = table.output_values[
+                    distribution.index(max(distribution))
+                ]
+            else:
+                self.predicted_value, self.nb_samples, _ = self._distribution
+            self.confidence = None
+        else:
+            if prediction.get("value") is None:
+                # Same error as `to_dict`
+                _CompiledInterpreterV2._node_decision(table, nodes, output_type)
+            self.predicted_value = prediction["value"]
+            self.confidence = prediction.get("confidence") or 0
+            self.nb_samples = prediction["nb_samples"]
+
+    @property
+    def decision_rules(self):
+        """The rules of the traversed nodes.
+
+        :rtype: list of dict.
+        """
+        return [
+            {
+                "property": self._table.rule[n]["property"],
+                "operator": self._table.rule[n]["operator"],
+                "operand": self._table.rule[n]["operand"],
+            }
+            for n in self._nodes[1:]
+        ]
+
+    @property
+    def decision_path(self):
+        """The path of the traversed nodes, e.g. "0-1-0".
+
+        :rtype: str.
+        """
+        return "-".join(["0"] + [str(self._table.position[n]) for n in self._nodes[1:]])
+
+    @property
+    def distribution(self):
+        """The distribution of the output values, None for the continuous outputs.
+
+        :rtype: list.
+        """
+        if self._distribution is not None:
+            if self._output_type in ["enum", "boolean"]:
+                return list(self._distribution[0])
+            return None
+        distribution = self._table.leaf[self._nodes[-1]].get("distribution")
+        return distribution if isinstance(distribution, list) else None
+
+    @property
+    def standard_deviation(self):
+        """The standard deviation of a continuous output, None otherwise."""
+        if self._distribution is not None:
+            if self._output_type in ["enum", "boolean"]:
+                return None
+            return self._distribution[2]
+        return self._leaf_statistic("standard_deviation")
+
+    @property
+    def min(self):
+        """The minimum of a continuous output at a leaf, None otherwise."""
+        return None if self._distribution is not None else self._leaf_statistic("min")
+
+    @property
+    def max(self):
+        """The maximum of a continuous output at a leaf, None otherwise."""
+        return None if self._distribution is not None else self._leaf_statistic("max")
+
+    def _leaf_statistic(self, key):
+        distribution = self._table.leaf[self._nodes[-1]].get("distribution")
+        if isinstance(distribution, list) or "standard_deviation" not in distribution:
+            return None
+        return distribution.get(key)
+
+    def to_dict(self):
+        """Give the decision in the format of the outputs of
+        `craft_ai.Interpreter.decide`.
+
+        :rtype: dict.
+        """
+        return _CompiledInterpreterV2._node_decision(
+            self._table, self._nodes, self._output_type
+        )
+
+    def __repr__(self):
+        return "Decision(predicted_value={!r}, confidence={!r})".format(
+            self.predicted_value, self.confidence
+        )
+
+
+class CompiledTree(object):
+    """Decision tree prepared once to take many decisions.
+
+    The tree is parsed and validated when the instance is created, V2 output trees
+    are flattened into node tables so that `decide` only has to check the context
+    and walk down arrays. Decisions are identical to the ones of
+    `craft_ai.Interpreter.decide`.
+    """
+
+    def __init__(self, tree):
+        prepared = Interpreter.prepare(tree)
+
+        self.version = prepared.version
+        self.configuration = prepared.configuration
+        self._bare_tree = prepared.bare_tree
+        self._prepared = prepared
+        if prepared.interpreter is InterpreterV2:
+            self._interpreter = _CompiledInterpreterV2(
+                prepared.bare_tree, prepared.configuration
+            )
+        else:
+            # Older trees are still decided by their own interpreter
+            self._interpreter = prepared.interpreter
+
+    def decide(self, *args):
+        return Interpreter._decide_prepared(self._prepared, args, self._interpreter)
+
+    def decide_outputs(self, *args):
+        """Take the decision of each output of the tree, as a lightweight
+        `craft_ai.Decision` building its details when they are read.
+
+        :param args: the context, as the arguments of `decide`.
+
+        :return: the decision of each output.
+        :rtype: dict.
+
+        :raises CraftAiDecisionError: if the tree is not a V2 tree, if the context
+        is not valid or if no decision can be taken.
+        """
+        if not isinstance(self._interpreter, _CompiledInterpreterV2):
+            raise CraftAiDecisionError(
+                """Invalid decision tree format, lightweight decisions are only"""
+                """ available for trees of version 2."""
+            )
+        _, decide_context = Interpreter._build_decide_context(self._prepared, args)
+        return self._interpreter.decide_outputs(self.configuration, decide_context)
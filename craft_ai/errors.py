@@ -30,6 +30,10 @@ class CraftAiBadRequestError(CraftAiError):
     """An unvalid request was send to craft ai's API."""
 
 
+class CraftAiPayloadTooLargeError(CraftAiBadRequestError):
+    """A Payload Too Large Error (413) occured on craft ai's side."""
+
+
 class CraftAiNotFoundError(CraftAiError):
     """A Not Found Error (404) occured on craft ai's side."""
 
@@ -1,4 +1,10 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import queue
 import re
+import threading
+
+from . import codec
 
 
 def dict_depth(collection):
@@ -17,3 +23,177 @@ def extract_operations_count_from_message(message):
     if not count_matches:
         return 0
     return int(count_matches.group())
+
+
+class EncodedOperations(list):
+    """List of operations already encoded in JSON, one string per operation.
+
+    Clients send them as they are instead of encoding them again.
+    """
+
+    def __getitem__(self, index):
+        item = super(EncodedOperations, self).__getitem__(index)
+        # Chunks of encoded operations are encoded operations as well
+        return EncodedOperations(item) if isinstance(index, slice) else item
+
+
+class EncodedEntities(list):
+    """List of the entities of a bulk payload already encoded in JSON, one string
+    or bytes per entity.
+
+    Entities are encoded once when the payload is validated, the request body is
+    then made of these encodings.
+    """
+
+
+class EncodedEntity(dict):
+    """Entity of a bulk payload along with its JSON encoding and the size in bytes
+    of this encoding."""
+
+    def __init__(self, entity, encoded):
+        super(EncodedEntity, self).__init__(entity)
+        self.encoded = encoded
+        self.size = encoded_size(encoded)
+
+
+def encoded_size(encoded):
+    """Give the size in bytes of a JSON encoding, as str or bytes, once sent."""
+    if isinstance(encoded, bytes):
+        return len(encoded)
+    return len(encoded.encode("utf-8"))
+
+
+def join_json_fragments(fragments):
+    if fragments and isinstance(fragments[0], bytes):
+        return b"[" + b",".join(fragments) + b"]"
+    return "[" + ",".join(fragments) + "]"
+
+
+def _encode_agent_operations_json(agent_id, operations_json):
+    if isinstance(operations_json, bytes):
+        operations_json = operations_json.decode("utf-8")
+    return '{{"id":{},"operations":{}}}'.format(
+        codec.encode_str(agent_id), operations_json
+    )
+
+
+def encode_agent_operations(agent):
+    if isinstance(agent, EncodedEntity):
+        return agent.encoded
+    operations = agent["operations"]
+    if isinstance(operations, EncodedOperations):
+        return _encode_agent_operations_json(
+            agent["id"], join_json_fragments(operations)
+        )
+    return codec.encode_str(agent)
+
+
+class AgentOperationsPart(EncodedEntity):
+    """Part of the operations of an agent, sent in a bulk request along with the
+    operations of other agents.
+
+    :param str agent_id: the id of the agent.
+    :param list operations: the operations of the part.
+    :param operations_json: the JSON encoding of `operations`, as str or bytes.
+    """
+
+    def __init__(self, agent_id, operations, operations_json):
+        super(AgentOperationsPart, self).__init__(
+            {"id": agent_id, "operations": operations},
+            _encode_agent_operations_json(agent_id, operations_json),
+        )
+
+
+def _done_future(function, item):
+    future = Future()
+    try:
+        future.set_result(function(item))
+    except Exception as err:  # pylint: disable=broad-except
+        future.set_exception(err)
+    return future
+
+
+def map_ordered(function, iterable, workers=1, window=None):
+    """Call `function` on each item of `iterable` using a pool of threads.
+
+    At most `window` calls are pending at once, the items are only consumed from
+    `iterable` when there is room for them. With a single worker the calls are made
+    one after the other, without any thread.
+
+    :return: the futures of the calls, in the order of the items.
+    :rtype: generator of concurrent.futures.Future.
+    """
+    if workers <= 1:
+        for item in iterable:
+            yield _done_future(function, item)
+        return
+
+    window = max(window or workers, 1)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for item in iterable:
+                if len(pending) >= window:
+                    yield pending.popleft()
+                pending.append(executor.submit(function, item))
+            while pending:
+                yield pending.popleft()
+        finally:
+            # Stopped early, the calls that did not start are dropped
+            for future in pending:
+                future.cancel()
+
+
+_PREFETCH_DONE = object()
+
+
+def prefetch(iterable, size=1):
+    """Consume `iterable` in a background thread, up to `size` items ahead.
+
+    The items are handed over through a bounded queue: the thread waits when `size`
+    items are ready and not yet consumed. The error raised by `iterable` is raised
+    once the items preceding it are consumed. When `size` is not positive, the items
+    are consumed one after the other, without any thread.
+
+    :return: the items of `iterable`, in order.
+    :rtype: generator.
+    """
+    if size <= 0:
+        yield from iterable
+        return
+
+    items = queue.Queue(maxsize=size)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except Exception as err:  # pylint: disable=broad-except
+            put((_PREFETCH_DONE, err))
+        else:
+            put((_PREFETCH_DONE, None))
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, err = items.get()
+            if item is _PREFETCH_DONE:
+                if err is not None:
+                    raise err
+                return
+            yield item
+    finally:
+        # Stopped early, the thread gives up the items it has not handed over yet
+        stopped.set()
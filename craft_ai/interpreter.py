@@ -1,20 +1,153 @@
+import json
 import re
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
 from semver import VersionInfo
 
-from craft_ai.errors import CraftAiDecisionError
+from craft_ai.errors import CraftAiDecisionError, CraftAiError
 from craft_ai.time import Time
 from craft_ai.timezones import get_timezone_key, timezone_offset_in_standard_format
 from craft_ai.interpreter_v1 import InterpreterV1
 from craft_ai.interpreter_v2 import InterpreterV2
 
+_VERSION_PATTERN = re.compile(r"\d+.\d+.\d+")
+
+_GENERATED_TYPES = ["time_of_day", "day_of_week", "day_of_month", "month_of_year"]
+
+
+@lru_cache(maxsize=64)
+def _get_version_interpreter(tree_version):
+    """Give the interpreter of a version of the decision trees, None when the
+    version is not supported. Versions are only compared once."""
+    if tree_version >= VersionInfo(1, 0, 0) and tree_version < VersionInfo(2, 0, 0):
+        return InterpreterV1
+    if tree_version >= VersionInfo(2, 0, 0) and tree_version < VersionInfo(3, 0, 0):
+        return InterpreterV2
+    return None
+
+
+class PreparedTree(object):
+    """Decision tree parsed once, along with what its decisions need from its
+    configuration.
+
+    Prepared trees are given by `Interpreter.prepare` and accepted by
+    `Interpreter.decide` and `Interpreter.decide_many`. The tree should not be
+    modified once prepared.
+
+    :ivar str version: the version of the tree.
+    :ivar dict configuration: the configuration of the tree.
+    :ivar dict bare_tree: the trees of the outputs.
+    :ivar interpreter: the interpreter of the version of the tree.
+    :ivar list output: the output properties.
+    :ivar dict context_properties: the context properties that are not outputs.
+    :ivar list generated_properties: the context properties generated from the time.
+    :ivar str timezone_key: the timezone property, None if there is none.
+    """
+
+    def __init__(self, tree):
+        bare_tree, configuration, tree_version = Interpreter._parse_tree(tree)
+        self.version = tree_version
+        self.configuration = configuration
+        self.bare_tree = bare_tree
+        self.interpreter = Interpreter._get_interpreter(tree_version)
+        self.output = None
+        self.context_properties = None
+        self.generated_properties = None
+        self.timezone_key = None
+        if configuration != {}:
+            self.output = configuration["output"]
+            self.context_properties = Interpreter._get_context_properties(configuration)
+            self.generated_properties = Interpreter._get_generated_properties(
+                self.context_properties
+            )
+            self.timezone_key = get_timezone_key(configuration["context"])
+
 
 class Interpreter(object):
     @staticmethod
     def decide(tree, args):
-        bare_tree, configuration, tree_version = Interpreter._parse_tree(tree)
-        interpreter = Interpreter._get_interpreter(tree_version)
+        if not isinstance(tree, PreparedTree):
+            tree = PreparedTree(tree)
+
+        return Interpreter._decide_prepared(tree, args, tree.interpreter)
+
+    @staticmethod
+    def prepare(tree):
+        """Parse a decision tree once to take many decisions from it.
 
-        return Interpreter._decide(configuration, bare_tree, args, interpreter)
+        :param dict tree: the decision tree, as given by the craft ai API.
+
+        :return: the prepared tree, to give to `decide` instead of the tree.
+        :rtype: craft_ai.interpreter.PreparedTree.
+
+        :raises CraftAiDecisionError: if the tree is not valid.
+        """
+        return PreparedTree(tree)
+
+    @staticmethod
+    def decide_many(trees, args, processes=None):
+        """Take the decision of each of several trees for the same context.
+
+        The context is rebuilt once for each distinct configuration of the trees
+        instead of once per tree. The decisions are identical to the ones of
+        `decide`.
+
+        :param list trees: the decision trees, as given by the craft ai API or as
+        `craft_ai.CompiledTree`.
+        :param tuple args: the context, as the arguments of `decide`.
+        :param int processes: Optional. Number of processes sharing the trees, the
+        decisions are taken in the calling process by default.
+
+        :return: the decision of each tree, or `{"error": error}` when the decision
+        of a tree failed.
+        :rtype: list of dict.
+        """
+        if processes is not None and processes > 1 and len(trees) > 1:
+            chunk_size = -(-len(trees) // processes)  # Ceiling of the division
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                futures = [
+                    executor.submit(
+                        Interpreter.decide_many,
+                        trees[offset : offset + chunk_size],
+                        args,
+                    )
+                    for offset in range(0, len(trees), chunk_size)
+                ]
+                return [decision for future in futures for decision in future.result()]
+
+        decisions = []
+        # Rebuilt contexts by configuration, and configurations keys by object
+        contexts = {}
+        configurations_keys = {}
+        for tree in trees:
+            try:
+                prepared, interpreter = Interpreter._prepare_tree(tree)
+                configuration = prepared.configuration
+                key = configurations_keys.get(id(configuration))
+                if key is None:
+                    key = json.dumps(configuration, sort_keys=True)
+                    configurations_keys[id(configuration)] = key
+                if key not in contexts:
+                    try:
+                        contexts[key] = Interpreter._build_decide_context(
+                            prepared, args
+                        )
+                    except CraftAiError as err:
+                        contexts[key] = err
+                if isinstance(contexts[key], CraftAiError):
+                    raise contexts[key]
+                context, decide_context = contexts[key]
+
+                decision = interpreter.decide(
+                    configuration, prepared.bare_tree, decide_context
+                )
+                decision["context"] = context.copy()
+                decisions.append(decision)
+            except CraftAiError as err:
+                decisions.append({"error": err})
+        return decisions
 
     ####################
     # Internal helpers #
@@ -22,76 +155,124 @@ class Interpreter(object):
 
     @staticmethod
     def _decide(configuration, bare_tree, args, interpreter):
+        context, decide_context = Interpreter._build_decide_context(configuration, args)
+
+        decision = interpreter.decide(configuration, bare_tree, decide_context)
+        decision["context"] = context
+
+        return decision
+
+    @staticmethod
+    def _decide_prepared(prepared, args, interpreter):
+        context, decide_context = Interpreter._build_decide_context(prepared, args)
+
+        decision = interpreter.decide(
+            prepared.configuration, prepared.bare_tree, decide_context
+        )
+        decision["context"] = context
+
+        return decision
+
+    @staticmethod
+    def _build_decide_context(tree, args):
+        """Build the context of a decision from the arguments of `decide`.
+
+        :param tree: the configuration of the tree, or the prepared tree.
+        :type tree: dict or craft_ai.interpreter.PreparedTree.
+
+        :return: the context and its copy given to the interpreter.
+        :rtype: tuple.
+        """
+        if isinstance(tree, PreparedTree):
+            configuration = tree.configuration
+            context_properties = tree.context_properties
+            generated_properties = tree.generated_properties
+            timezone_key = tree.timezone_key
+        else:
+            configuration = tree
+            if configuration != {}:
+                context_properties = Interpreter._get_context_properties(configuration)
+                generated_properties = Interpreter._get_generated_properties(
+                    context_properties
+                )
+                timezone_key = get_timezone_key(configuration["context"])
+
         if configuration != {}:
             time = None if len(args) == 1 else args[1]
-            context_result = Interpreter._rebuild_context(configuration, args[0], time)
+            context_result = Interpreter._rebuild_prepared_context(
+                context_properties, generated_properties, args[0], time
+            )
             context = context_result["context"]
         else:
             context = Interpreter.join_decide_args(args)
+            timezone_key = get_timezone_key(configuration["context"])
         # Convert timezones as integers into standard +/hh:mm format
         # This should only happen when no time generated value is required
-        decide_context = Interpreter._convert_timezones_to_standard_format(
-            configuration, context.copy()
-        )
-
-        decision = interpreter.decide(configuration, bare_tree, decide_context)
-        decision["context"] = context
+        decide_context = context.copy()
+        if timezone_key and timezone_key in decide_context:
+            decide_context[timezone_key] = timezone_offset_in_standard_format(
+                decide_context[timezone_key]
+            )
+        return context, decide_context
 
-        return decision
+    @staticmethod
+    def _prepare_tree(tree):
+        """Give the prepared tree and the interpreter of a decision tree, either as
+        given by the craft ai API, prepared or a `craft_ai.CompiledTree`."""
+        if isinstance(tree, PreparedTree):
+            return tree, tree.interpreter
+        if not isinstance(tree, dict) and hasattr(tree, "_interpreter"):
+            return tree._prepared, tree._interpreter
+        prepared = PreparedTree(tree)
+        return prepared, prepared.interpreter
 
     @staticmethod
     def _get_interpreter(tree_version):
-
-        if tree_version >= VersionInfo(1, 0, 0) and tree_version < VersionInfo(2, 0, 0):
-            return InterpreterV1
-        elif tree_version >= VersionInfo(2, 0, 0) and tree_version < VersionInfo(
-            3, 0, 0
-        ):
-            return InterpreterV2
-        else:
+        interpreter = _get_version_interpreter(tree_version)
+        if interpreter is None:
             raise CraftAiDecisionError(
                 """Invalid decision tree format, "{}" is currently not a valid version.""".format(
                     tree_version
                 )
             )
+        return interpreter
 
     @staticmethod
     def _rebuild_context(configuration, state, time=None):
-
-        missings = []
         # Model should come from _parse_tree and is assumed to be checked
         # upon already
+        context_properties = Interpreter._get_context_properties(configuration)
+        generated_properties = Interpreter._get_generated_properties(context_properties)
+        return Interpreter._rebuild_prepared_context(
+            context_properties, generated_properties, state, time
+        )
+
+    @staticmethod
+    def _get_context_properties(configuration):
         output = configuration["output"]
         context = configuration["context"]
 
         # We should not use the output key(s) to compare against
-        configuration_ctx = {
+        return {
             key: context[key] for (key, value) in context.items() if (key not in output)
         }
 
-        # Check if we need the time object
+    @staticmethod
+    def _get_generated_properties(context_properties):
         to_generate = []
 
-        for prop in configuration_ctx.items():
-            prop_name = prop[0]
-            prop_attributes = prop[1]
-            if prop_attributes["type"] in [
-                "time_of_day",
-                "day_of_week",
-                "day_of_month",
-                "month_of_year",
-            ]:
-                # is_generated is at True, we must generate the time for the
-                # associated context property
-                case_1 = (
-                    "is_generated" in list(prop_attributes.keys())
-                    and prop[1]["is_generated"]
-                )
-                # is_generated is not given, by default at True, so we must
-                # generate it as well
-                case_2 = "is_generated" not in list(prop_attributes.keys())
-                if case_1 or case_2:
-                    to_generate.append(prop_name)
+        for prop_name, prop_attributes in context_properties.items():
+            # is_generated is True by default, we must generate the time for the
+            # associated context property
+            if prop_attributes["type"] in _GENERATED_TYPES and prop_attributes.get(
+                "is_generated", True
+            ):
+                to_generate.append(prop_name)
+        return to_generate
+
+    @staticmethod
+    def _rebuild_prepared_context(configuration_ctx, to_generate, state, time=None):
+        missings = []
 
         # Propagate missings properties to next function
         if to_generate:
@@ -99,15 +280,16 @@ class Interpreter(object):
             if not isinstance(time, Time):
                 # Check for missings properties
                 for prop in to_generate:
-                    if prop not in list(state.keys()):
+                    if prop not in state:
                         missings.append(
                             "expected property '{}' is not defined".format(prop)
                         )
 
             # Generate context properties which need to
             else:
+                time_dict = time.to_dict()
                 for prop in to_generate:
-                    state[prop] = time.to_dict()[configuration_ctx[prop]["type"]]
+                    state[prop] = time_dict[configuration_ctx[prop]["type"]]
 
         # Rebuild the context with generated and non-generated values
         context = {
@@ -133,15 +315,6 @@ class Interpreter(object):
                 )
         return joined_args
 
-    @staticmethod
-    def _convert_timezones_to_standard_format(configuration, context):
-        timezone_key = get_timezone_key(configuration["context"])
-        if timezone_key and timezone_key in context:
-            context[timezone_key] = timezone_offset_in_standard_format(
-                context[timezone_key]
-            )
-        return context
-
     @staticmethod
     def _parse_tree(tree_object):
         # Checking definition of tree_object
@@ -159,15 +332,13 @@ class Interpreter(object):
             )
 
         # Checking version and tree validity according to version
-        if re.compile(r"\d+.\d+.\d+").match(tree_version) is None:
+        if _VERSION_PATTERN.match(tree_version) is None:
             raise CraftAiDecisionError(
                 """Invalid decision tree format, "{}" is not a valid version.""".format(
                     tree_version
                 )
             )
-        elif tree_version >= VersionInfo(1, 0, 0) and tree_version < VersionInfo(
-            3, 0, 0
-        ):
+        elif _get_version_interpreter(tree_version) is not None:
             if tree_object.get("configuration") is None:
                 raise CraftAiDecisionError(
                     """Invalid decision tree format, no configuration found"""
@@ -1,6 +1,8 @@
 import math
 import numbers
 
+from collections import OrderedDict
+
 from craft_ai.errors import CraftAiDecisionError, CraftAiNullDecisionError
 from craft_ai.operators import OPERATORS, OPERATORS_FUNCTION
 from craft_ai.types import TYPES
@@ -8,25 +10,264 @@ from craft_ai.timezones import is_timezone
 
 _DECISION_VERSION = "2.0.0"
 
+# The validators are functions of the module so that the compiled trees holding
+# them can be pickled, e.g. to be sent to other processes.
+
+
+def _is_continuous(value):
+    return isinstance(value, numbers.Real)
+
+
+def _is_enum(value):
+    return isinstance(value, str)
+
+
+def _is_boolean(value):
+    return isinstance(value, bool)
+
+
+def _is_time_of_day(value):
+    return isinstance(value, numbers.Real) and value >= 0 and value < 24
+
+
+def _is_day_of_week(value):
+    return isinstance(value, int) and value >= 0 and value <= 6
+
+
+def _is_day_of_month(value):
+    return isinstance(value, int) and value >= 1 and value <= 31
+
+
+def _is_month_of_year(value):
+    return isinstance(value, int) and value >= 1 and value <= 12
+
+
 _VALUE_VALIDATORS = {
-    TYPES["continuous"]: lambda value: isinstance(value, numbers.Real),
-    TYPES["enum"]: lambda value: isinstance(value, str),
-    TYPES["boolean"]: lambda value: isinstance(value, bool),
-    TYPES["timezone"]: lambda value: is_timezone(value),
-    TYPES["time_of_day"]: lambda value: (
-        isinstance(value, numbers.Real) and value >= 0 and value < 24
-    ),
-    TYPES["day_of_week"]: lambda value: (
-        isinstance(value, int) and value >= 0 and value <= 6
-    ),
-    TYPES["day_of_month"]: lambda value: (
-        isinstance(value, int) and value >= 1 and value <= 31
-    ),
-    TYPES["month_of_year"]: lambda value: (
-        isinstance(value, int) and value >= 1 and value <= 12
-    ),
+    TYPES["continuous"]: _is_continuous,
+    TYPES["enum"]: _is_enum,
+    TYPES["boolean"]: _is_boolean,
+    TYPES["timezone"]: is_timezone,
+    TYPES["time_of_day"]: _is_time_of_day,
+    TYPES["day_of_week"]: _is_day_of_week,
+    TYPES["day_of_month"]: _is_day_of_month,
+    TYPES["month_of_year"]: _is_month_of_year,
+}
+
+# Types of the values that are always valid for a property type, checked before
+# its validator
+_VALID_VALUE_TYPES = {
+    TYPES["continuous"]: (int, float),
+    TYPES["enum"]: (str,),
+    TYPES["boolean"]: (bool,),
+}
+
+# Inclusive bounds of the values of the integer property types
+_INTEGER_BOUNDS = {
+    TYPES["day_of_week"]: (0, 6),
+    TYPES["day_of_month"]: (1, 31),
+    TYPES["month_of_year"]: (1, 12),
+    TYPES["timezone"]: (-720, 840),
 }
 
+# Maximum number of context schemas kept for the configurations of the trees
+_CONTEXT_SCHEMAS_MAX_COUNT = 64
+
+_context_schemas = OrderedDict()
+
+_MISSING = object()
+
+
+class ContextSchema(object):
+    """Validation of the contexts of a tree, compiled once from its configuration.
+
+    The errors are the same as the ones of `InterpreterV2._check_context`.
+
+    :ivar list properties: the context properties that are not outputs.
+    :ivar dict types: the type of each context property.
+    """
+
+    def __init__(self, configuration):
+        output = configuration["output"]
+        self.properties = [p for p in configuration["context"] if p not in output]
+        self.types = {
+            p: configuration["context"][p]["type"] for p in configuration["context"]
+        }
+        self._validators = [
+            (
+                p,
+                _VALID_VALUE_TYPES.get(self.types[p], ()),
+                _VALUE_VALIDATORS.get(self.types[p]),
+            )
+            for p in self.properties
+        ]
+
+    def check(self, context):
+        """Check a context in a single pass over the properties.
+
+        :raises CraftAiDecisionError: if properties are missing or have invalid
+        values.
+        """
+        missing_properties = []
+        bad_properties = []
+        for property_name, valid_types, validator in self._validators:
+            value = context.get(property_name, _MISSING)
+            if value is None:
+                continue
+            if value is _MISSING:
+                missing_properties.append(property_name)
+            elif (
+                validator is not None
+                and type(value) not in valid_types
+                and not (validator(value) or value == {})
+            ):
+                bad_properties.append(property_name)
+        if missing_properties or bad_properties:
+            self._raise_error(context, missing_properties, bad_properties)
+
+    def check_columns(self, columns):
+        """Check the columns of many contexts at once, each distinct value of a
+        column being validated once.
+
+        Missing values are given as `None` or `NaN`, the integer properties may be
+        given as integral floats, e.g. in the numpy arrays having missing values.
+
+        :param columns: mapping from each context property to the sequence of its
+        values, e.g. a `dict` of lists or numpy arrays.
+
+        :raises CraftAiDecisionError: the error of `check` for the first invalid
+        context.
+        """
+        missing_properties = [p for p in self.properties if p not in columns]
+        if missing_properties:
+            self._raise_error({}, missing_properties, [])
+
+        first_invalid_row = None
+        values_lists = {}
+        for property_name, valid_types, validator in self._validators:
+            values = columns[property_name]
+            property_type = self.types[property_name]
+            kind = getattr(getattr(values, "dtype", None), "kind", None)
+            if validator is None or (
+                kind is not None
+                and kind in "biuf"
+                and (float in valid_types or _is_valid_numbers(values, property_type))
+            ):
+                continue
+            values = _to_list(values)
+            integer = property_type in _INTEGER_BOUNDS
+            values_lists[property_name] = values, integer
+            try:
+                distinct_values = set(values)
+            except TypeError:
+                # Unhashable values
+                distinct_values = values
+            if all(
+                _is_valid_value(_column_value(value, integer), valid_types, validator)
+                for value in distinct_values
+            ):
+                continue
+            for row, value in enumerate(values):
+                if not _is_valid_value(
+                    _column_value(value, integer), valid_types, validator
+                ):
+                    if first_invalid_row is None or row < first_invalid_row:
+                        first_invalid_row = row
+                    break
+
+        if first_invalid_row is not None:
+            context = {}
+            for property_name in self.properties:
+                values, integer = values_lists.get(property_name, (None, False))
+                if values is None:
+                    values = _to_list(columns[property_name])
+                context[property_name] = _column_value(
+                    values[first_invalid_row], integer
+                )
+            self.check(context)
+
+    def _raise_error(self, context, missing_properties, bad_properties):
+        missing_properties = sorted(missing_properties)
+        missing_properties_messages = [
+            "expected property '{}' is not defined".format(p)
+            for p in missing_properties
+        ]
+        bad_properties = sorted(bad_properties)
+        bad_properties_messages = [
+            "'{}' is not a valid value for property '{}' of type '{}'".format(
+                context[p], p, self.types[p]
+            )
+            for p in bad_properties
+        ]
+
+        errors = missing_properties_messages + bad_properties_messages
+        message = (
+            "Unable to take decision, the given context is not valid: "
+            + ", ".join(errors)
+            + "."
+        )
+
+        metadata = {}
+        if bad_properties:
+            metadata["badProperties"] = [
+                {"property": p, "type": self.types[p], "value": context[p]}
+                for p in bad_properties
+            ]
+        if missing_properties:
+            metadata["missingProperties"] = missing_properties
+
+        raise CraftAiDecisionError(message, metadata)
+
+
+def _to_list(values):
+    return values.tolist() if hasattr(values, "tolist") else list(values)
+
+
+def _is_valid_value(value, valid_types, validator):
+    return (
+        value is None or type(value) in valid_types or validator(value) or value == {}
+    )
+
+
+def _is_valid_numbers(values, property_type):
+    """Check a whole numpy array of numbers, `NaN` being missing values."""
+    if property_type == TYPES["time_of_day"]:
+        valid = (values >= 0) & (values < 24)
+    elif property_type in _INTEGER_BOUNDS:
+        lower, upper = _INTEGER_BOUNDS[property_type]
+        valid = (values >= lower) & (values <= upper) & (values % 1 == 0)
+    else:
+        return False
+    # pylint: disable-msg=comparison-with-itself
+    return bool((valid | (values != values)).all())
+
+
+def _column_value(value, integer):
+    """Give the value of a column as found in a context."""
+    if isinstance(value, float):
+        if math.isnan(value):
+            return None
+        if integer and value.is_integer():
+            return int(value)
+    return value
+
+
+def get_context_schema(configuration):
+    """Give the context schema of a configuration, compiled once for each of the
+    last configurations used. The configuration should not be modified afterwards.
+
+    :rtype: ContextSchema.
+    """
+    item = _context_schemas.get(id(configuration))
+    if item is not None and item[0] is configuration:
+        return item[1]
+    schema = ContextSchema(configuration)
+    # The configuration is kept so that its id is not reused by another one
+    _context_schemas[id(configuration)] = (configuration, schema)
+    while len(_context_schemas) > _CONTEXT_SCHEMAS_MAX_COUNT:
+        _context_schemas.popitem(last=False)
+    return schema
+
+
 ############################
 # Interpreter for V2 Trees #
 ############################
@@ -66,81 +307,52 @@ class InterpreterV2(object):
         decision_result["_version"] = _DECISION_VERSION
         return decision_result
 
-    # pylint: disable-msg=too-many-arguments, too-many-locals
+    # pylint: disable-msg=too-many-arguments
     @staticmethod
     def _decide_recursion(node, context, output_values, output_type, path):
-        # If we are on a leaf
-        if not (node.get("children") is not None and len(node.get("children"))):
-            # We check if a leaf has the key 'prediction' corresponging to a v2 tree
-            prediction = node.get("prediction")
-            if prediction is None:
-                prediction = node
-
-            predicted_value = prediction.get("value")
-            if predicted_value is None:
-                raise CraftAiNullDecisionError(
-                    """Unable to take decision: the decision tree has no valid"""
-                    """ predicted value for the given context.""",
-                    {"decision_rules": [node.get("decision_rule")]},
+        # Walk down the tree, only keeping the traversed nodes, and build the
+        # decision once at the end of the path.
+        nodes = [node]
+        while node.get("children") is not None and len(node.get("children")):
+            # Finding the first element in this node's childrens matching the
+            # operator condition with given context
+            matching_child_i, matching_child = InterpreterV2._find_matching_child(
+                node, context
+            )
+            if not matching_child:
+                break
+            path.append(str(matching_child_i))
+            nodes.append(matching_child)
+            node = matching_child
+
+        if node.get("children") is not None and len(node.get("children")):
+            # No child matches the context, we compute the probabilistic
+            # distribution from this node.
+            try:
+                result = InterpreterV2.compute_distribution(
+                    node, output_values, output_type, path
                 )
+            except CraftAiDecisionError as err:
+                if len(nodes) == 1:
+                    raise
+                raise CraftAiDecisionError(err.message, err.metadata)
+        else:
+            result = InterpreterV2._leaf_decision(nodes, path)
 
-            leaf = {
-                "predicted_value": predicted_value,
-                "confidence": prediction.get("confidence") or 0,
-                "decision_rules": [],
-                "nb_samples": prediction["nb_samples"],
-                "decision_path": "-".join(path),
-            }
-
-            distribution = prediction.get("distribution")
-            if (
-                not isinstance(distribution, list)
-                and "standard_deviation" in distribution
-            ):
-                leaf["standard_deviation"] = distribution.get("standard_deviation")
-                leaf["min"] = distribution.get("min")
-                leaf["max"] = distribution.get("max")
-            else:
-                leaf["distribution"] = distribution
-
-            return leaf
-        # Finding the first element in this node's childrens matching the
-        # operator condition with given context
-        matching_child_i, matching_child = InterpreterV2._find_matching_child(
-            node, context
-        )
-
-        # If there is no child corresponding matching the operators then we compute
-        # the probabilistic distribution from this node.
-        if not matching_child:
-            return InterpreterV2.compute_distribution(
-                node, output_values, output_type, path
-            )
-        # Add the matching child index to the path
-        path.append(str(matching_child_i))
-        # If a matching child is found, recurse
-        try:
-            result = InterpreterV2._decide_recursion(
-                matching_child, context, output_values, output_type, path
-            )
-        except CraftAiDecisionError as err:
-            metadata = err.metadata
-            if node.get("decision_rule"):
-                metadata["decision_rules"].insert(0, node["decision_rule"])
-            raise CraftAiDecisionError(err.message, metadata)
-
-        new_predicates = [
-            {
-                "property": matching_child["decision_rule"]["property"],
-                "operator": matching_child["decision_rule"]["operator"],
-                "operand": matching_child["decision_rule"]["operand"],
-            }
-        ]
+        if len(nodes) == 1:
+            return result
 
         final_result = {
             "predicted_value": result["predicted_value"],
             "confidence": result["confidence"],
-            "decision_rules": new_predicates + result["decision_rules"],
+            "decision_rules": [
+                {
+                    "property": n["decision_rule"]["property"],
+                    "operator": n["decision_rule"]["operator"],
+                    "operand": n["decision_rule"]["operand"],
+                }
+                for n in nodes[1:]
+            ],
             "nb_samples": result["nb_samples"],
             "decision_path": result["decision_path"],
         }
@@ -159,14 +371,66 @@ class InterpreterV2(object):
 
         return final_result
 
+    @staticmethod
+    def _leaf_decision(nodes, path):
+        leaf_node = nodes[-1]
+        # We check if a leaf has the key 'prediction' corresponging to a v2 tree
+        prediction = leaf_node.get("prediction")
+        if prediction is None:
+            prediction = leaf_node
+
+        predicted_value = prediction.get("value")
+        if predicted_value is None:
+            message = (
+                """Unable to take decision: the decision tree has no valid"""
+                """ predicted value for the given context."""
+            )
+            # The rules of the traversed nodes, as the leaf would have been reached
+            # through them
+            decision_rules = [
+                n["decision_rule"] for n in nodes[:-1] if n.get("decision_rule")
+            ]
+            decision_rules.append(leaf_node.get("decision_rule"))
+            if len(nodes) == 1:
+                raise CraftAiNullDecisionError(
+                    message, {"decision_rules": decision_rules}
+                )
+            raise CraftAiDecisionError(message, {"decision_rules": decision_rules})
+
+        leaf = {
+            "predicted_value": predicted_value,
+            "confidence": prediction.get("confidence") or 0,
+            "decision_rules": [],
+            "nb_samples": prediction["nb_samples"],
+            "decision_path": "-".join(path),
+        }
+
+        distribution = prediction.get("distribution")
+        if not isinstance(distribution, list) and "standard_deviation" in distribution:
+            leaf["standard_deviation"] = distribution.get("standard_deviation")
+            leaf["min"] = distribution.get("min")
+            leaf["max"] = distribution.get("max")
+        else:
+            leaf["distribution"] = distribution
+
+        return leaf
+
     @staticmethod
     def compute_distribution(node, output_values, output_type, path):
         result = InterpreterV2._distribution(node, output_type)
+        return InterpreterV2._distribution_decision(
+            result, output_values, output_type, path
+        )
+
+    @staticmethod
+    def _distribution_decision(result, output_values, output_type, path):
+        """Build the decision taken from the aggregated distribution of a subtree,
+        as given by `_distribution`."""
         if output_type in ["enum", "boolean"]:
             distribution, nb_samples = result
             final_result = {
                 "predicted_value": output_values[distribution.index(max(distribution))],
-                "distribution": distribution,
+                "distribution": list(distribution),
                 "nb_samples": nb_samples,
             }
         else:
@@ -289,61 +553,7 @@ class InterpreterV2(object):
 
     @staticmethod
     def _check_context(configuration, context):
-        # Extract the required properties (i.e. those that are not the output)
-        expected_properties = [
-            p for p in configuration["context"] if p not in configuration["output"]
-        ]
-
-        # Retrieve the missing properties
-        missing_properties = [p for p in expected_properties if p not in context]
-
-        # Validate the values
-        bad_properties = [
-            p
-            for p in expected_properties
-            if not InterpreterV2.validate_property_value(configuration, context, p)
-        ]
-        if missing_properties or bad_properties:
-            missing_properties = sorted(missing_properties)
-            missing_properties_messages = [
-                "expected property '{}' is not defined".format(p)
-                for p in missing_properties
-            ]
-            bad_properties = sorted(bad_properties)
-            bad_properties_messages = [
-                "'{}' is not a valid value for property '{}' of type '{}'".format(
-                    context[p], p, configuration["context"][p]["type"]
-                )
-                for p in bad_properties
-            ]
-
-            errors = missing_properties_messages + bad_properties_messages
-
-            # deal with missing properties
-            if errors:
-                message = (
-                    "Unable to take decision, the given context is not valid: "
-                    + errors.pop(0)
-                )
-
-                for error in errors:
-                    message = "".join((message, ", ", error))
-                message = message + "."
-
-                metadata = {}
-                if bad_properties:
-                    metadata["badProperties"] = [
-                        {
-                            "property": p,
-                            "type": configuration["context"][p]["type"],
-                            "value": context[p],
-                        }
-                        for p in bad_properties
-                    ]
-                if missing_properties:
-                    metadata["missingProperties"] = missing_properties
-
-                raise CraftAiDecisionError(message, metadata)
+        get_context_schema(configuration).check(context)
 
     @staticmethod
     def validate_property_value(configuration, context, property_name):
@@ -0,0 +1,209 @@
+import numpy as np
+
+from ..compiled_tree import (
+    CompiledTree,
+    _CompiledInterpreterV2,
+    _OP_IS,
+    _OP_GTE,
+    _OP_LT,
+    _OP_IN_INTERVAL,
+    _OP_IN_WRAPPING_INTERVAL,
+    _OP_IN_MULTI,
+)
+from ..errors import CraftAiDecisionError, CraftAiNullDecisionError
+from ..interpreter_v2 import _DECISION_VERSION
+from ..types import TYPES, GENERATED_TIME_TYPES
+
+NUMERICAL_TYPES = [TYPES["continuous"]] + GENERATED_TIME_TYPES
+
+
+def _equal(values, operand):
+    result = values == operand
+    # numpy returns a scalar when the comparison is not supported elementwise
+    if np.ndim(result) == 0:
+        return np.full(len(values), bool(result))
+    return np.asarray(result, dtype=bool)
+
+
+def _match(code, values, operand):
+    """Vectorized counterpart of the operators of `craft_ai.operators`.
+
+    Missing values are `NaN` in numerical columns and `None` or `NaN` in the other
+    ones, they never match any decision rule.
+    """
+    if code == _OP_IS:
+        return _equal(values, operand)
+    if code == _OP_GTE:
+        return values >= operand
+    if code == _OP_LT:
+        return values < operand
+    if code == _OP_IN_INTERVAL:
+        return (values >= operand[0]) & (values < operand[1])
+    if code == _OP_IN_WRAPPING_INTERVAL:
+        return (values >= operand[0]) | (values < operand[1])
+    if code == _OP_IN_MULTI:
+        return np.isin(values, operand)
+    return None
+
+
+def _prepare_column(property_name, values, property_type):
+    if property_type in NUMERICAL_TYPES:
+        try:
+            return np.asarray(values, dtype=float)
+        except (TypeError, ValueError):
+            raise CraftAiDecisionError(
+                """Unable to take decision, the given column for property '{}'"""
+                """ of type '{}' is not numerical.""".format(
+                    property_name, property_type
+                )
+            )
+    return np.asarray(values)
+
+
+def _route(table, columns, nb_rows):
+    """Route all the rows through the tree, level by level.
+
+    The nodes of the tables are laid out breadth first, so iterating over them in
+    order processes each level before the next one.
+
+    :return: the index of the node where the decision of each row is taken.
+    :rtype: numpy.ndarray.
+    """
+    end_nodes = np.zeros(nb_rows, dtype=np.int32)
+    rows_at = {0: np.arange(nb_rows)}
+    for node in range(len(table.leaf)):
+        rows = rows_at.pop(node, None)
+        if rows is None or not table.child_count[node]:
+            continue
+        first = table.first_child[node]
+        for child in range(first, first + table.child_count[node]):
+            if not rows.size:
+                break
+            mask = _match(
+                table.operator[child],
+                columns[table.feature[child]][rows],
+                table.operand[child],
+            )
+            if mask is None:
+                raise CraftAiDecisionError(
+                    """Invalid decision tree format, {} is not a valid"""
+                    """ decision operator.""".format(table.rule[child]["operator"])
+                )
+            matching_rows = rows[mask]
+            if matching_rows.size:
+                end_nodes[matching_rows] = child
+                rows_at[child] = matching_rows
+            rows = rows[~mask]
+        # The remaining rows matched no child, their decision is taken here.
+    return end_nodes
+
+
+def _decide_output(table, columns, nb_rows, output_type):
+    end_nodes = _route(table, columns, nb_rows)
+    nodes, inverse = np.unique(end_nodes, return_inverse=True)
+
+    # Each distinct node yields the same decision for all of its rows
+    decisions = []
+    errors = []
+    for node in nodes:
+        try:
+            decisions.append(
+                _CompiledInterpreterV2._node_decision(
+                    table, table.path_to(node), output_type
+                )
+            )
+            errors.append(None)
+        except CraftAiDecisionError as err:
+            decisions.append({})
+            errors.append(err.message)
+
+    def column(key, dtype, missing):
+        return np.array(
+            [missing if d.get(key) is None else d[key] for d in decisions], dtype=dtype,
+        )[inverse]
+
+    is_classification = output_type in [TYPES["enum"], TYPES["boolean"]]
+    result = {
+        "predicted_value": column(
+            "predicted_value", object if is_classification else float, np.nan
+        ),
+        "confidence": column("confidence", float, np.nan),
+        "nb_samples": column("nb_samples", float, np.nan),
+        "decision_path": column("decision_path", object, None),
+        "error": np.array(errors, dtype=object)[inverse],
+    }
+    if is_classification:
+        nb_classes = max(
+            (len(d.get("distribution") or []) for d in decisions), default=0
+        )
+        distributions = np.full((len(decisions), nb_classes), np.nan)
+        for i, decision in enumerate(decisions):
+            if decision.get("distribution"):
+                distributions[i] = decision["distribution"]
+        result["distribution"] = distributions[inverse]
+    else:
+        for key in ["standard_deviation", "min", "max"]:
+            result[key] = column(key, float, np.nan)
+    return result
+
+
+def decide_batch(tree, columns):
+    """Take the decisions of many contexts at once.
+
+    :param tree: decision tree as retrieved from the API, or `craft_ai.CompiledTree`.
+    :param columns: mapping from each context property to an array of its values,
+    e.g. a `dict` of numpy arrays or a `pandas.DataFrame`. All the arrays must have
+    the same length, missing values are given as `NaN` or `None`.
+
+    :return: for each output, a dict of arrays with one item per context:
+    "predicted_value", "confidence", "nb_samples", "decision_path", "error" (`None`
+    when a decision could be taken) and either a 2D "distribution" array or the
+    "standard_deviation", "min" and "max" arrays.
+    :rtype: dict.
+
+    :raises CraftAiDecisionError: if the tree is not a V2 tree or if a column is
+    missing or invalid.
+    """
+    if not isinstance(tree, CompiledTree):
+        tree = CompiledTree(tree)
+    interpreter = tree._interpreter
+    if not isinstance(interpreter, _CompiledInterpreterV2):
+        raise CraftAiDecisionError(
+            """Invalid decision tree format, batch decisions are only available"""
+            """ for trees of version 2."""
+        )
+
+    configuration = tree.configuration
+    expected_properties = interpreter.schema.properties
+    interpreter.schema.check_columns(columns)
+
+    prepared_columns = [
+        _prepare_column(
+            feature, columns[feature], configuration["context"][feature]["type"]
+        )
+        for feature in interpreter.features
+    ]
+    nb_rows = len(columns[expected_properties[0]]) if expected_properties else 0
+    for feature, values in zip(interpreter.features, prepared_columns):
+        if len(values) != nb_rows:
+            raise CraftAiDecisionError(
+                """Unable to take decision, the given column for property '{}'"""
+                """ has {} values instead of {}.""".format(
+                    feature, len(values), nb_rows
+                )
+            )
+
+    decision_result = {"output": {}}
+    for output in configuration["output"]:
+        table = interpreter.tables[output]
+        root_leaf = table.leaf[0]
+        if root_leaf is not None and root_leaf.get("value") is None:
+            raise CraftAiNullDecisionError(
+                """Unable to take decision: the decision tree is not based"""
+                """ on any context operations."""
+            )
+        decision_result["output"][output] = _decide_output(
+            table, prepared_columns, nb_rows, configuration["context"][output]["type"],
+        )
+    decision_result["_version"] = _DECISION_VERSION
+    return decision_result
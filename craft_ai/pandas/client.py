@@ -1,23 +1,23 @@
-import json
 import pandas as pd
 
 from .. import Client as VanillaClient
 from ..constants import DEFAULT_DECISION_TREE_VERSION
 from ..errors import CraftAiBadRequestError
+from ..helpers import EncodedEntity, encode_agent_operations
 from .interpreter import Interpreter
-from .utils import format_input, is_valid_property_value, create_timezone_df
-
-
-def chunker(to_be_chunked_df, chunk_size):
-    return (
-        to_be_chunked_df[pos : pos + chunk_size]
-        for pos in range(0, len(to_be_chunked_df), chunk_size)
-    )
+from .utils import encode_operations
 
 
 class Client(VanillaClient):
     """Client class for craft ai's API using pandas dataframe types"""
 
+    @staticmethod
+    def _get_timezone_column(agent):
+        for key, value in agent["configuration"]["context"].items():
+            if value["type"] == "timezone":
+                return key
+        return None
+
     def add_agent_operations(self, agent_id, operations):
         if isinstance(operations, pd.DataFrame):
             if not isinstance(operations.index, pd.DatetimeIndex):
@@ -30,32 +30,11 @@ class Client(VanillaClient):
                                      it must be tz-aware."""
                 )
             agent = super(Client, self).get_agent(agent_id)
-            operations = operations.copy(deep=True)
-
-            tz_col = [
-                key
-                for key, value in agent["configuration"]["context"].items()
-                if value["type"] == "timezone"
-            ]
-            if tz_col:
-                tz_col = tz_col[0]
-                operations[tz_col] = create_timezone_df(operations, tz_col).iloc[:, 0]
-
-            chunk_size = self.config["operationsChunksSize"]
-            for chunk in chunker(operations, chunk_size):
-                chunk_operations = [
-                    {
-                        "timestamp": row.name.value
-                        // 10 ** 9,  # Timestamp.value returns nanoseconds
-                        "context": {
-                            col: format_input(row[col])
-                            for col in chunk.columns
-                            if is_valid_property_value(col, row[col])
-                        },
-                    }
-                    for _, row in chunk.iterrows()
-                ]
-                super(Client, self).add_agent_operations(agent_id, chunk_operations)
+            encoded_operations = encode_operations(
+                operations, self._get_timezone_column(agent)
+            )
+            if encoded_operations:
+                super(Client, self).add_agent_operations(agent_id, encoded_operations)
 
             return {
                 "message": 'Successfully added %i operation(s) to the agent "%s/%s/%s" context.'
@@ -111,34 +90,15 @@ class Client(VanillaClient):
                     )
 
                 agent = super(Client, self).get_agent(agent_id)
-                tz_col = [
-                    key
-                    for key, value in agent["configuration"]["context"].items()
-                    if value["type"] == "timezone"
-                ]
-                if tz_col:
-                    tz_col = tz_col[0]
-                    operations[tz_col] = create_timezone_df(operations, tz_col).iloc[
-                        :, 0
-                    ]
-
-                new_operations = [
-                    {
-                        "timestamp": row.name.value
-                        // 10 ** 9,  # Timestamp.value returns nanoseconds
-                        "context": {
-                            col: format_input(row[col])
-                            for col in operations.columns
-                            if is_valid_property_value(col, row[col])
-                        },
-                    }
-                    for _, row in operations.iterrows()
-                ]
+                new_operations = encode_operations(
+                    operations, self._get_timezone_column(agent)
+                )
                 new_payload.append({"id": agent_id, "operations": new_operations})
             elif isinstance(operations, list):
-                # Check if the operations are serializable
-                json.dumps([agent])
-                new_payload.append({"id": agent_id, "operations": operations})
+                # Raises an error when the operations are not serializable, the
+                # encoding is then reused to send them
+                agent = {"id": agent_id, "operations": operations}
+                new_payload.append(EncodedEntity(agent, encode_agent_operations(agent)))
             else:
                 raise CraftAiBadRequestError(
                     "The operations are not put in a DataFrame or a list"
@@ -147,27 +107,39 @@ class Client(VanillaClient):
 
         return super(Client, self).add_agents_operations_bulk(new_payload)
 
+    @staticmethod
+    def _pages_to_df(pages, values_key):
+        """Build a DataFrame page by page, each page being freed once converted."""
+        frames = [
+            pd.DataFrame(
+                [item[values_key] for item in page],
+                index=pd.to_datetime(
+                    [item["timestamp"] for item in page], unit="s"
+                ).tz_localize("UTC"),
+            )
+            for page in pages
+            if page
+        ]
+        if not frames:
+            return pd.DataFrame(
+                [], index=pd.to_datetime([], unit="s").tz_localize("UTC")
+            )
+        if len(frames) == 1:
+            return frames[0]
+        # Same dtypes as a DataFrame built at once, e.g. when a column is missing
+        # from a whole page
+        return pd.concat(frames, sort=False).infer_objects()
+
     def get_agent_operations(self, agent_id, start=None, end=None):
-        operations_list = super(Client, self).get_agent_operations(agent_id, start, end)
-        return pd.DataFrame(
-            [operation["context"] for operation in operations_list],
-            index=pd.to_datetime(
-                [operation["timestamp"] for operation in operations_list], unit="s"
-            ).tz_localize("UTC"),
-        )
+        pages = self.iter_agent_operations(agent_id, start, end, by_page=True)
+        return self._pages_to_df(pages, "context")
 
     def get_agent_states(self, agent_id, start=None, end=None):
-        states = super(Client, self).get_agent_states(agent_id, start, end)
-
-        return pd.DataFrame(
-            [state["sample"] for state in states],
-            index=pd.to_datetime(
-                [state["timestamp"] for state in states], unit="s"
-            ).tz_localize("UTC"),
-        )
+        pages = self.iter_agent_states(agent_id, start, end, by_page=True)
+        return self._pages_to_df(pages, "sample")
 
     @staticmethod
-    def decide_from_contexts_df(tree, contexts_df):
+    def decide_from_contexts_df(tree, contexts_df, columnar=False):
         if isinstance(contexts_df, pd.DataFrame):
             if not isinstance(contexts_df.index, pd.DatetimeIndex):
                 raise CraftAiBadRequestError(
@@ -180,7 +152,7 @@ class Client(VanillaClient):
                 )
         else:
             raise CraftAiBadRequestError("Invalid data given, it is not a DataFrame.")
-        return Interpreter.decide_from_contexts_df(tree, contexts_df)
+        return Interpreter.decide_from_contexts_df(tree, contexts_df, columnar)
 
     def get_agent_decision_tree(
         self, agent_id, timestamp=None, version=DEFAULT_DECISION_TREE_VERSION
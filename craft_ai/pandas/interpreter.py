@@ -1,13 +1,40 @@
+import numpy as np
 import pandas as pd
 
 from .. import Interpreter as VanillaInterpreter, Time
-from ..errors import CraftAiNullDecisionError
-from .utils import is_valid_property_value, create_timezone_df, format_input
+from ..compiled_tree import CompiledTree, _CompiledInterpreterV2
+from ..errors import CraftAiDecisionError, CraftAiNullDecisionError
+from ..types import GENERATED_TIME_TYPES
+from .batch import decide_batch, NUMERICAL_TYPES, _route
+from .constants import MISSING_VALUE, OPTIONAL_VALUE
+from .utils import (
+    is_valid_property_value,
+    create_timezone_df,
+    create_time_features,
+    format_input,
+)
+
+
+def _sentinels(values):
+    """Give where the `MISSING_VALUE` and `OPTIONAL_VALUE` sentinels are, None
+    when the values can not hold them."""
+    if values.dtype.kind != "O":
+        return None
+    return (values == MISSING_VALUE) | (values == OPTIONAL_VALUE)
 
 
 class Interpreter(VanillaInterpreter):
+    decide_batch = staticmethod(decide_batch)
+
     @staticmethod
-    def decide_from_contexts_df(tree, contexts_df):
+    def decide_from_contexts_df(tree, contexts_df, columnar=False):
+        if columnar:
+            decisions_df = Interpreter._decide_from_contexts_df_columnar(
+                tree, contexts_df
+            )
+            if decisions_df is not None:
+                return decisions_df
+
         bare_tree, configuration, tree_version = VanillaInterpreter._parse_tree(tree)
         interpreter = VanillaInterpreter._get_interpreter(tree_version)
 
@@ -39,6 +66,144 @@ class Interpreter(VanillaInterpreter):
         )
         return pd.DataFrame(predictions_iter, index=df.index)
 
+    @staticmethod
+    def _decide_from_contexts_df_columnar(tree, contexts_df):
+        """Compute the same decisions as `decide_from_contexts_df`, column by column.
+
+        The generated time properties are derived from the DatetimeIndex, the
+        contexts are routed all at once through the compiled tree and the output
+        columns are filled from the decision of each reached node.
+
+        :return: the decisions or None when the contexts need to be handled row by
+        row, e.g. when one of them is invalid and the error has to be raised.
+        :rtype: pandas.DataFrame.
+        """
+        compiled_tree = CompiledTree(tree)
+        interpreter = compiled_tree._interpreter
+        if not isinstance(interpreter, _CompiledInterpreterV2) or contexts_df.empty:
+            return None
+
+        configuration = compiled_tree.configuration
+        context_configuration = configuration["context"]
+        expected_properties = [
+            p for p in context_configuration if p not in configuration["output"]
+        ]
+        generated_properties = [
+            p
+            for p in expected_properties
+            if context_configuration[p]["type"] in GENERATED_TIME_TYPES
+            and context_configuration[p].get("is_generated", True)
+        ]
+
+        tz_col = [
+            key
+            for key, value in context_configuration.items()
+            if value["type"] == "timezone"
+        ]
+        tz_col = tz_col[0] if tz_col else None
+        timezones = None
+        if tz_col:
+            timezones = create_timezone_df(contexts_df, tz_col).iloc[:, 0]
+            if timezones.isna().any():
+                return None
+            timezones = timezones.to_numpy()
+            sentinels = _sentinels(timezones)
+            if sentinels is not None and sentinels.any():
+                return None
+        try:
+            time_features = (
+                create_time_features(contexts_df.index, timezones)
+                if generated_properties
+                else {}
+            )
+        except (TypeError, ValueError, KeyError):
+            # Timezones the row by row decisions handle or report
+            return None
+
+        columns = {}
+        for property_name in expected_properties:
+            property_type = context_configuration[property_name]["type"]
+            if property_name in generated_properties:
+                columns[property_name] = time_features[property_type]
+                continue
+            if property_name == tz_col:
+                values = timezones
+            elif property_name in contexts_df.columns:
+                values = contexts_df[property_name].to_numpy()
+            else:
+                return None
+            if pd.isna(values).any():
+                # Handled as a missing property
+                return None
+            sentinels = _sentinels(values)
+            if sentinels is not None:
+                if (values == {}).any():
+                    # Dropped from the context, handled as a missing property
+                    return None
+                if sentinels.any():
+                    # Values matching no decision rule, as `None` and `{}` do
+                    values = values.copy()
+                    values[sentinels] = None
+            columns[property_name] = values
+
+        try:
+            compiled_tree._interpreter.schema.check_columns(columns)
+        except CraftAiDecisionError:
+            # Raised by the row by row decisions
+            return None
+        for property_name in expected_properties:
+            property_type = context_configuration[property_name]["type"]
+            if property_type in NUMERICAL_TYPES:
+                columns[property_name] = columns[property_name].astype(float)
+
+        nb_rows = len(contexts_df)
+        feature_columns = [columns[feature] for feature in interpreter.features]
+
+        # Decide for each output, keeping one row of results per distinct set of
+        # reached nodes.
+        end_nodes = []
+        for output in configuration["output"]:
+            table = interpreter.tables[output]
+            root_leaf = table.leaf[0]
+            if root_leaf is not None and root_leaf.get("value") is None:
+                error = CraftAiNullDecisionError(
+                    """Unable to take decision: the decision tree is not based"""
+                    """ on any context operations."""
+                )
+                return pd.DataFrame(
+                    [{"error": error.message}] * nb_rows, index=contexts_df.index
+                )
+            end_nodes.append(_route(table, feature_columns, nb_rows))
+
+        combinations, first_rows, positions = np.unique(
+            np.stack(end_nodes, axis=1), axis=0, return_index=True, return_inverse=True
+        )
+        # Keep the order in which the rows first reach each combination, it is the
+        # order in which the columns appear.
+        order = np.argsort(first_rows)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+
+        decisions = []
+        for combination in combinations[order]:
+            decision = {}
+            for output, node in zip(configuration["output"], combination):
+                table = interpreter.tables[output]
+                output_type = context_configuration[output]["type"]
+                try:
+                    output_decision = _CompiledInterpreterV2._node_decision(
+                        table, table.path_to(node), output_type
+                    )
+                except CraftAiDecisionError:
+                    return None
+                for key, value in output_decision.items():
+                    decision["{}_{}".format(output, key)] = value
+            decisions.append(decision)
+
+        decisions_df = pd.DataFrame(decisions).take(rank[positions.ravel()])
+        decisions_df.index = contexts_df.index
+        return decisions_df
+
     @staticmethod
     def decide_from_row(params):
         """
@@ -4,14 +4,19 @@ import re
 import string
 import importlib
 
+import numpy as np
 import pandas as pd
 from semver import VersionInfo
 from .constants import (
     MISSING_VALUE,
     OPTIONAL_VALUE,
 )
+from .. import codec
 from ..constants import REACT_CRAFT_AI_DECISION_TREE_VERSION
-from ..errors import CraftAiError
+from ..errors import CraftAiBadRequestError, CraftAiError
+from ..helpers import EncodedOperations
+from ..timezones import timezone_offset_in_sec
+from ..types import TYPES
 
 
 DUMMY_COLUMN_NAME = "CraftGeneratedDummy"
@@ -46,10 +51,141 @@ def create_timezone_df(df, name):
     if name in df.columns:
         timezone_df[name] = df[name].fillna(method="ffill")
     else:
-        timezone_df[name] = df.index.strftime("%z")
+        # Same as `df.index.strftime("%z")`, formatting each distinct offset once
+        offsets = (df.index.tz_localize(None) - df.index.tz_convert(None)).asi8
+        offsets = offsets // 10 ** 9
+        timezone_df[name] = pd.Series(offsets, index=df.index).map(
+            {offset: _format_utc_offset(offset) for offset in np.unique(offsets)}
+        )
     return timezone_df
 
 
+def _format_utc_offset(offset):
+    sign = "-" if offset < 0 else "+"
+    hours, seconds = divmod(abs(int(offset)), 3600)
+    minutes, seconds = divmod(seconds, 60)
+    formatted = "{}{:02d}{:02d}".format(sign, hours, minutes)
+    if seconds:
+        formatted += "{:02d}".format(seconds)
+    return formatted
+
+
+def create_time_features(index, timezones=None):
+    """Vectorized counterpart of `craft_ai.Time` for a whole DatetimeIndex.
+
+    :param pandas.DatetimeIndex index: tz-aware timestamps, truncated to the second
+    like `Time` does.
+    :param timezones: Optional. Array of the timezone of each timestamp, as accepted
+    by `craft_ai.Time`. If not given, the timezone of the index is used.
+
+    :return: the arrays of the generated time properties, keyed by property type.
+    :rtype: dict.
+    """
+    seconds = index.asi8 // 10 ** 9
+    if timezones is None:
+        local_times = pd.to_datetime(seconds, unit="s", utc=True).tz_convert(index.tz)
+    else:
+        offsets = pd.Series(timezones).map(
+            # Python scalars, numpy integers are not accepted as offsets
+            {tz: timezone_offset_in_sec(tz) for tz in pd.unique(timezones).tolist()}
+        )
+        local_times = pd.to_datetime(seconds + offsets.to_numpy(np.int64), unit="s")
+    return {
+        TYPES["time_of_day"]: local_times.hour.to_numpy()
+        + local_times.minute.to_numpy() / 60
+        + local_times.second.to_numpy() / 3600,
+        TYPES["day_of_week"]: local_times.dayofweek.to_numpy(),
+        TYPES["day_of_month"]: local_times.day.to_numpy(),
+        TYPES["month_of_year"]: local_times.month.to_numpy(),
+    }
+
+
+def _encode_value(name, prefix, value):
+    if not is_valid_property_value(name, value):
+        return ""
+    try:
+        return prefix + codec.encode_str(format_input(value))
+    except TypeError as err:
+        raise CraftAiBadRequestError(
+            "Invalid operations given, the value of property '{}' is not"
+            " serializable. {}".format(name, err)
+        )
+
+
+def _encode_column(name, values):
+    """Encode each cell of a column as a `,"name":value` JSON member.
+
+    Cells that are not valid property values are encoded as an empty string so that
+    they are dropped from the context.
+    """
+    prefix = ",{}:".format(codec.encode_str(str(name)))
+    kind = values.dtype.kind
+    if kind == "b":
+        return np.where(values, prefix + "true", prefix + "false").astype(object)
+    if kind in "iu":
+        return prefix + values.astype(str).astype(object)
+    if kind == "f":
+        values = values.astype(np.float64)
+        # Same shortest representation as `repr(float)`, used by the JSON codecs
+        text = values.astype(str).astype(object)
+        text[np.isposinf(values)] = "Infinity"
+        text[np.isneginf(values)] = "-Infinity"
+        return np.where(np.isnan(values), "", prefix + text)
+
+    fragments = np.empty(len(values), dtype=object)
+    encoded = {}
+    for i, value in enumerate(values):
+        try:
+            # The type is part of the key as `True == 1` and `1 == 1.0`
+            key = (value.__class__, value)
+            fragment = encoded.get(key)
+        except TypeError:
+            key = None
+            fragment = None
+        if fragment is None:
+            fragment = _encode_value(name, prefix, value)
+            if key is not None:
+                encoded[key] = fragment
+        fragments[i] = fragment
+    return fragments
+
+
+def encode_operations(df, timezone_column=None):
+    """Encode the rows of a tz-aware DataFrame as JSON operations, column by column.
+
+    The timestamp of each operation is taken from the index, cells that are not
+    valid property values, e.g. `NaN`, are dropped from the contexts and
+    `MISSING_VALUE` and `OPTIONAL_VALUE` are replaced by their JSON counterparts.
+
+    :param pandas.DataFrame df: operations with a tz-aware `DatetimeIndex`.
+    :param str timezone_column: Optional. Name of the timezone property of the
+    agent, it is filled for every operation, see `create_timezone_df`.
+
+    :return: one JSON encoded operation per row.
+    :rtype: craft_ai.helpers.EncodedOperations.
+    """
+    columns = {
+        name: values.to_numpy()
+        for name, values in df.items()
+        if name != DUMMY_COLUMN_NAME
+    }
+    if timezone_column:
+        columns[timezone_column] = (
+            create_timezone_df(df, timezone_column).iloc[:, 0].to_numpy()
+        )
+
+    contexts = np.full(len(df), "", dtype=object)
+    for name, values in columns.items():
+        contexts += _encode_column(name, values)
+
+    # Timestamps in seconds, the index is in nanoseconds
+    timestamps = (df.index.asi8 // 10 ** 9).astype(str).tolist()
+    return EncodedOperations(
+        '{"timestamp":' + timestamp + ',"context":{' + context[1:] + "}}"
+        for timestamp, context in zip(timestamps, contexts.tolist())
+    )
+
+
 def random_string(length=20):
     return "".join(choice(string.ascii_letters) for x in range(length))
 
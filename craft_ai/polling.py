@@ -0,0 +1,103 @@
+import datetime
+import random
+import threading
+
+from collections import Counter
+from email.utils import parsedate_to_datetime
+
+
+def parse_retry_after(value):
+    """Parse the value of a `Retry-After` header.
+
+    :param str value: either a number of seconds or an HTTP date.
+
+    :return: the number of seconds to wait, None if the value is not valid.
+    :rtype: float.
+    """
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=datetime.timezone.utc)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return max((date - now).total_seconds(), 0.0)
+
+
+class Backoff(object):
+    """Delays between the polls of a request whose result is not ready yet.
+
+    The delay grows exponentially from `interval` up to `max_interval`, each delay
+    being randomly shortened by up to a `jitter` fraction of itself so that clients
+    polling at the same time spread their requests.
+    """
+
+    def __init__(
+        self, interval, max_interval, multiplier, jitter, use_retry_after=True
+    ):
+        self.interval = interval
+        self.max_interval = max_interval
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.use_retry_after = use_retry_after
+
+    @classmethod
+    def from_config(cls, cfg):
+        return cls(
+            cfg["decisionTreeRetrievalInterval"],
+            cfg["decisionTreeRetrievalMaxInterval"],
+            cfg["decisionTreeRetrievalBackoff"],
+            cfg["decisionTreeRetrievalJitter"],
+            cfg["decisionTreeRetrievalUseRetryAfter"],
+        )
+
+    def delay(self, attempt, error=None):
+        """Return the delay in milliseconds before the poll following `attempt`.
+
+        :param int attempt: number of polls already done, starting at 1.
+        :param error: Optional. Error raised by the last poll, its `retryAfter`
+        metadata is used when the backoff uses the `Retry-After` hints.
+        """
+        retry_after = (error.metadata or {}).get("retryAfter") if error else None
+        if self.use_retry_after and retry_after is not None:
+            return retry_after * 1000
+        delay = min(self.interval * self.multiplier ** (attempt - 1), self.max_interval)
+        return delay * (1 - self.jitter * random.random())
+
+
+class PollingStats(object):
+    """Number of polls needed by the calls waiting for a long computation.
+
+    :ivar int calls: number of calls.
+    :ivar int polls: number of polls of all the calls.
+    :ivar float waited: time spent between the polls, in seconds.
+    :ivar collections.Counter polls_per_call: number of calls by number of polls.
+    :ivar int last_call_polls: number of polls of the last finished call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.polls = 0
+        self.waited = 0.0
+        self.polls_per_call = Counter()
+        self.last_call_polls = 0
+
+    def record(self, polls, waited):
+        with self._lock:
+            self.calls += 1
+            self.polls += polls
+            self.waited += waited
+            self.polls_per_call[polls] += 1
+            self.last_call_polls = polls
+
+    def __repr__(self):
+        return "PollingStats(calls={}, polls={}, waited={:.3f}, polls_per_call={})".format(
+            self.calls, self.polls, self.waited, dict(self.polls_per_call)
+        )
@@ -0,0 +1,121 @@
+import threading
+import time
+
+from collections import OrderedDict
+
+
+class TreeCache(object):
+    """Least recently used decision trees, up to a total size in bytes.
+
+    A cache can be shared by several threads. The cached trees are returned as is,
+    they should not be modified. Expired trees having validators, e.g. an `ETag`,
+    are kept until they are evicted so that they can be revalidated.
+
+    :ivar int max_bytes: maximum total size of the cached trees.
+    :ivar int size: total size of the cached trees.
+    :ivar int hits: number of lookups that found a tree.
+    :ivar int misses: number of lookups that did not find a tree.
+    :ivar int evictions: number of trees evicted to make room for others.
+    :ivar int revalidations: number of expired trees revalidated.
+    """
+
+    def __init__(self, max_bytes):
+        self._lock = threading.Lock()
+        # Key -> (tree, size, expiration time or None, validators or None)
+        self._trees = OrderedDict()
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.revalidations = 0
+
+    def get(self, key):
+        """Return the tree cached for `key`, None if it is missing or expired."""
+        with self._lock:
+            item = self._trees.get(key)
+            if item is not None and item[2] is not None and item[2] <= time.monotonic():
+                if item[3] is None:
+                    self._remove(key)
+                item = None
+            if item is None:
+                self.misses += 1
+                return None
+            self._trees.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def get_validators(self, key):
+        """Return the tree cached for `key` along with its validators, even if it
+        is expired, None if it is missing or has no validators."""
+        with self._lock:
+            item = self._trees.get(key)
+            if item is None or item[3] is None:
+                return None
+            return item[0], item[3]
+
+    def revalidate(self, key, ttl=None):
+        """Extend the expiration of the tree of `key`, still valid.
+
+        :param float ttl: Optional. Number of seconds the tree is cached, forever
+        by default.
+
+        :return: the tree of `key`, None if it is no longer cached.
+        """
+        with self._lock:
+            item = self._trees.get(key)
+            if item is None:
+                return None
+            expiration = None if ttl is None else time.monotonic() + ttl
+            self._trees[key] = (item[0], item[1], expiration, item[3])
+            self._trees.move_to_end(key)
+            self.revalidations += 1
+            return item[0]
+
+    def set(self, key, tree, size, ttl=None, validators=None):
+        """Cache `tree` for `key`, evicting the least recently used trees.
+
+        :param int size: size of the tree, in bytes.
+        :param float ttl: Optional. Number of seconds the tree is cached, forever
+        by default. The tree is not cached when it is not positive, unless it has
+        validators.
+        :param dict validators: Optional. Headers of a conditional request checking
+        whether the tree is still valid once it is expired.
+        """
+        if size > self.max_bytes or (ttl is not None and ttl <= 0 and not validators):
+            return
+        expiration = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            if key in self._trees:
+                self._remove(key)
+            self._trees[key] = (tree, size, expiration, validators or None)
+            self.size += size
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._trees)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        size = self._trees.pop(key)[1]
+        self.size -= size
+
+    def clear(self):
+        """Remove all the cached trees."""
+        with self._lock:
+            self._trees.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._trees)
+
+    def __repr__(self):
+        return (
+            "TreeCache(trees={}, size={}, hits={}, misses={}, evictions={}, "
+            "revalidations={})".format(
+                len(self),
+                self.size,
+                self.hits,
+                self.misses,
+                self.evictions,
+                self.revalidations,
+            )
+        )
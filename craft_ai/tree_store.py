@@ -0,0 +1,112 @@
+import os
+import tempfile
+import threading
+
+from urllib.parse import quote
+
+from . import codec
+
+
+def _escape(component):
+    """Escape a component of the path of a tree, for it to name a single file or
+    directory within the store whatever its characters, e.g. `/` or `..`."""
+    name = quote(str(component), safe="")
+    if name in ("", ".", ".."):
+        # Distinct from the other names, which only use `%` for valid escapes
+        return "%" + name.replace(".", "%2E")
+    return name
+
+
+class TreeStore(object):
+    """Directory of decision trees, downloaded once for the processes using it.
+
+    Each tree is stored in its own JSON file,
+    `{directory}/{kind}s/{entity_id}/{version}/{timestamp}.json`. Only the trees
+    at a given timestamp are stored, the latest trees of an entity change with its
+    operations. The files are written atomically so that several processes can
+    read and fill the same store. The files are not memory-mapped, each process
+    decodes its own copy of the trees it reads.
+
+    :ivar str directory: the directory of the store.
+    :ivar int hits: number of lookups that found a tree.
+    :ivar int misses: number of lookups that did not find a tree.
+    """
+
+    def __init__(self, directory):
+        self._lock = threading.Lock()
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key):
+        """Give the path of the file of the tree of `key`.
+
+        :param tuple key: the kind of the entity, "agent" or "generator", its id,
+        the timestamp of the tree and its version.
+        """
+        kind, entity_id, timestamp, version = key
+        if isinstance(timestamp, float) and timestamp.is_integer():
+            timestamp = int(timestamp)
+        return os.path.join(
+            self.directory,
+            "{}s".format(_escape(kind)),
+            _escape(entity_id),
+            _escape(version),
+            "{}.json".format(_escape(timestamp)),
+        )
+
+    def get(self, key):
+        """Return the tree stored for `key`, None if it is not stored."""
+        return self.get_with_size(key)[0]
+
+    def get_with_size(self, key):
+        """Return the tree stored for `key` and the size in bytes of its file, None
+        and 0 if it is not stored."""
+        tree = None
+        size = 0
+        if key[2] is not None:
+            try:
+                with open(self.path(key), "rb") as tree_file:
+                    encoded_tree = tree_file.read()
+                tree = codec.decode(encoded_tree)
+                size = len(encoded_tree)
+            except (OSError, ValueError):
+                # Missing, or partially written by another client
+                tree = None
+        with self._lock:
+            if tree is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return tree, size
+
+    def set(self, key, encoded_tree):
+        """Store the JSON encoding of the tree of `key`.
+
+        The latest trees, whose timestamp is None, are not stored. Failing to
+        write the file is not an error, the tree is only missing from the store.
+
+        :param bytes encoded_tree: the JSON encoding of the tree.
+        """
+        if key[2] is None:
+            return
+        path = self.path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            descriptor, temporary_path = tempfile.mkstemp(
+                dir=os.path.dirname(path), suffix=".tmp"
+            )
+            try:
+                with os.fdopen(descriptor, "wb") as tree_file:
+                    tree_file.write(encoded_tree)
+                os.replace(temporary_path, path)
+            except OSError:
+                os.remove(temporary_path)
+                raise
+        except OSError:
+            pass
+
+    def __repr__(self):
+        return "TreeStore(directory={!r}, hits={}, misses={})".format(
+            self.directory, self.hits, self.misses
+        )
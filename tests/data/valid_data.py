@@ -238,3 +238,106 @@ VALID_OPERATIONS_SET_COMPLETE_2 = [
         },
     },
 ]
+
+VALID_DECISION_TREE = {
+    "_version": "2.0.0",
+    "configuration": {
+        "context": {
+            "presence": {"type": "enum"},
+            "lightIntensity": {"type": "continuous"},
+            "time": {"type": "time_of_day"},
+            "tz": {"type": "timezone"},
+            "lightbulbColor": {"type": "enum"},
+        },
+        "output": ["lightbulbColor"],
+        "time_quantum": 100,
+    },
+    "trees": {
+        "lightbulbColor": {
+            "output_values": ["black", "white", "red"],
+            "children": [
+                {
+                    "decision_rule": {
+                        "property": "presence",
+                        "operator": "in",
+                        "operand": ["occupant", "player"],
+                    },
+                    "children": [
+                        {
+                            "decision_rule": {
+                                "property": "lightIntensity",
+                                "operator": "<",
+                                "operand": 0.5,
+                            },
+                            "prediction": {
+                                "value": "white",
+                                "confidence": 0.8,
+                                "nb_samples": 6,
+                                "distribution": [0.1, 0.8, 0.1],
+                            },
+                        },
+                        {
+                            "decision_rule": {
+                                "property": "lightIntensity",
+                                "operator": ">=",
+                                "operand": 0.5,
+                            },
+                            "prediction": {
+                                "value": "red",
+                                "confidence": 0.6,
+                                "nb_samples": 4,
+                                "distribution": [0.2, 0.2, 0.6],
+                            },
+                        },
+                    ],
+                },
+                {
+                    "decision_rule": {
+                        "property": "presence",
+                        "operator": "is",
+                        "operand": "none",
+                    },
+                    "children": [
+                        {
+                            "decision_rule": {
+                                "property": "time",
+                                "operator": "[in[",
+                                "operand": [22, 6],
+                            },
+                            "prediction": {
+                                "value": "black",
+                                "confidence": 0.9,
+                                "nb_samples": 9,
+                                "distribution": [0.9, 0.05, 0.05],
+                            },
+                        },
+                        {
+                            "decision_rule": {
+                                "property": "time",
+                                "operator": "[in[",
+                                "operand": [6, 22],
+                            },
+                            "prediction": {
+                                "value": "white",
+                                "confidence": 0.5,
+                                "nb_samples": 1,
+                                "distribution": [0.25, 0.5, 0.25],
+                            },
+                        },
+                    ],
+                },
+            ],
+        }
+    },
+}
+
+VALID_DECISION_TREE_CONTEXTS = [
+    {"presence": "player", "lightIntensity": 0.2, "time": 10, "tz": "+02:00"},
+    {"presence": "occupant", "lightIntensity": 0.7, "time": 10, "tz": "+02:00"},
+    {"presence": "none", "lightIntensity": 0.7, "time": 23.5, "tz": "+02:00"},
+    {"presence": "none", "lightIntensity": 0.7, "time": 3, "tz": 2},
+    {"presence": "none", "lightIntensity": 0.7, "time": 12, "tz": "+02:00"},
+    {"presence": "none", "lightIntensity": 0.7, "time": None, "tz": "+02:00"},
+    {"presence": "unknown", "lightIntensity": 0.7, "time": 12, "tz": "+02:00"},
+    {"presence": "player", "lightIntensity": {}, "time": 12, "tz": "+02:00"},
+]
@@ -0,0 +1,68 @@
+"""Local stand-in of the decision tree endpoints of the craft ai API."""
+import hashlib
+import json
+import re
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TREE_PATH_RE = re.compile(
+    r"^/api/v1/[^/]+/[^/]+/(agents/([^/]+)/decision/tree|generators/([^/]+)/tree)"
+)
+
+
+class StandInServer(object):
+    """Serve the latest decision trees of `trees`, by entity id, along with an
+    `ETag` header, and answer 304 to the conditional requests of unchanged trees.
+
+    :ivar list requests: the path and headers of each received request.
+    """
+
+    def __init__(self, trees=None):
+        self.trees = trees or {}
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                server.requests.append((self.path, dict(self.headers)))
+                match = TREE_PATH_RE.match(self.path)
+                tree = server.trees.get(match and (match.group(2) or match.group(3)))
+                if tree is None:
+                    return self._send(404, {"message": "Unknown entity"})
+                body = json.dumps(tree).encode("utf-8")
+                etag = '"{}"'.format(hashlib.sha1(body).hexdigest())
+                if self.headers.get("If-None-Match") == etag:
+                    return self._send(304)
+                return self._send(200, body, {"ETag": etag})
+
+            def _send(self, status, body=None, headers=None):
+                if isinstance(body, dict):
+                    body = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                if body is not None:
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                else:
+                    self.send_header("Content-Length", "0")
+                self.end_headers()
+                if body is not None:
+                    self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = "http://127.0.0.1:{}".format(self._server.server_port)
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self._server.shutdown()
+        self._server.server_close()
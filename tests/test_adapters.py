@@ -0,0 +1,92 @@
+import gzip
+import unittest
+
+import craft_ai
+from craft_ai.adapters import TimeoutHTTPAdapter, get_retry
+
+from . import settings
+
+
+class TestGetRetry(unittest.TestCase):
+    def test_get_retry_only_retries_get_requests(self):
+        retry = get_retry(3)
+        self.assertEqual(retry.total, 3)
+        self.assertTrue(retry.is_retry("GET", 503))
+        self.assertFalse(retry.is_retry("POST", 503))
+        self.assertFalse(retry.is_retry("GET", 500))
+
+    def test_get_retry_without_retries(self):
+        retry = get_retry(0)
+        self.assertEqual(retry.total, 0)
+        self.assertFalse(retry.is_retry("GET", 503))
+
+
+class TestClientTransport(unittest.TestCase):
+    def test_default_transport(self):
+        client = craft_ai.Client(settings.CRAFT_CFG)
+        adapter = client._requests_session.get_adapter(client.config["url"])
+
+        self.assertIsInstance(adapter, TimeoutHTTPAdapter)
+        self.assertEqual(adapter.timeout, (10, None))
+        self.assertEqual(adapter._pool_connections, 10)
+        self.assertEqual(adapter._pool_maxsize, 10)
+        self.assertEqual(adapter.max_retries.total, 3)
+        self.assertNotIn("Connection", client._requests_session.headers)
+
+    def test_configured_transport(self):
+        client = craft_ai.Client(
+            {
+                **settings.CRAFT_CFG,
+                "connectionPoolSize": 2,
+                "maxConnectionsPerHost": 32,
+                "connectTimeout": 500,
+                "readTimeout": 60000,
+                "keepAlive": False,
+                "getRetries": 0,
+            }
+        )
+        adapter = client._requests_session.get_adapter(client.config["url"])
+
+        self.assertEqual(adapter.timeout, (0.5, 60))
+        self.assertEqual(adapter._pool_connections, 2)
+        self.assertEqual(adapter._pool_maxsize, 32)
+        self.assertEqual(adapter.max_retries.total, 0)
+        self.assertEqual(client._requests_session.headers["Connection"], "close")
+
+    def test_pool_grows_with_chunks_concurrency(self):
+        client = craft_ai.Client(
+            {**settings.CRAFT_CFG, "operationsChunksConcurrency": 16}
+        )
+        adapter = client._requests_session.get_adapter(client.config["url"])
+        self.assertEqual(adapter._pool_maxsize, 16)
+
+
+class TestCompressRequest(unittest.TestCase):
+    ct_header = {"Content-Type": "application/json; charset=utf-8"}
+
+    def test_compress_request_disabled_by_default(self):
+        client = craft_ai.Client(settings.CRAFT_CFG)
+        body = "[" + ",".join(['{"a": 1}'] * 1000) + "]"
+        self.assertEqual(
+            client._compress_request(self.ct_header, body), (self.ct_header, body)
+        )
+
+    def test_compress_request_above_threshold(self):
+        client = craft_ai.Client(
+            {
+                **settings.CRAFT_CFG,
+                "compressRequests": True,
+                "compressRequestsThreshold": 100,
+            }
+        )
+
+        headers, body = client._compress_request(self.ct_header, '{"a": 1}')
+        self.assertEqual(headers, self.ct_header)
+        self.assertEqual(body, b'{"a": 1}')
+
+        large_body = "[" + ",".join(['{"a": 1}'] * 1000) + "]"
+        headers, body = client._compress_request(self.ct_header, large_body)
+        self.assertEqual(headers, {**self.ct_header, "Content-Encoding": "gzip"})
+        self.assertLess(len(body), len(large_body) / 10)
+        self.assertEqual(gzip.decompress(body).decode("utf-8"), large_body)
+        self.assertNotIn("Content-Encoding", self.ct_header)
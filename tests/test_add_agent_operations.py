@@ -63,6 +63,36 @@ class TestAddOperationsSuccess(unittest.TestCase):
         self.assertTrue("message" in resp_keys)
         self.assertEqual(resp["added_operations_count"], len(operations))
 
+    def test_add_agent_operations_concurrently(self):
+        """add_agent_operations should succeed when sending chunks concurrently
+
+        It should give the same response as when the chunks are sent one after
+        the other.
+        """
+        client = craft_ai.Client(
+            {
+                **settings.CRAFT_CFG,
+                "operationsChunksSize": 100,
+                "operationsChunksConcurrency": 4,
+            }
+        )
+        operations = copy.deepcopy(valid_data.VALID_OPERATIONS_SET[:])
+
+        while len(operations) < 2000:
+            new_operation = operations[-1].copy()
+            new_operation["timestamp"] += 10
+            operations.append(new_operation)
+
+        resp = client.add_agent_operations(
+            self.agent_id,
+            sorted(operations, key=lambda operation: operation["timestamp"]),
+        )
+
+        self.assertEqual(resp["added_operations_count"], len(operations))
+        self.assertEqual(
+            len(client.get_agent_operations(self.agent_id)), len(operations)
+        )
+
     def test_add_agent_operations_with_some_duplicates(self):
         """add_agent_operations should succeed and lmerge duplicate timestamps
         """
@@ -161,6 +161,35 @@ class TestAddOperationsGroupAgentsBulkSuccess(unittest.TestCase):
 
         self.addCleanup(self.clean_up_agents, self.agents)
 
+    def test_add_agents_operations_bulk_concurrently(self):
+        """add_agents_operations_bulk should succeed when sending chunks concurrently
+
+        It should give the responses of the agents in the order of the payload.
+        """
+        client = Client(
+            {
+                **settings.CRAFT_CFG,
+                "operationsChunksSize": len(valid_data.VALID_OPERATIONS_SET) * 2,
+                "operationsChunksConcurrency": 3,
+            }
+        )
+        payload = []
+        for agent_id in self.agents:
+            payload.append(
+                {"id": agent_id, "operations": valid_data.VALID_OPERATIONS_SET}
+            )
+
+        response = client.add_agents_operations_bulk(payload)
+
+        self.assertEqual([resp.get("id") for resp in response], self.agents)
+        for resp in response:
+            self.assertEqual(resp.get("status"), 201)
+            self.assertEqual(
+                resp["added_operations_count"], len(valid_data.VALID_OPERATIONS_SET)
+            )
+
+        self.addCleanup(self.clean_up_agents, self.agents)
+
 
 class TestAddOperationsBulkFailure(unittest.TestCase):
     """Checks that the client fail when adding operations to
@@ -297,3 +326,36 @@ class TestAddOperationsBulkSomeFailure(unittest.TestCase):
         self.assertTrue(len(resp) == 1)
 
         self.addCleanup(self.clean_up_agent, self.agent_id)
+
+    def test_add_agents_operations_bulk_some_invalid_chunk(self):
+        """add_agents_operations_bulk should succeed when some chunks fail.
+
+        It should give the error of the failing chunk for its agents and add the
+        operations of the other chunks.
+        """
+        client = Client(
+            {
+                **settings.CRAFT_CFG,
+                "operationsChunksSize": len(valid_data.VALID_OPERATIONS_SET),
+            }
+        )
+        invalid_agent_id = generate_entity_id("test_add_agents_operations_bulk")
+        client.delete_agent(invalid_agent_id)
+        client.create_agent(valid_data.VALID_CONFIGURATION, invalid_agent_id)
+        payload = [
+            {"id": self.agent_id, "operations": valid_data.VALID_OPERATIONS_SET},
+            {
+                "id": invalid_agent_id,
+                "operations": invalid_data.INVALID_OPS_SET["invalid_operation"],
+            },
+        ]
+
+        resp = client.add_agents_operations_bulk(payload)
+
+        self.assertEqual(resp[0].get("id"), self.agent_id)
+        self.assertEqual(resp[0].get("status"), 201)
+        self.assertEqual(resp[1].get("id"), invalid_agent_id)
+        self.assertIsInstance(resp[1].get("error"), craft_err.CraftAiBadRequestError)
+
+        self.addCleanup(self.clean_up_agent, self.agent_id)
+        self.addCleanup(self.clean_up_agent, invalid_agent_id)
@@ -0,0 +1,96 @@
+import unittest
+
+from craft_ai.aio import CRAFTAI_AIO_ENABLED
+
+if CRAFTAI_AIO_ENABLED:
+    import asyncio
+
+    import craft_ai
+    from craft_ai.aio import AsyncClient
+    from craft_ai.aio.client import _Response
+
+    from . import settings
+    from .utils import generate_entity_id
+    from .data import valid_data, invalid_data
+
+
+@unittest.skipIf(CRAFTAI_AIO_ENABLED is False, "aiohttp is not installed")
+class TestAsyncClient(unittest.TestCase):
+    """Checks that the asyncio client behaves like the synchronous one"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.agent_id = generate_entity_id("test_aio_client")
+
+    def run_with_client(self, coroutine_function, cfg=None):
+        async def run():
+            async with AsyncClient({**settings.CRAFT_CFG, **(cfg or {})}) as client:
+                return await coroutine_function(client)
+
+        return asyncio.run(run())
+
+    def test_agent_lifecycle(self):
+        async def lifecycle(client):
+            await client.delete_agent(self.agent_id)
+            agent = await client.create_agent(
+                valid_data.VALID_CONFIGURATION, self.agent_id
+            )
+            added = await client.add_agent_operations(
+                self.agent_id, valid_data.VALID_OPERATIONS_SET
+            )
+            operations = await client.get_agent_operations(self.agent_id)
+            tree = await client.get_agent_decision_tree(
+                self.agent_id, valid_data.VALID_LAST_TIMESTAMP
+            )
+            await client.delete_agent(self.agent_id)
+            return agent, added, operations, tree
+
+        agent, added, operations, tree = self.run_with_client(
+            lifecycle, {"operationsChunksSize": 2, "operationsChunksConcurrency": 2}
+        )
+
+        self.assertEqual(agent.get("id"), self.agent_id)
+        self.assertEqual(
+            added["added_operations_count"], len(valid_data.VALID_OPERATIONS_SET)
+        )
+        self.assertEqual(len(operations), len(valid_data.VALID_OPERATIONS_SET))
+        self.assertIsInstance(tree, dict)
+        self.assertTrue("trees" in tree)
+
+    def test_get_agent_not_found(self):
+        self.assertRaises(
+            craft_ai.errors.CraftAiNotFoundError,
+            self.run_with_client,
+            lambda client: client.get_agent(invalid_data.UNKNOWN_ID),
+        )
+
+    def test_get_agent_with_invalid_id(self):
+        for invalid_id in invalid_data.UNDEFINED_KEY.values():
+            self.assertRaises(
+                craft_ai.errors.CraftAiBadRequestError,
+                self.run_with_client,
+                lambda client, agent_id=invalid_id: client.get_agent(agent_id),
+            )
+
+    def test_page_error_ends_the_iteration(self):
+        async def request(method, url, headers=None, params=None, data=None):
+            if url.endswith("page=2"):
+                raise RuntimeError("unexpected")
+            return _Response(200, {"x-craft-ai-next-page-url": url + "?page=2"}, b"[1]")
+
+        async def iter_operations(client):
+            client._request = request
+            operations = []
+            with self.assertRaises(RuntimeError):
+                async for operation in client.iter_agent_operations(self.agent_id):
+                    operations.append(operation)
+            return operations
+
+        for prefetch in [0, 2]:
+            self.assertEqual(
+                self.run_with_client(
+                    lambda client: asyncio.wait_for(iter_operations(client), 5),
+                    {"operationsPagesPrefetch": prefetch},
+                ),
+                [1],
+            )
@@ -0,0 +1,74 @@
+import unittest
+
+from unittest import mock
+
+from craft_ai import Client, codec, errors as craft_err
+
+
+class TestCodec(unittest.TestCase):
+    def check_codec(self, json_codec):
+        obj = {"id": "agent", "operations": [{"timestamp": 1, "context": {"a": 1.5}}]}
+        encoded = json_codec.encode(obj)
+        self.assertIsInstance(encoded, bytes)
+        self.assertEqual(json_codec.decode(encoded), obj)
+        self.assertEqual(json_codec.decode(encoded.decode("utf-8")), obj)
+        self.assertEqual(json_codec.decode(json_codec.encode("é")), "é")
+        self.assertEqual(json_codec.decode(json_codec.encode({1: 2})), {"1": 2})
+        self.assertRaises(TypeError, json_codec.encode, {"a": object()})
+        self.assertRaises(ValueError, json_codec.decode, b"{invalid")
+
+    def test_stdlib_codec(self):
+        self.check_codec(codec.StdlibJsonCodec())
+
+    @unittest.skipIf(codec.orjson is None, "orjson is not installed")
+    def test_orjson_codec(self):
+        self.check_codec(codec.OrjsonCodec())
+        # Falls back to the standard library for the values orjson does not support
+        self.assertEqual(codec.OrjsonCodec.encode(2 ** 70), str(2 ** 70).encode())
+
+    def test_set_codec(self):
+        default_codec = codec.get_codec()
+        try:
+            codec.set_codec(codec.StdlibJsonCodec())
+            self.assertEqual(codec.encode([1, 2]), b"[1, 2]")
+            self.assertEqual(codec.encode_str([1, 2]), "[1, 2]")
+            self.assertEqual(codec.decode(b"[1, 2]"), [1, 2])
+        finally:
+            codec.set_codec(default_codec)
+
+    def test_response_decoded_once(self):
+        decode = mock.Mock(wraps=codec.decode)
+        response = mock.Mock(status_code=200, content=b'{"message": "ok"}')
+        with mock.patch.object(codec, "decode", decode):
+            self.assertEqual(Client._decode_response(response), {"message": "ok"})
+            self.assertEqual(decode.call_count, 1)
+
+            response = mock.Mock(
+                status_code=404, content=b'{"message": "missing"}', headers={}
+            )
+            with self.assertRaises(craft_err.CraftAiNotFoundError) as error:
+                Client._decode_response(response)
+            self.assertEqual(error.exception.message, "missing")
+            self.assertEqual(decode.call_count, 2)
+
+    def test_decode_items(self):
+        self.assertEqual(
+            codec.decode_items(b' [{"a": [1, 2]} ,3, "\xc3\xa9"] '),
+            ([{"a": [1, 2]}, 3, "é"], [b'{"a": [1, 2]}', b"3", b'"\xc3\xa9"']),
+        )
+        self.assertEqual(codec.decode_items("[]"), ([], []))
+        for invalid in [b'{"a": 1}', b"[1 2]", b"[1,]", b"[1", b"[1] 2"]:
+            self.assertRaises(ValueError, codec.decode_items, invalid)
+
+    def test_response_items(self):
+        response = mock.Mock(
+            status_code=200,
+            content=b'[{"id": "a", "tree": {}}, {"status": 404, "message": "m"}]',
+        )
+        items, encoded_items = Client._decode_response_items(response)
+        self.assertEqual(items[0], {"id": "a", "tree": {}})
+        self.assertIsInstance(items[1]["error"], craft_err.CraftAiNotFoundError)
+        self.assertEqual(
+            encoded_items,
+            [b'{"id": "a", "tree": {}}', b'{"status": 404, "message": "m"}'],
+        )
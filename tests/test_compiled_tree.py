@@ -0,0 +1,208 @@
+import copy
+import unittest
+
+from craft_ai import CompiledTree, Decision, Interpreter, Time, errors as craft_err
+
+from .data import valid_data
+
+TREE = valid_data.VALID_DECISION_TREE
+CONTEXTS = valid_data.VALID_DECISION_TREE_CONTEXTS
+
+
+class TestCompiledTree(unittest.TestCase):
+    def test_decide_same_as_interpreter(self):
+        compiled_tree = CompiledTree(TREE)
+        for context in CONTEXTS:
+            with self.subTest(context=context):
+                self.assertEqual(
+                    compiled_tree.decide(copy.copy(context)),
+                    Interpreter.decide(TREE, [copy.copy(context)]),
+                )
+
+    def test_decide_with_time(self):
+        compiled_tree = CompiledTree(TREE)
+        context = {"presence": "none", "lightIntensity": 0.7, "tz": "+02:00"}
+        time = Time(1458741230, "+02:00")
+        self.assertEqual(
+            compiled_tree.decide(dict(context), time),
+            Interpreter.decide(TREE, [dict(context), time]),
+        )
+
+    def test_decide_decision_rules(self):
+        decision = CompiledTree(TREE).decide(CONTEXTS[2])
+        output = decision["output"]["lightbulbColor"]
+        self.assertEqual(output["predicted_value"], "black")
+        self.assertEqual(output["decision_path"], "0-1-0")
+        self.assertEqual(
+            output["decision_rules"],
+            [
+                {"property": "presence", "operator": "is", "operand": "none"},
+                {"property": "time", "operator": "[in[", "operand": [22, 6]},
+            ],
+        )
+
+    def test_decide_invalid_context(self):
+        compiled_tree = CompiledTree(TREE)
+        context = {"presence": "none", "lightIntensity": "bright", "time": 12}
+        with self.assertRaises(craft_err.CraftAiDecisionError) as expected:
+            Interpreter.decide(TREE, [dict(context)])
+        with self.assertRaises(craft_err.CraftAiDecisionError) as compiled:
+            compiled_tree.decide(dict(context))
+        self.assertEqual(compiled.exception.message, expected.exception.message)
+        self.assertEqual(compiled.exception.metadata, expected.exception.metadata)
+
+    def test_invalid_tree(self):
+        self.assertRaises(craft_err.CraftAiDecisionError, CompiledTree, {})
+        self.assertRaises(
+            craft_err.CraftAiDecisionError, CompiledTree, {"_version": "42.0.0"}
+        )
+
+    def test_decide_fallback_distribution(self):
+        for output_type in ["enum", "continuous"]:
+            tree = _fallback_tree(output_type)
+            compiled_tree = CompiledTree(tree)
+            for context in [{"x": None}, {"x": 0.7}]:
+                with self.subTest(output_type=output_type, context=context):
+                    self.assertEqual(
+                        compiled_tree.decide(dict(context)),
+                        Interpreter.decide(tree, [dict(context)]),
+                    )
+
+    def test_decide_fallback_distribution_not_shared(self):
+        compiled_tree = CompiledTree(_fallback_tree("enum"))
+        decision = compiled_tree.decide({"x": None})
+        decision["output"]["y"]["distribution"][0] = 42
+        self.assertEqual(
+            compiled_tree.decide({"x": None})["output"]["y"]["distribution"],
+            [0.5, 0.25, 0.25],
+        )
+
+    def test_decide_fallback_distribution_invalid_leaf(self):
+        tree = _fallback_tree("continuous")
+        del tree["trees"]["y"]["children"][1]["children"][0]["prediction"][
+            "distribution"
+        ]["standard_deviation"]
+        compiled_tree = CompiledTree(tree)
+        with self.assertRaises(craft_err.CraftAiDecisionError) as expected:
+            Interpreter.decide(tree, [{"x": None}])
+        for _ in range(2):
+            with self.assertRaises(craft_err.CraftAiDecisionError) as compiled:
+                compiled_tree.decide({"x": None})
+            self.assertEqual(compiled.exception.message, expected.exception.message)
+        # The decisions that do not fall back on the invalid leaf are not affected
+        self.assertEqual(
+            compiled_tree.decide({"x": 0.2}), Interpreter.decide(tree, [{"x": 0.2}])
+        )
+
+    def test_decide_outputs_same_as_decide(self):
+        compiled_tree = CompiledTree(TREE)
+        for context in CONTEXTS:
+            with self.subTest(context=context):
+                try:
+                    expected = compiled_tree.decide(dict(context))
+                except craft_err.CraftAiDecisionError:
+                    self.assertRaises(
+                        craft_err.CraftAiDecisionError,
+                        compiled_tree.decide_outputs,
+                        dict(context),
+                    )
+                    continue
+                decision = compiled_tree.decide_outputs(dict(context))["lightbulbColor"]
+                self.assertIsInstance(decision, Decision)
+                self.assertEqual(
+                    decision.to_dict(), expected["output"]["lightbulbColor"]
+                )
+
+    def test_decide_outputs_lazy_attributes(self):
+        for output_type in ["enum", "continuous"]:
+            compiled_tree = CompiledTree(_fallback_tree(output_type))
+            for context in [{"x": None}, {"x": 0.7}, {"x": 0.1}]:
+                with self.subTest(output_type=output_type, context=context):
+                    decision = compiled_tree.decide_outputs(dict(context))["y"]
+                    expected = compiled_tree.decide(dict(context))["output"]["y"]
+                    for key in [
+                        "predicted_value",
+                        "confidence",
+                        "nb_samples",
+                        "decision_rules",
+                        "decision_path",
+                        "distribution",
+                        "standard_deviation",
+                        "min",
+                        "max",
+                    ]:
+                        self.assertEqual(getattr(decision, key), expected.get(key))
+        self.assertFalse(hasattr(decision, "__dict__"))
+
+    def test_decide_null_leaf(self):
+        tree = _fallback_tree("enum")
+        leaf = tree["trees"]["y"]["children"][1]["children"][0]
+        leaf["prediction"]["value"] = None
+        compiled_tree = CompiledTree(tree)
+        for decide in [
+            lambda context: Interpreter.decide(tree, [context]),
+            compiled_tree.decide,
+            compiled_tree.decide_outputs,
+        ]:
+            with self.assertRaises(craft_err.CraftAiDecisionError) as error:
+                decide({"x": 0.55})
+            self.assertEqual(
+                error.exception.metadata,
+                {
+                    "decision_rules": [
+                        tree["trees"]["y"]["children"][1]["decision_rule"],
+                        leaf["decision_rule"],
+                    ]
+                },
+            )
+
+
+def _fallback_leaf(value, operator, operand, output_type, nb_samples):
+    if output_type == "enum":
+        distribution = [0.0, 0.0, 0.0]
+        distribution["abc".index(value)] = 1.0
+    else:
+        distribution = {"standard_deviation": 0.5, "min": 0, "max": 10}
+    return {
+        "decision_rule": {"property": "x", "operator": operator, "operand": operand},
+        "prediction": {
+            "value": value,
+            "confidence": 0.8,
+            "nb_samples": nb_samples,
+            "distribution": distribution,
+        },
+    }
+
+
+def _fallback_tree(output_type):
+    """Tree of depth 2 on `x` whose decisions fall back on distributions when `x`
+    is missing, and in the right subtree when `x` is at least 0.5."""
+    values = ["a", "a", "b", "c"] if output_type == "enum" else [1, 2, 3, 4]
+    root = {
+        "children": [
+            {
+                "decision_rule": {"property": "x", "operator": "<", "operand": 0.5},
+                "children": [
+                    _fallback_leaf(values[0], "<", 0.25, output_type, 1),
+                    _fallback_leaf(values[1], ">=", 0.25, output_type, 1),
+                ],
+            },
+            {
+                "decision_rule": {"property": "x", "operator": ">=", "operand": 0.5},
+                "children": [
+                    _fallback_leaf(values[2], "<", 0.6, output_type, 1),
+                    _fallback_leaf(values[3], "[in[", [0.8, 0.9], output_type, 1),
+                ],
+            },
+        ]
+    }
+    if output_type == "enum":
+        root["output_values"] = ["a", "b", "c"]
+    return {
+        "_version": "2.0.0",
+        "configuration": {
+            "output": ["y"],
+            "context": {"x": {"type": "continuous"}, "y": {"type": output_type}},
+        },
+        "trees": {"y": root},
+    }
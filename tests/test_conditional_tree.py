@@ -0,0 +1,101 @@
+import unittest
+
+import craft_ai
+from craft_ai.aio import CRAFTAI_AIO_ENABLED
+
+from . import settings
+from .stand_in_server import StandInServer
+
+if CRAFTAI_AIO_ENABLED:
+    import asyncio
+
+    from craft_ai.aio import AsyncClient
+
+TREE = {"_version": "2.0.0", "configuration": {}, "trees": {"value": {}}}
+CFG = {"decisionTreeCacheMaxBytes": 10000, "decisionTreeCacheLatestTtl": 0}
+
+
+class TestConditionalTree(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInServer({"agent_1": TREE, "generator_1": TREE})
+        self.server.__enter__()
+        self.cfg = {**settings.CRAFT_CFG, **CFG, "url": self.server.url}
+
+    def tearDown(self):
+        self.server.__exit__()
+
+    def test_revalidates_the_latest_tree(self):
+        client = craft_ai.Client(self.cfg)
+        tree = client.get_agent_decision_tree("agent_1")
+
+        self.assertEqual(tree, TREE)
+        self.assertIs(client.get_agent_decision_tree("agent_1"), tree)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertNotIn("If-None-Match", self.server.requests[0][1])
+        self.assertIn("If-None-Match", self.server.requests[1][1])
+        self.assertEqual(client.tree_cache.revalidations, 1)
+
+    def test_gets_the_modified_tree(self):
+        client = craft_ai.Client(self.cfg)
+        client.get_generator_decision_tree("generator_1")
+        self.server.trees["generator_1"] = {**TREE, "trees": {"value": {"a": 1}}}
+
+        self.assertEqual(
+            client.get_generator_decision_tree("generator_1"),
+            self.server.trees["generator_1"],
+        )
+        self.assertEqual(client.tree_cache.revalidations, 0)
+
+    def test_no_conditional_request_without_cache(self):
+        client = craft_ai.Client({**self.cfg, "decisionTreeCacheMaxBytes": 0})
+        client.get_agent_decision_tree("agent_1")
+        client.get_agent_decision_tree("agent_1")
+
+        self.assertNotIn("If-None-Match", self.server.requests[1][1])
+
+    @unittest.skipIf(CRAFTAI_AIO_ENABLED is False, "aiohttp is not installed")
+    def test_revalidates_the_latest_tree_asynchronously(self):
+        async def get_trees():
+            async with AsyncClient(self.cfg) as client:
+                tree = await client.get_agent_decision_tree("agent_1")
+                return tree, await client.get_agent_decision_tree("agent_1")
+
+        tree, revalidated_tree = asyncio.run(get_trees())
+
+        self.assertIs(revalidated_tree, tree)
+        self.assertIn("If-None-Match", self.server.requests[1][1])
+
+    def test_requests_again_the_evicted_tree(self):
+        client = craft_ai.Client(self.cfg)
+        client.get_agent_decision_tree("agent_1")
+        get = client._requests_session.get
+
+        def evict_and_get(*args, **kwargs):
+            # Evicted between the conditional headers and the response
+            client.tree_cache.clear()
+            return get(*args, **kwargs)
+
+        client._requests_session.get = evict_and_get
+
+        self.assertEqual(client.get_agent_decision_tree("agent_1"), TREE)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertIn("If-None-Match", self.server.requests[1][1])
+        self.assertNotIn("If-None-Match", self.server.requests[2][1])
+
+    @unittest.skipIf(CRAFTAI_AIO_ENABLED is False, "aiohttp is not installed")
+    def test_requests_again_the_evicted_tree_asynchronously(self):
+        async def get_trees():
+            async with AsyncClient(self.cfg) as client:
+                await client.get_generator_decision_tree("generator_1")
+                request = client._request
+
+                async def evict_and_request(*args, **kwargs):
+                    client.tree_cache.clear()
+                    return await request(*args, **kwargs)
+
+                client._request = evict_and_request
+                return await client.get_generator_decision_tree("generator_1")
+
+        self.assertEqual(asyncio.run(get_trees()), TREE)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertNotIn("If-None-Match", self.server.requests[2][1])
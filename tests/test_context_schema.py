@@ -0,0 +1,79 @@
+import unittest
+
+from craft_ai import errors as craft_err
+from craft_ai.interpreter_v2 import ContextSchema, get_context_schema
+
+from .data import valid_data
+
+CONFIGURATION = valid_data.VALID_DECISION_TREE["configuration"]
+CONTEXT = {"presence": "none", "lightIntensity": 0.7, "time": 3.5, "tz": "+02:00"}
+
+
+class TestContextSchema(unittest.TestCase):
+    def setUp(self):
+        self.schema = ContextSchema(CONFIGURATION)
+
+    def test_properties(self):
+        self.assertEqual(
+            sorted(self.schema.properties), ["lightIntensity", "presence", "time", "tz"]
+        )
+        self.assertEqual(self.schema.types["time"], "time_of_day")
+
+    def test_check_valid_context(self):
+        self.schema.check(CONTEXT)
+        self.schema.check(dict(CONTEXT, lightIntensity=None, tz=2))
+        self.schema.check(dict(CONTEXT, lightIntensity={}))
+
+    def test_check_invalid_context(self):
+        context = {"presence": 3, "lightIntensity": "bright"}
+        with self.assertRaises(craft_err.CraftAiDecisionError) as error:
+            self.schema.check(context)
+        self.assertEqual(
+            error.exception.message,
+            "Unable to take decision, the given context is not valid: "
+            "expected property 'time' is not defined, "
+            "expected property 'tz' is not defined, "
+            "'bright' is not a valid value for property 'lightIntensity' of type "
+            "'continuous', "
+            "'3' is not a valid value for property 'presence' of type 'enum'.",
+        )
+        self.assertEqual(
+            error.exception.metadata,
+            {
+                "badProperties": [
+                    {
+                        "property": "lightIntensity",
+                        "type": "continuous",
+                        "value": "bright",
+                    },
+                    {"property": "presence", "type": "enum", "value": 3},
+                ],
+                "missingProperties": ["time", "tz"],
+            },
+        )
+
+    def test_check_columns(self):
+        columns = {p: [v] * 3 for p, v in CONTEXT.items()}
+        columns["time"] = [3.5, float("nan"), None]
+        self.schema.check_columns(columns)
+
+        columns["time"] = [3.5, 25, 26]
+        with self.assertRaises(craft_err.CraftAiDecisionError) as error:
+            self.schema.check_columns(columns)
+        with self.assertRaises(craft_err.CraftAiDecisionError) as expected:
+            self.schema.check(dict(CONTEXT, time=25))
+        self.assertEqual(error.exception.message, expected.exception.message)
+        self.assertEqual(error.exception.metadata, expected.exception.metadata)
+
+    def test_check_columns_missing_column(self):
+        with self.assertRaises(craft_err.CraftAiDecisionError) as error:
+            self.schema.check_columns({"presence": ["none"]})
+        self.assertEqual(
+            error.exception.metadata,
+            {"missingProperties": ["lightIntensity", "time", "tz"]},
+        )
+
+    def test_get_context_schema(self):
+        schema = get_context_schema(CONFIGURATION)
+        self.assertIs(get_context_schema(CONFIGURATION), schema)
+        self.assertIsNot(get_context_schema(dict(CONFIGURATION)), schema)
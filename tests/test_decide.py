@@ -3,7 +3,7 @@ import os
 
 import unittest
 
-from craft_ai import Client, Interpreter, Time, errors as craft_err
+from craft_ai import Client, CompiledTree, Interpreter, Time, errors as craft_err
 
 from . import settings
 
@@ -17,8 +17,12 @@ TREES_DIR = os.path.join(HERE, "data", "interpreter", "decide", "trees")
 CLIENT = Client(settings.CRAFT_CFG)
 
 
+def compiled_decide(tree, *args):
+    return CompiledTree(tree).decide(*args)
+
+
 class TestInterpreter(unittest.TestCase):
-    def check_expectation(self, tree, expectation):
+    def check_expectation(self, tree, expectation, decide=CLIENT.decide):
         exp_context = expectation["context"]
         timestamp = None
         exp_time = expectation.get("time")
@@ -29,7 +33,7 @@ class TestInterpreter(unittest.TestCase):
 
         if expectation.get("error"):
             with self.assertRaises(craft_err.CraftAiDecisionError) as context_manager:
-                CLIENT.decide(tree, exp_context, timestamp)
+                decide(tree, exp_context, timestamp)
 
             exception = context_manager.exception
             expected_message = ""
@@ -43,10 +47,10 @@ class TestInterpreter(unittest.TestCase):
             )
         else:
             expected_decision = expectation["output"]
-            decision = CLIENT.decide(tree, exp_context, time)
+            decision = decide(tree, exp_context, time)
             self.assertEqual(decision, expected_decision)
 
-    def test_interpreter(self):
+    def run_expectations(self, decide):
         versions = os.listdir(TREES_DIR)
         for version in versions:
             tree_files = os.listdir(os.path.join(TREES_DIR, version))
@@ -61,7 +65,13 @@ class TestInterpreter(unittest.TestCase):
 
                     for expectation in expectations:
                         with self.subTest():
-                            self.check_expectation(tree, expectation)
+                            self.check_expectation(tree, expectation, decide)
+
+    def test_interpreter(self):
+        self.run_expectations(CLIENT.decide)
+
+    def test_compiled_interpreter(self):
+        self.run_expectations(compiled_decide)
 
     def test_rebuild_context(self):
         configuration = {
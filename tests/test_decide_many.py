@@ -0,0 +1,48 @@
+import copy
+import unittest
+
+from craft_ai import Client, CompiledTree, Interpreter, Time, errors as craft_err
+
+from .data import valid_data
+
+TREE = valid_data.VALID_DECISION_TREE
+CONTEXTS = valid_data.VALID_DECISION_TREE_CONTEXTS
+
+
+class TestDecideMany(unittest.TestCase):
+    def test_decide_many_same_as_decide(self):
+        trees = [TREE, CompiledTree(TREE), copy.deepcopy(TREE)]
+        for context in CONTEXTS:
+            with self.subTest(context=context):
+                expected = Interpreter.decide(TREE, [copy.copy(context)])
+                self.assertEqual(
+                    Interpreter.decide_many(trees, [copy.copy(context)]),
+                    [expected] * len(trees),
+                )
+
+    def test_decide_many_with_time(self):
+        context = {"presence": "none", "lightIntensity": 0.7, "tz": "+02:00"}
+        time = Time(1458741230, "+02:00")
+        self.assertEqual(
+            Client.decide_many([TREE, CompiledTree(TREE)], dict(context), time),
+            [Interpreter.decide(TREE, [dict(context), time])] * 2,
+        )
+
+    def test_decide_many_contexts_not_shared(self):
+        decisions = Interpreter.decide_many([TREE, TREE], [copy.copy(CONTEXTS[0])])
+        self.assertIsNot(decisions[0]["context"], decisions[1]["context"])
+
+    def test_decide_many_errors(self):
+        context = {"presence": "none", "lightIntensity": "bright", "time": 12}
+        decisions = Interpreter.decide_many([TREE, {}], [context])
+        self.assertEqual(len(decisions), 2)
+        self.assertIsInstance(decisions[0]["error"], craft_err.CraftAiDecisionError)
+        self.assertIsInstance(decisions[1]["error"], craft_err.CraftAiDecisionError)
+
+    def test_decide_many_processes(self):
+        trees = [TREE] * 3 + [CompiledTree(TREE)] * 2
+        context = CONTEXTS[1]
+        self.assertEqual(
+            Interpreter.decide_many(trees, [copy.copy(context)], processes=2),
+            Interpreter.decide_many(trees, [copy.copy(context)]),
+        )
@@ -0,0 +1,63 @@
+import json
+import unittest
+
+import craft_ai
+from craft_ai.helpers import EncodedEntities, EncodedEntity
+
+from . import settings
+
+
+class TestEncodeEntitiesBulk(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.client = craft_ai.Client({**settings.CRAFT_CFG, "operationsChunksSize": 2})
+
+    def test_encode_entities_bulk(self):
+        payload = [
+            {"id": "agent_1", "configuration": {"a": 1}},
+            {"id": "invalid id", "configuration": {"a": 2}},
+            {"id": "agent_3", "configuration": {"a": object()}},
+            {"configuration": {"a": 4}},
+        ]
+        (
+            valid_indices,
+            invalid_indices,
+            invalid_payload,
+            encoded_entities,
+        ) = self.client._encode_entities_bulk(payload)
+
+        self.assertEqual(valid_indices, [0, 3])
+        self.assertEqual(invalid_indices, [1, 2])
+        self.assertEqual(
+            [entity["id"] for entity in invalid_payload], ["invalid id", "agent_3"]
+        )
+        self.assertIsInstance(invalid_payload[1]["error"], TypeError)
+        self.assertIsInstance(encoded_entities, EncodedEntities)
+        self.assertEqual(
+            json.loads(self.client._encode_bulk_payload(encoded_entities)),
+            [payload[0], payload[3]],
+        )
+
+    def test_encode_entities_bulk_all_invalid(self):
+        self.assertRaises(
+            craft_ai.errors.CraftAiBadRequestError,
+            self.client._encode_entities_bulk,
+            [{"id": "agent_1", "configuration": {"a": object()}}],
+        )
+
+    def test_encode_agents_operations_bulk(self):
+        operations = [{"timestamp": t, "context": {"a": t}} for t in range(3)]
+        payload = [
+            {"id": "agent_1", "operations": operations[:2]},
+            {"id": "agent_2", "operations": operations},
+        ]
+        agents = self.client._encode_agents_operations_bulk(payload)
+
+        self.assertEqual(agents, payload)
+        # Agents sent alone, chunk by chunk, are not encoded at once
+        self.assertIsInstance(agents[0], EncodedEntity)
+        self.assertNotIsInstance(agents[1], EncodedEntity)
+        self.assertEqual(json.loads(agents[0].encoded), payload[0])
+        self.assertEqual(
+            json.loads(self.client._encode_agents_operations(agents[:1])), payload[:1]
+        )
@@ -4,6 +4,8 @@ import random
 import datetime
 import semver
 
+from concurrent.futures import ThreadPoolExecutor
+
 import craft_ai
 from craft_ai.constants import DEFAULT_DECISION_TREE_VERSION
 
@@ -106,6 +108,23 @@ class TestGetAgentDecisionTreeWithOperation(unittest.TestCase):
         self.assertNotEqual(decision_tree.get("configuration"), None)
         self.assertNotEqual(decision_tree.get("trees"), None)
 
+    def test_get_decision_tree_with_versions_from_threads(self):
+        def get_tree_major_version(version):
+            decision_tree = self.client.get_agent_decision_tree(
+                self.agent_id, valid_data.VALID_TIMESTAMP, version
+            )
+            return semver.VersionInfo.parse(decision_tree.get("_version")).major
+
+        versions = [1, 2] * 4
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            major_versions = list(executor.map(get_tree_major_version, versions))
+
+        self.assertEqual(major_versions, versions)
+        # The version is only sent with the requests of each call
+        self.assertNotIn(
+            "x-craft-ai-tree-version", self.client._requests_session.headers
+        )
+
     def test_get_decision_tree_without_timestamp(self):
         # test if we get the latest decision tree
         decision_tree = self.client.get_agent_decision_tree(self.agent_id)
@@ -0,0 +1,112 @@
+import threading
+import time
+import unittest
+
+from craft_ai.helpers import map_ordered, prefetch
+
+
+class TestMapOrdered(unittest.TestCase):
+    def test_map_ordered_keeps_order(self):
+        def slow_square(x):
+            time.sleep(0.01 * (5 - x % 5))
+            return x * x
+
+        for workers in [1, 4]:
+            futures = map_ordered(slow_square, range(20), workers, 8)
+            self.assertEqual(
+                [future.result() for future in futures], [x * x for x in range(20)]
+            )
+
+    def test_map_ordered_bounds_pending_calls(self):
+        consumed = []
+        running = [0, 0]
+        lock = threading.Lock()
+
+        def call(x):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            return x
+
+        def items():
+            for x in range(30):
+                consumed.append(x)
+                yield x
+
+        for future in map_ordered(call, items(), 3, 5):
+            # Items are only consumed when there is room in the window
+            self.assertLessEqual(len(consumed), future.result() + 6)
+        self.assertLessEqual(running[1], 3)
+
+    def test_map_ordered_reports_errors(self):
+        def fail_on_odd(x):
+            if x % 2:
+                raise ValueError(x)
+            return x
+
+        for workers in [1, 3]:
+            futures = list(map_ordered(fail_on_odd, range(6), workers))
+            self.assertEqual(
+                [future.exception() is None for future in futures], [True, False] * 3,
+            )
+            self.assertRaises(ValueError, futures[1].result)
+
+    def test_map_ordered_stops_early(self):
+        calls = []
+
+        def call(x):
+            calls.append(x)
+            return x
+
+        futures = map_ordered(call, range(100), 2, 4)
+        next(futures).result()
+        futures.close()
+        self.assertLess(len(calls), 100)
+
+
+class TestPrefetch(unittest.TestCase):
+    def test_prefetch_keeps_order(self):
+        for size in [0, 1, 3]:
+            self.assertEqual(list(prefetch(iter(range(20)), size)), list(range(20)))
+
+    def test_prefetch_bounds_items_ahead(self):
+        produced = []
+
+        def items():
+            for x in range(20):
+                produced.append(x)
+                yield x
+
+        for item in prefetch(items(), 2):
+            time.sleep(0.005)
+            # The consumed item, the queued ones and the one waiting for room
+            self.assertLessEqual(len(produced), item + 4)
+
+    def test_prefetch_reports_errors_in_order(self):
+        def items():
+            yield 1
+            yield 2
+            raise ValueError("failed")
+
+        consumed = []
+        with self.assertRaises(ValueError):
+            for item in prefetch(items(), 5):
+                consumed.append(item)
+        self.assertEqual(consumed, [1, 2])
+
+    def test_prefetch_stops_early(self):
+        produced = []
+
+        def items():
+            for x in range(100):
+                produced.append(x)
+                yield x
+
+        items_ahead = prefetch(items(), 2)
+        next(items_ahead)
+        items_ahead.close()
+        time.sleep(0.3)
+        self.assertLess(len(produced), 10)
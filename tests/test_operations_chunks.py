@@ -0,0 +1,297 @@
+import json
+import unittest
+
+import craft_ai
+from craft_ai.aio import CRAFTAI_AIO_ENABLED
+from craft_ai.helpers import AgentOperationsPart, EncodedOperations
+
+from . import settings
+
+if CRAFTAI_AIO_ENABLED:
+    import asyncio
+
+    from craft_ai.aio import AsyncClient
+
+OPERATIONS = [
+    {"timestamp": 1600000000 + i, "context": {"wide": "x" * 100, "n": i}}
+    for i in range(20)
+]
+OPERATION_BYTES = len(json.dumps(OPERATIONS[0], separators=(",", ":")))
+
+
+class TestOperationsChunks(unittest.TestCase):
+    def make_client(self, cfg=None):
+        return craft_ai.Client({**settings.CRAFT_CFG, **(cfg or {})})
+
+    def test_chunks_by_count(self):
+        client = self.make_client({"operationsChunksSize": 8})
+        chunks = list(client._encode_operations_chunks(OPERATIONS))
+
+        self.assertEqual([len(operations) for operations, _ in chunks], [8, 8, 4])
+        for operations, json_pl in chunks:
+            self.assertEqual(json.loads(json_pl), operations)
+
+    def test_chunks_by_bytes(self):
+        client = self.make_client(
+            {"operationsChunksSize": 8, "operationsChunksMaxBytes": 3 * OPERATION_BYTES}
+        )
+        chunks = list(client._encode_operations_chunks(OPERATIONS))
+
+        self.assertEqual(
+            [operation for operations, _ in chunks for operation in operations],
+            OPERATIONS,
+        )
+        for operations, json_pl in chunks:
+            self.assertLessEqual(len(json_pl), 3 * OPERATION_BYTES + 4)
+            self.assertEqual(json.loads(json_pl), operations)
+
+    def test_chunks_of_encoded_operations_by_bytes(self):
+        client = self.make_client({"operationsChunksMaxBytes": 3 * OPERATION_BYTES})
+        operations = EncodedOperations(
+            json.dumps(operation, separators=(",", ":")) for operation in OPERATIONS
+        )
+        chunks = list(client._encode_operations_chunks(operations))
+
+        self.assertGreater(len(chunks), 1)
+        for operations, json_pl in chunks:
+            self.assertIsInstance(operations, EncodedOperations)
+            self.assertLessEqual(len(json_pl), 3 * OPERATION_BYTES + 4)
+        self.assertEqual(
+            [operation for _, json_pl in chunks for operation in json.loads(json_pl)],
+            OPERATIONS,
+        )
+
+    def test_chunk_agents_by_bytes(self):
+        client = self.make_client({"operationsChunksMaxBytes": 5 * OPERATION_BYTES})
+        payload = [
+            {"id": "agent_{}".format(i), "operations": OPERATIONS[i : i + 2]}
+            for i in range(6)
+        ] + [{"id": "agent_large", "operations": OPERATIONS}]
+        chunked_data = client._chunk_agents_operations(
+            client._encode_agents_operations_bulk(payload)
+        )
+        chunked_data = [chunk for chunk in chunked_data if chunk]
+
+        self.assertEqual(
+            [[agent["id"] for agent in chunk] for chunk in chunked_data[:3]],
+            [["agent_0", "agent_1"], ["agent_2", "agent_3"], ["agent_4", "agent_5"]],
+        )
+        # The large agent is split in parts small enough for a chunk
+        for chunk in chunked_data[3:]:
+            self.assertEqual([agent["id"] for agent in chunk], ["agent_large"])
+            self.assertIsInstance(chunk[0], AgentOperationsPart)
+            self.assertLessEqual(len(chunk[0].encoded), 5 * OPERATION_BYTES)
+        self.assertEqual(
+            [
+                operation
+                for chunk in chunked_data[3:]
+                for operation in json.loads(chunk[0].encoded)["operations"]
+            ],
+            OPERATIONS,
+        )
+
+    def test_chunk_agents_by_encoded_bytes(self):
+        operations = EncodedOperations(
+            json.dumps(
+                {"timestamp": 1600000000 + i, "context": {"wide": "é" * 50}},
+                ensure_ascii=False,
+                separators=(",", ":"),
+            )
+            for i in range(20)
+        )
+        max_bytes = 5 * len(operations[0].encode("utf-8"))
+        client = self.make_client({"operationsChunksMaxBytes": max_bytes})
+        payload = [
+            {"id": "agent_{}".format(i), "operations": operations[i : i + 2]}
+            for i in range(6)
+        ] + [{"id": "agent_large", "operations": operations}]
+        chunked_data = client._chunk_agents_operations(
+            client._encode_agents_operations_bulk(payload)
+        )
+
+        for chunk in chunked_data:
+            self.assertLessEqual(
+                len(client._encode_agents_operations(chunk).encode("utf-8")),
+                max_bytes + 2 * len(chunk),
+            )
+
+    def test_chunk_agents_split_large_agents(self):
+        client = self.make_client({"operationsChunksSize": 8})
+        payload = [
+            {"id": "agent_0", "operations": OPERATIONS[:3]},
+            {"id": "agent_large", "operations": OPERATIONS},
+            {"id": "agent_1", "operations": OPERATIONS[:3]},
+        ]
+        chunked_data = client._chunk_agents_operations(
+            client._encode_agents_operations_bulk(payload)
+        )
+
+        # The parts of the large agent fill the chunks
+        self.assertEqual(
+            [
+                [(agent["id"], len(agent["operations"])) for agent in chunk]
+                for chunk in chunked_data
+            ],
+            [
+                [("agent_0", 3), ("agent_large", 5)],
+                [("agent_1", 3), ("agent_large", 5)],
+                [("agent_large", 8)],
+                [("agent_large", 2)],
+            ],
+        )
+        self.assertEqual(
+            [
+                operation
+                for chunk in chunked_data
+                for agent in chunk
+                if agent["id"] == "agent_large"
+                for operation in agent["operations"]
+            ],
+            OPERATIONS,
+        )
+        self.assertEqual(client._chunks_dependencies(chunked_data), [[], [0], [1], [2]])
+
+    def test_chunk_lone_agent(self):
+        client = self.make_client({"operationsChunksSize": 8})
+        payload = [{"id": "agent_large", "operations": OPERATIONS}]
+        chunked_data = client._chunk_agents_operations(
+            client._encode_agents_operations_bulk(payload)
+        )
+
+        self.assertEqual(chunked_data, [payload])
+
+    def test_merge_parts_responses(self):
+        client = self.make_client()
+        chunked_data = [
+            [
+                {"id": "agent_0", "operations": OPERATIONS[:1]},
+                AgentOperationsPart("agent_large", OPERATIONS[:1], "[]"),
+            ],
+            [AgentOperationsPart("agent_large", OPERATIONS[1:3], "[]")],
+        ]
+        results = [
+            [
+                {"id": "agent_0", "status": 201, "added_operations_count": 1},
+                {"id": "agent_large", "status": 201, "added_operations_count": 1},
+            ],
+            [{"id": "agent_large", "status": 201, "added_operations_count": 2}],
+        ]
+        responses = client._gather_chunks_responses(chunked_data, results)
+
+        self.assertEqual(
+            [response["id"] for response in responses], ["agent_0", "agent_large"]
+        )
+        self.assertEqual(responses[1]["added_operations_count"], 3)
+
+        error = craft_ai.errors.CraftAiBadRequestError("error")
+        responses = client._gather_chunks_responses(chunked_data, results[:1] + [error])
+        self.assertEqual(responses[1], {"id": "agent_large", "error": error})
+
+    def test_payload_too_large_error(self):
+        err = craft_ai.Client._get_error_from_status(413, "")
+
+        self.assertIsInstance(err, craft_ai.errors.CraftAiPayloadTooLargeError)
+        self.assertIsInstance(err, craft_ai.errors.CraftAiBadRequestError)
+
+    def test_lower_chunks_max_bytes(self):
+        client = self.make_client()
+        client._lower_operations_chunks_max_bytes(1000)
+        self.assertEqual(client._operations_chunks_max_bytes, 500)
+        client._lower_operations_chunks_max_bytes(5000)
+        self.assertEqual(client._operations_chunks_max_bytes, 500)
+
+    @unittest.skipIf(CRAFTAI_AIO_ENABLED is False, "aiohttp is not installed")
+    def test_async_chunks_are_encoded_within_the_window(self):
+        cfg = {
+            **settings.CRAFT_CFG,
+            "operationsChunksSize": 2,
+            "operationsChunksConcurrency": 2,
+            "operationsChunksWindow": 3,
+        }
+        pending = []
+        max_pending = []
+
+        async def add_operations():
+            async with AsyncClient(cfg) as client:
+                encode_operations = client._encode_operations
+
+                def count_encoded(operations):
+                    pending.append(operations)
+                    max_pending.append(len(pending))
+                    return encode_operations(operations)
+
+                async def post_chunk(req_url, operations, json_pl):
+                    await asyncio.sleep(0.01)
+                    pending.remove(operations)
+                    return len(operations)
+
+                client._encode_operations = count_encoded
+                client._post_operations_chunk = post_chunk
+                return await client.add_agent_operations("agent_1", OPERATIONS)
+
+        response = asyncio.run(add_operations())
+
+        self.assertEqual(response["added_operations_count"], len(OPERATIONS))
+        self.assertEqual(len(max_pending), 10)
+        self.assertEqual(max(max_pending), 3)
+
+    def check_parts_after_failure(self, add_agents_operations_bulk):
+        chunked_data = [
+            [AgentOperationsPart("agent_large", OPERATIONS[:1], "[]")],
+            [
+                AgentOperationsPart("agent_large", OPERATIONS[1:2], "[]"),
+                {"id": "agent_0", "operations": OPERATIONS[:1]},
+            ],
+            [AgentOperationsPart("agent_large", OPERATIONS[2:3], "[]")],
+        ]
+        sent = []
+
+        def add_chunk(chunk):
+            sent.append([agent["id"] for agent in chunk])
+            return [
+                {"id": agent["id"], "status": 400, "message": "invalid"}
+                if agent["id"] == "agent_large"
+                else {"id": agent["id"], "status": 201, "added_operations_count": 1}
+                for agent in chunk
+            ]
+
+        responses = add_agents_operations_bulk(chunked_data, add_chunk)
+
+        # The later parts of the failed agent are not sent
+        self.assertEqual(sent, [["agent_large"], ["agent_0"]])
+        self.assertEqual(
+            responses,
+            [
+                {"id": "agent_large", "status": 400, "message": "invalid"},
+                {"id": "agent_0", "status": 201, "added_operations_count": 1},
+            ],
+        )
+
+    def test_parts_after_failure_are_skipped(self):
+        client = self.make_client({"operationsChunksConcurrency": 2})
+
+        def add_agents_operations_bulk(chunked_data, add_chunk):
+            client._add_agents_operations_chunk = lambda chunk, workers: add_chunk(
+                chunk
+            )
+            return client._add_agents_operations_bulk(chunked_data)
+
+        self.check_parts_after_failure(add_agents_operations_bulk)
+
+    @unittest.skipIf(CRAFTAI_AIO_ENABLED is False, "aiohttp is not installed")
+    def test_async_parts_after_failure_are_skipped(self):
+        cfg = {**settings.CRAFT_CFG, "operationsChunksConcurrency": 2}
+
+        def add_agents_operations_bulk(chunked_data, add_chunk):
+            async def add_operations():
+                async with AsyncClient(cfg) as client:
+
+                    async def add_agents_operations_chunk(chunk, workers):
+                        return add_chunk(chunk)
+
+                    client._add_agents_operations_chunk = add_agents_operations_chunk
+                    return await client._add_agents_operations_bulk(chunked_data)
+
+            return asyncio.run(add_operations())
+
+        self.check_parts_after_failure(add_agents_operations_bulk)
@@ -0,0 +1,84 @@
+import unittest
+
+from craft_ai.pandas import CRAFTAI_PANDAS_ENABLED
+
+if CRAFTAI_PANDAS_ENABLED:
+    import json
+
+    import numpy as np
+    import pandas as pd
+
+    from craft_ai.errors import CraftAiBadRequestError
+    from craft_ai.helpers import EncodedOperations
+    from craft_ai.pandas.utils import encode_operations
+
+    from .data import pandas_valid_data
+
+    MISSING_AGENT_DATA = pandas_valid_data.MISSING_AGENT_DATA
+
+
+@unittest.skipIf(CRAFTAI_PANDAS_ENABLED is False, "pandas is not enabled")
+class TestPandasEncodeOperations(unittest.TestCase):
+    def test_encode_operations_missing_values(self):
+        operations = encode_operations(MISSING_AGENT_DATA, "tz")
+
+        self.assertIsInstance(operations, EncodedOperations)
+        self.assertEqual(
+            [json.loads(operation) for operation in operations],
+            [
+                {
+                    "timestamp": 1577833200,
+                    "context": {"a": 1, "b": None, "tz": "+02:00"},
+                },
+                {
+                    "timestamp": 1577919600,
+                    "context": {"a": 2, "b": "Paul", "tz": "+02:00"},
+                },
+                {"timestamp": 1578006000, "context": {"a": 3, "b": {}, "tz": "+02:00"}},
+                {"timestamp": 1578092400, "context": {"a": 4, "tz": "+02:00"}},
+                {
+                    "timestamp": 1578178800,
+                    "context": {"a": 5, "b": "Jacques", "tz": "+02:00"},
+                },
+                {"timestamp": 1578265200, "context": {"a": 6, "tz": "+02:00"}},
+                {"timestamp": 1578351600, "context": {"b": {}, "tz": "+02:00"}},
+                {"timestamp": 1578438000, "context": {"a": 8, "tz": "+01:00"}},
+                {"timestamp": 1578524400, "context": {"a": 9, "tz": "+01:00"}},
+                {"timestamp": 1578610800, "context": {"a": 10, "tz": "+01:00"}},
+            ],
+        )
+
+    def test_encode_operations_column_types(self):
+        df = pd.DataFrame(
+            {
+                "integer": np.arange(3),
+                "boolean": [True, False, True],
+                "float": [0.1, np.inf, np.nan],
+                "mixed": [True, 1, 1.5],
+                "CraftGeneratedDummy": 1,
+            },
+            index=pd.date_range("20200101", periods=3, freq="H").tz_localize(
+                "Europe/Paris"
+            ),
+        )
+        contexts = [json.loads(o)["context"] for o in encode_operations(df, "tz")]
+
+        self.assertEqual([c.pop("tz") for c in contexts], ["+0100"] * 3)
+
+        self.assertEqual(
+            contexts,
+            [
+                {"integer": 0, "boolean": True, "float": 0.1, "mixed": True},
+                {"integer": 1, "boolean": False, "float": float("inf"), "mixed": 1},
+                {"integer": 2, "boolean": True, "mixed": 1.5},
+            ],
+        )
+        self.assertIs(contexts[0]["mixed"], True)
+        self.assertIsInstance(contexts[1]["mixed"], int)
+
+    def test_encode_operations_not_serializable(self):
+        df = pd.DataFrame(
+            {"a": [object()]},
+            index=pd.date_range("20200101", periods=1).tz_localize("UTC"),
+        )
+        self.assertRaises(CraftAiBadRequestError, encode_operations, df)
@@ -0,0 +1,145 @@
+import unittest
+
+from craft_ai.pandas import CRAFTAI_PANDAS_ENABLED
+
+if CRAFTAI_PANDAS_ENABLED:
+    import numpy as np
+    import pandas as pd
+
+    import craft_ai.pandas
+
+    from craft_ai import CompiledTree
+
+    from .data import pandas_valid_data, valid_data
+
+    TREE = valid_data.VALID_DECISION_TREE
+    CONTEXTS = valid_data.VALID_DECISION_TREE_CONTEXTS
+
+
+@unittest.skipIf(CRAFTAI_PANDAS_ENABLED is False, "pandas is not enabled")
+class TestPandasDecideBatch(unittest.TestCase):
+    def setUp(self):
+        self.columns = {
+            "presence": np.array([c["presence"] for c in CONTEXTS], dtype=object),
+            "lightIntensity": np.array(
+                [c["lightIntensity"] or np.nan for c in CONTEXTS], dtype=float
+            ),
+            "time": np.array(
+                [np.nan if c["time"] is None else c["time"] for c in CONTEXTS],
+                dtype=float,
+            ),
+            "tz": np.array([c["tz"] for c in CONTEXTS], dtype=object),
+        }
+
+    def test_decide_batch_same_as_decide(self):
+        decisions = craft_ai.pandas.Interpreter.decide_batch(TREE, self.columns)
+        output = decisions["output"]["lightbulbColor"]
+
+        compiled_tree = CompiledTree(TREE)
+        for i, context in enumerate(CONTEXTS):
+            with self.subTest(context=context):
+                expected = compiled_tree.decide(dict(context))["output"][
+                    "lightbulbColor"
+                ]
+                self.assertEqual(
+                    output["predicted_value"][i], expected["predicted_value"]
+                )
+                self.assertEqual(output["decision_path"][i], expected["decision_path"])
+                self.assertEqual(output["nb_samples"][i], expected["nb_samples"])
+                self.assertEqual(
+                    list(output["distribution"][i]), expected["distribution"]
+                )
+                if expected["confidence"] is None:
+                    self.assertTrue(np.isnan(output["confidence"][i]))
+                else:
+                    self.assertEqual(output["confidence"][i], expected["confidence"])
+                self.assertIsNone(output["error"][i])
+
+    def test_decide_batch_missing_column(self):
+        del self.columns["time"]
+        self.assertRaises(
+            craft_ai.pandas.errors.CraftAiDecisionError,
+            craft_ai.pandas.Interpreter.decide_batch,
+            TREE,
+            self.columns,
+        )
+
+    def test_decide_batch_not_numerical_column(self):
+        self.columns["lightIntensity"] = np.array(
+            ["bright"] * len(CONTEXTS), dtype=object
+        )
+        self.assertRaises(
+            craft_ai.pandas.errors.CraftAiDecisionError,
+            craft_ai.pandas.Interpreter.decide_batch,
+            TREE,
+            self.columns,
+        )
+
+
+@unittest.skipIf(CRAFTAI_PANDAS_ENABLED is False, "pandas is not enabled")
+class TestPandasDecideColumnar(unittest.TestCase):
+    def setUp(self):
+        self.contexts_df = pd.DataFrame(
+            [
+                ["player", 0.2, "+02:00"],
+                ["occupant", craft_ai.pandas.MISSING_VALUE, "+02:00"],
+                ["none", 0.7, "+02:00"],
+                ["none", craft_ai.pandas.OPTIONAL_VALUE, "-05:00"],
+                [craft_ai.pandas.MISSING_VALUE, 0.7, None],
+                ["unknown", 0.7, "+02:00"],
+            ],
+            columns=["presence", "lightIntensity", "tz"],
+            index=pd.date_range("20200101", periods=6, freq="5H").tz_localize(
+                "Europe/Paris"
+            ),
+        )
+
+    def test_decide_from_contexts_df_columnar(self):
+        contexts_df_copy = self.contexts_df.copy(deep=True)
+        expected_df = craft_ai.pandas.Interpreter.decide_from_contexts_df(
+            TREE, self.contexts_df
+        )
+        df = craft_ai.pandas.Interpreter.decide_from_contexts_df(
+            TREE, self.contexts_df, columnar=True
+        )
+
+        pd.testing.assert_frame_equal(df, expected_df)
+        self.assertTrue(self.contexts_df.equals(contexts_df_copy))
+
+    def test_decide_from_contexts_df_columnar_integer_timezones(self):
+        self.contexts_df["tz"] = [2, 2, -5, 2, 1, 2]
+        expected_df = craft_ai.pandas.Interpreter.decide_from_contexts_df(
+            TREE, self.contexts_df
+        )
+        df = craft_ai.pandas.Interpreter.decide_from_contexts_df(
+            TREE, self.contexts_df, columnar=True
+        )
+
+        pd.testing.assert_frame_equal(df, expected_df)
+
+    def test_decide_from_contexts_df_columnar_empty_tree(self):
+        contexts_df = pd.DataFrame(
+            [[0, "Jean-Pierre", "+02:00"], [1, "Paul", "+02:00"]],
+            columns=["a", "b", "tz"],
+            index=pd.date_range("20200201", periods=2, freq="D").tz_localize(
+                "Europe/Paris"
+            ),
+        )
+
+        df = craft_ai.pandas.Interpreter.decide_from_contexts_df(
+            pandas_valid_data.EMPTY_TREE, contexts_df, columnar=True
+        )
+
+        self.assertEqual(len(df), 2)
+        self.assertEqual(df.columns, ["error"])
+
+    def test_decide_from_contexts_df_columnar_invalid_context(self):
+        self.contexts_df["lightIntensity"] = "bright"
+
+        self.assertRaises(
+            craft_ai.pandas.errors.CraftAiDecisionError,
+            craft_ai.pandas.Interpreter.decide_from_contexts_df,
+            TREE,
+            self.contexts_df,
+            columnar=True,
+        )
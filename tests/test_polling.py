@@ -0,0 +1,61 @@
+import unittest
+
+from craft_ai import Client
+from craft_ai.errors import CraftAiLongRequestTimeOutError
+from craft_ai.polling import Backoff, PollingStats, parse_retry_after
+
+
+class FakeResponse(object):
+    def __init__(self, status_code, body, headers):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers
+
+    def json(self):
+        return self.body
+
+
+class TestBackoff(unittest.TestCase):
+    def test_delay_grows_exponentially_up_to_max_interval(self):
+        backoff = Backoff(100, 1000, 2, 0)
+        self.assertEqual(
+            [backoff.delay(attempt) for attempt in range(1, 7)],
+            [100, 200, 400, 800, 1000, 1000],
+        )
+
+    def test_delay_jitter(self):
+        backoff = Backoff(1000, 1000, 2, 0.5)
+        for _ in range(100):
+            self.assertTrue(500 <= backoff.delay(1) <= 1000)
+
+    def test_delay_retry_after(self):
+        error = CraftAiLongRequestTimeOutError("computing", {"retryAfter": 3})
+        self.assertEqual(Backoff(100, 1000, 2, 0).delay(1, error), 3000)
+        self.assertEqual(Backoff(100, 1000, 2, 0, False).delay(1, error), 100)
+
+
+class TestRetryAfter(unittest.TestCase):
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("3"), 3)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertIsNone(parse_retry_after(None))
+
+    def test_decode_response_retry_after(self):
+        response = FakeResponse(202, {"message": "computing"}, {"Retry-After": "2"})
+        with self.assertRaises(CraftAiLongRequestTimeOutError) as context:
+            Client._decode_response(response)
+        self.assertEqual(context.exception.metadata, {"retryAfter": 2})
+
+
+class TestPollingStats(unittest.TestCase):
+    def test_record(self):
+        stats = PollingStats()
+        stats.record(1, 0)
+        stats.record(3, 1.5)
+        stats.record(3, 0.5)
+        self.assertEqual(stats.calls, 3)
+        self.assertEqual(stats.polls, 7)
+        self.assertEqual(stats.waited, 2)
+        self.assertEqual(stats.polls_per_call, {1: 1, 3: 2})
+        self.assertEqual(stats.last_call_polls, 3)
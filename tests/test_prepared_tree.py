@@ -0,0 +1,49 @@
+import copy
+import unittest
+
+from craft_ai import Interpreter, Time, errors as craft_err
+from craft_ai.interpreter import PreparedTree
+
+from .data import valid_data
+
+TREE = valid_data.VALID_DECISION_TREE
+CONTEXTS = valid_data.VALID_DECISION_TREE_CONTEXTS
+
+
+class TestPreparedTree(unittest.TestCase):
+    def test_prepare(self):
+        prepared = Interpreter.prepare(TREE)
+        self.assertIsInstance(prepared, PreparedTree)
+        self.assertEqual(prepared.version, TREE["_version"])
+        self.assertIs(prepared.configuration, TREE["configuration"])
+        self.assertIs(prepared.bare_tree, TREE["trees"])
+        self.assertEqual(prepared.output, ["lightbulbColor"])
+        self.assertEqual(prepared.timezone_key, "tz")
+        self.assertNotIn("lightbulbColor", prepared.context_properties)
+
+    def test_decide_same_as_tree(self):
+        prepared = Interpreter.prepare(TREE)
+        for context in CONTEXTS:
+            with self.subTest(context=context):
+                self.assertEqual(
+                    Interpreter.decide(prepared, [copy.copy(context)]),
+                    Interpreter.decide(TREE, [copy.copy(context)]),
+                )
+
+    def test_decide_with_time(self):
+        prepared = Interpreter.prepare(TREE)
+        context = {"presence": "none", "lightIntensity": 0.7, "tz": "+02:00"}
+        time = Time(1458741230, "+02:00")
+        self.assertEqual(
+            Interpreter.decide(prepared, [dict(context), time]),
+            Interpreter.decide(TREE, [dict(context), time]),
+        )
+
+    def test_invalid_tree(self):
+        self.assertRaises(craft_err.CraftAiDecisionError, Interpreter.prepare, {})
+        self.assertRaises(
+            craft_err.CraftAiDecisionError, Interpreter.prepare, {"_version": "42.0.0"}
+        )
+        self.assertRaises(
+            craft_err.CraftAiDecisionError, Interpreter.prepare, {"_version": "a.b"}
+        )
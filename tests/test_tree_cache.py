@@ -0,0 +1,118 @@
+import time
+import unittest
+
+from unittest import mock
+
+import craft_ai
+from craft_ai.tree_cache import TreeCache
+
+from . import settings
+
+
+class TestTreeCache(unittest.TestCase):
+    def test_get_and_set(self):
+        cache = TreeCache(100)
+        tree = {"trees": {}}
+        cache.set(("agent", "a", 1, "2"), tree, 10)
+
+        self.assertIs(cache.get(("agent", "a", 1, "2")), tree)
+        self.assertIsNone(cache.get(("agent", "a", 2, "2")))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(cache.size, 10)
+
+    def test_evicts_least_recently_used_trees(self):
+        cache = TreeCache(25)
+        cache.set("a", {}, 10)
+        cache.set("b", {}, 10)
+        cache.get("a")
+        cache.set("c", {}, 10)
+
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(cache.size, 20)
+
+    def test_does_not_cache_trees_larger_than_the_cache(self):
+        cache = TreeCache(25)
+        cache.set("a", {}, 30)
+
+        self.assertEqual(len(cache), 0)
+
+    def test_expiration(self):
+        cache = TreeCache(100)
+        cache.set("a", {}, 10, ttl=0.01)
+        cache.set("b", {}, 10, ttl=0)
+        self.assertIsNotNone(cache.get("a"))
+        time.sleep(0.02)
+
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.size, 0)
+
+    def test_keeps_expired_trees_having_validators(self):
+        cache = TreeCache(100)
+        tree = {}
+        cache.set("a", tree, 10, ttl=0, validators={"If-None-Match": '"1"'})
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get_validators("a"), (tree, {"If-None-Match": '"1"'}))
+        cache.revalidate("a", ttl=10)
+        self.assertIs(cache.get("a"), tree)
+        self.assertEqual(cache.revalidations, 1)
+
+
+class TestClientTreeCache(unittest.TestCase):
+    def test_disabled_by_default(self):
+        client = craft_ai.Client(settings.CRAFT_CFG)
+
+        self.assertIsNone(client.tree_cache)
+
+    def test_get_cached_trees_bulk(self):
+        client = craft_ai.Client(
+            {**settings.CRAFT_CFG, "decisionTreeCacheMaxBytes": 10000}
+        )
+        tree = {"trees": {}}
+        client._cache_tree(("agent", "agent_1", 100, "2"), tree, 12)
+        payload = [
+            {"id": "agent_0", "timestamp": 100},
+            {"id": "agent_1", "timestamp": 100},
+            {"id": "invalid id"},
+        ]
+        valid_indices, _, _, encoded_payload = client._encode_entities_bulk(payload)
+        (
+            cached_indices,
+            cached_dts,
+            missing_indices,
+            missing_payload,
+        ) = client._get_cached_trees_bulk(
+            "agent", payload, valid_indices, encoded_payload, "2"
+        )
+
+        self.assertEqual(cached_indices, [1])
+        self.assertEqual(
+            cached_dts, [{"id": "agent_1", "tree": tree, "timestamp": 100}]
+        )
+        self.assertEqual(missing_indices, [0])
+        self.assertEqual(list(missing_payload), [encoded_payload[0]])
+
+        client._cache_trees_bulk(
+            "agent",
+            missing_payload,
+            [{"id": "agent_0", "tree": tree}],
+            [b'{"id": "agent_0", "tree": {"trees": {}}}'],
+            "2",
+        )
+        self.assertIs(client.tree_cache.get(("agent", "agent_0", 100, "2")), tree)
+        self.assertEqual(client.tree_cache.size, 12 + 40)
+
+    def test_caches_the_size_of_the_received_tree(self):
+        client = craft_ai.Client(
+            {**settings.CRAFT_CFG, "decisionTreeCacheMaxBytes": 10000}
+        )
+        key = ("agent", "agent_1", 100, "2")
+        response = mock.Mock(status_code=200, content=b'{"trees":  {}}', headers={})
+        with mock.patch.object(craft_ai.codec, "encode") as encode:
+            self.assertEqual(client._decode_tree_response(key, response), {"trees": {}})
+        encode.assert_not_called()
+        self.assertEqual(client.tree_cache.size, len(response.content))
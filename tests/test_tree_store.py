@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import craft_ai
+from craft_ai import codec
+from craft_ai.tree_store import TreeStore
+
+from . import settings
+
+TREE = {"_version": "2.0.0", "configuration": {}, "trees": {}}
+
+
+class TestTreeStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_get_and_set(self):
+        store = TreeStore(self.directory)
+        store.set(("agent", "agent_1", 100, "2"), codec.encode(TREE))
+
+        self.assertTrue(
+            os.path.isfile(
+                os.path.join(self.directory, "agents", "agent_1", "2", "100.json")
+            )
+        )
+        self.assertEqual(store.get(("agent", "agent_1", 100.0, "2")), TREE)
+        self.assertIsNone(store.get(("agent", "agent_1", 101, "2")))
+        self.assertIsNone(store.get(("generator", "agent_1", 100, "2")))
+        self.assertEqual((store.hits, store.misses), (1, 2))
+
+    def test_latest_trees_are_not_stored(self):
+        store = TreeStore(self.directory)
+        store.set(("agent", "agent_1", None, "2"), codec.encode(TREE))
+
+        self.assertIsNone(store.get(("agent", "agent_1", None, "2")))
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_client_reads_the_store(self):
+        TreeStore(self.directory).set(
+            ("agent", "agent_1", 100, "2"), codec.encode(TREE)
+        )
+        client = craft_ai.Client(
+            {
+                **settings.CRAFT_CFG,
+                "decisionTreeStore": self.directory,
+                "decisionTreeCacheMaxBytes": 10000,
+            }
+        )
+
+        # Found in the store, without requesting the craft ai API
+        self.assertEqual(client.get_agent_decision_tree("agent_1", 100, 2), TREE)
+        self.assertEqual(client.tree_store.hits, 1)
+        self.assertEqual(
+            client.get_agents_decision_trees_bulk(
+                [{"id": "agent_1", "timestamp": 100}], 2
+            ),
+            [{"id": "agent_1", "tree": TREE, "timestamp": 100}],
+        )
+        self.assertEqual(client.tree_cache.hits, 1)
+
+    def test_paths_stay_in_the_store(self):
+        store = TreeStore(self.directory)
+        for key in [
+            ("agent", "../agent_1", 100, "2"),
+            ("agent", "agent_1", 100, "../../.."),
+            ("agent", "agent_1", 100, ".."),
+            ("agent", "agent_1", "../100", "/2"),
+            ("agent", "agent_1", 100, ""),
+        ]:
+            store.set(key, codec.encode(TREE))
+            path = os.path.realpath(store.path(key))
+            self.assertTrue(path.startswith(os.path.realpath(self.directory) + os.sep))
+            self.assertEqual(store.get(key), TREE)
+        self.assertEqual(os.listdir(self.directory), ["agents"])
+        self.assertEqual(
+            len({store.path(("agent", "agent_1", 100, v)) for v in ["", ".", "%"]}), 3,
+        )